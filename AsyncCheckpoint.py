@@ -0,0 +1,150 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from tensorflow.keras.callbacks import Callback
+
+
+# A classe salva checkpoints periódicos do treinamento (pesos da rede + estado do otimizador + época) sem
+# bloquear o passo de treinamento.
+#
+# A cada checkpoint, os valores das variáveis são copiados para a memória (operação rápida, feita entre dois
+# passos, garantindo um estado consistente) e a gravação em disco, que é a parte lenta, acontece em uma
+# thread de fundo enquanto o treinamento continua.
+#
+# Os arquivos ficam em <pasta da execução>/checkpoints/:
+#   * ckpt_epoch_NNNN.npz - pesos da rede e variáveis do otimizador (momentos do Adam, iterações...)
+#   * latest.json - época concluída, passo global e arquivo do checkpoint mais recente
+#
+# Com esses arquivos, AsyncCheckpoint.restore retoma o treinamento do ponto em que parou.
+class AsyncCheckpoint(Callback):
+
+    def __init__(self, log_path, every_epochs=1, every_steps=None, keep=2, log=print):
+        super().__init__()
+        self.checkpoint_dir = os.path.join(log_path, "checkpoints")
+        self.every_epochs = every_epochs  # salva a cada N épocas (None desativa)
+        self.every_steps = every_steps  # salva a cada N passos de treinamento (None desativa)
+        self.keep = keep  # quantidade de checkpoints mantidos em disco
+        self.log = log
+
+        # Uma única thread de gravação: os checkpoints são gravados na ordem em que foram gerados
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = None
+        self.current_epoch = 0
+        self.global_step = 0
+
+    # ------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def _optimizer_variables(optimizer):
+        return optimizer.variables()
+
+    def _snapshot(self, completed_epochs):
+        """ Copia o estado atual para a memória e agenda a gravação em segundo plano """
+        # Garante que a gravação anterior terminou antes de gerar outra (evita acúmulo de cópias na memória)
+        if self.pending is not None:
+            self.pending.result()
+
+        model_weights = self.model.get_weights()
+        optimizer_weights = [variable.numpy() for variable in self._optimizer_variables(self.model.optimizer)]
+        self.pending = self.executor.submit(self._write, model_weights, optimizer_weights,
+                                            completed_epochs, self.global_step)
+
+    def _write(self, model_weights, optimizer_weights, completed_epochs, global_step):
+        try:
+            os.makedirs(self.checkpoint_dir, exist_ok=True)
+            name = f"ckpt_epoch_{completed_epochs:04d}.npz"
+            path = os.path.join(self.checkpoint_dir, name)
+
+            # Grava em um arquivo temporário e renomeia ao final: um checkpoint interrompido nunca
+            # substitui o último checkpoint válido
+            tmp_path = path + ".tmp"
+            arrays = {f"model_{i}": weights for i, weights in enumerate(model_weights)}
+            arrays.update({f"optimizer_{i}": weights for i, weights in enumerate(optimizer_weights)})
+            with open(tmp_path, "wb") as file:
+                np.savez(file, **arrays)
+            os.replace(tmp_path, path)
+
+            state = {
+                "epoch": completed_epochs,
+                "global_step": global_step,
+                "file": name,
+                "num_model_weights": len(model_weights),
+                "num_optimizer_weights": len(optimizer_weights)
+            }
+            tmp_state = os.path.join(self.checkpoint_dir, "latest.json.tmp")
+            with open(tmp_state, "w", encoding="utf-8") as file:
+                json.dump(state, file, indent=2)
+            os.replace(tmp_state, os.path.join(self.checkpoint_dir, "latest.json"))
+
+            self._prune(name)
+        except Exception as e:
+            self.log(f"Erro ao salvar checkpoint: {str(e)}")
+
+    def _prune(self, latest_name):
+        checkpoints = sorted(name for name in os.listdir(self.checkpoint_dir)
+                             if name.startswith("ckpt_epoch_") and name.endswith(".npz"))
+        for name in checkpoints[:-self.keep]:
+            if name != latest_name:
+                os.remove(os.path.join(self.checkpoint_dir, name))
+
+    # ------------------------------------------------------------------------------------------------
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.current_epoch = epoch
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.global_step += 1
+        # Checkpoint no meio da época: a retomada recomeça a época atual a partir destes pesos
+        if self.every_steps and self.global_step % self.every_steps == 0:
+            self._snapshot(self.current_epoch)
+
+    def on_epoch_end(self, epoch, logs=None):
+        if self.every_epochs and (epoch + 1) % self.every_epochs == 0:
+            self._snapshot(epoch + 1)
+            self.log(f"Checkpoint da época {epoch + 1} agendado")
+
+    def on_train_end(self, logs=None):
+        # Aguarda a gravação pendente antes de encerrar o treinamento
+        self.executor.shutdown(wait=True)
+
+    # ------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def latest_state(log_path):
+        """ Retorna o estado do checkpoint mais recente da execução (ou None, se não houver) """
+        state_path = os.path.join(log_path, "checkpoints", "latest.json")
+        if not os.path.exists(state_path):
+            return None
+        with open(state_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    @staticmethod
+    def restore(model, log_path):
+        """
+        Restaura os pesos da rede e o estado do otimizador (a rede já deve estar compilada com o mesmo
+        otimizador). Retorna o estado do checkpoint, cujo campo 'epoch' indica a época inicial da retomada.
+        """
+        state = AsyncCheckpoint.latest_state(log_path)
+        if state is None:
+            raise FileNotFoundError(f"Nenhum checkpoint encontrado em {log_path}")
+
+        with np.load(os.path.join(log_path, "checkpoints", state["file"])) as arrays:
+            model_weights = [arrays[f"model_{i}"] for i in range(state["num_model_weights"])]
+            optimizer_weights = [arrays[f"optimizer_{i}"] for i in range(state["num_optimizer_weights"])]
+
+        model.set_weights(model_weights)
+
+        # As variáveis do otimizador (momentos) são criadas apenas no primeiro passo; aqui elas são criadas
+        # antecipadamente para receber os valores salvos
+        # (com precisão mista, as variáveis pertencem ao otimizador interno do LossScaleOptimizer)
+        optimizer = model.optimizer
+        getattr(optimizer, "inner_optimizer", optimizer)._create_all_weights(model.trainable_variables)
+        variables = AsyncCheckpoint._optimizer_variables(optimizer)
+        if len(variables) != len(optimizer_weights):
+            raise ValueError("O estado do otimizador salvo não corresponde ao otimizador atual")
+        for variable, value in zip(variables, optimizer_weights):
+            variable.assign(value)
+
+        return state
@@ -0,0 +1,285 @@
+import math
+
+import tensorflow as tf
+
+# Configurações pré-definidas do aumento de dados (parâmetros do BatchAugmentation)
+PRESETS = {
+    "light": {"flip": True, "crop_scale": 0.5},
+    "strong": {"flip": True, "crop_scale": 0.08, "color_jitter": 0.4, "randaugment_ops": 2,
+               "randaugment_magnitude": 0.5}
+}
+
+# Operações do RandAugment simplificado (índice sorteado por imagem)
+COLOR_OPS = ("identity", "auto_contrast", "posterize", "solarize", "color", "contrast", "brightness", "sharpness")
+GEOMETRIC_OPS = ("rotate", "shear_x", "shear_y", "translate_x", "translate_y")
+
+
+# A classe aplica o aumento de dados sobre lotes inteiros do tf.data, com operações vetorizadas do TensorFlow.
+#
+# O ImageDataGenerator aumenta uma imagem por vez em NumPy, do lado do Python, o que não acompanha a vazão
+# exigida pelo treinamento de ViTs (que dependem de aumento de dados intenso). Aqui cada transformação é
+# sorteada por imagem, mas calculada para o lote todo em uma única operação do grafo, executada em paralelo ao
+# treinamento (map + prefetch do tf.data):
+#   * flip - espelhamento horizontal
+#   * crop_scale - recorte aleatório redimensionado (área mínima crop_scale da imagem, crop_and_resize)
+#   * color_jitter - variação de brilho, contraste e saturação (intensidade máxima)
+#   * randaugment_ops - RandAugment simplificado: N operações sorteadas por imagem, com intensidade
+#     randaugment_magnitude (0 a 1); as operações geométricas usam uma única transformação projetiva por lote
+#   * mixup_alpha / cutmix_alpha - Mixup e CutMix entre as imagens do lote, combinando também os rótulos
+#     one-hot (com os dois ativos, cada imagem usa um deles, sorteado)
+#
+# obs: As imagens devem estar normalizadas entre 0 e 1 (pipeline do DataPipeline); o conjunto de validação
+# não é aumentado.
+class BatchAugmentation:
+
+    def __init__(self, flip=True, crop_scale=None, color_jitter=0.0, randaugment_ops=0, randaugment_magnitude=0.5,
+                 mixup_alpha=0.0, cutmix_alpha=0.0):
+        self.flip = flip
+        self.crop_scale = crop_scale
+        self.color_jitter = color_jitter
+        self.randaugment_ops = randaugment_ops
+        self.randaugment_magnitude = randaugment_magnitude
+        self.mixup_alpha = mixup_alpha
+        self.cutmix_alpha = cutmix_alpha
+
+    @staticmethod
+    def from_preset(preset=None, mixup_alpha=0.0, cutmix_alpha=0.0):
+        """ Cria o aumento a partir de uma configuração pré-definida ('light' ou 'strong'); None retorna None """
+        if not preset and not mixup_alpha and not cutmix_alpha:
+            return None
+        if preset and preset not in PRESETS:
+            raise ValueError(f"Aumento de dados desconhecido: {preset} (opções: {', '.join(PRESETS)})")
+        options = dict(PRESETS[preset]) if preset else {"flip": False}
+        return BatchAugmentation(mixup_alpha=mixup_alpha, cutmix_alpha=cutmix_alpha, **options)
+
+    def describe(self):
+        parts = []
+        if self.flip:
+            parts.append("flip")
+        if self.crop_scale:
+            parts.append(f"recorte (área mínima {self.crop_scale})")
+        if self.color_jitter:
+            parts.append(f"cor ({self.color_jitter})")
+        if self.randaugment_ops:
+            parts.append(f"RandAugment ({self.randaugment_ops} ops, intensidade {self.randaugment_magnitude})")
+        if self.mixup_alpha:
+            parts.append(f"Mixup (alpha {self.mixup_alpha})")
+        if self.cutmix_alpha:
+            parts.append(f"CutMix (alpha {self.cutmix_alpha})")
+        return ", ".join(parts)
+
+    def apply(self, dataset):
+        """ Acrescenta o aumento ao final do pipeline de treino (lotes de imagens e rótulos one-hot) """
+        return dataset.map(self.augment, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+
+    def augment(self, images, labels):
+        images = tf.cast(images, tf.float32)
+        labels = tf.cast(labels, tf.float32)
+
+        if self.crop_scale:
+            images = self.random_resized_crop(images, self.crop_scale)
+        if self.flip:
+            images = self.random_flip(images)
+        if self.color_jitter:
+            images = self.random_color_jitter(images, self.color_jitter)
+        for _ in range(self.randaugment_ops):
+            images = self.rand_augment(images, self.randaugment_magnitude)
+        if self.mixup_alpha or self.cutmix_alpha:
+            images, labels = self.mix(images, labels)
+
+        return tf.clip_by_value(images, 0.0, 1.0), labels
+
+    # ------------------------------------------------------------------------------------------------
+    # Transformações básicas
+
+    @staticmethod
+    def _uniform(batch_size, low, high):
+        """ Um valor aleatório por imagem, no formato (lote, 1, 1, 1) """
+        return tf.random.uniform((batch_size, 1, 1, 1), low, high)
+
+    @staticmethod
+    def random_flip(images):
+        mask = tf.random.uniform((tf.shape(images)[0], 1, 1, 1)) < 0.5
+        return tf.where(mask, tf.reverse(images, axis=[2]), images)
+
+    @staticmethod
+    def random_resized_crop(images, min_scale, ratio=(3 / 4, 4 / 3)):
+        """ Recorte com área e proporção aleatórias, redimensionado ao tamanho original (um crop_and_resize) """
+        batch_size = tf.shape(images)[0]
+        scale = tf.random.uniform((batch_size,), min_scale, 1.0)
+        log_ratio = tf.random.uniform((batch_size,), math.log(ratio[0]), math.log(ratio[1]))
+
+        # Altura e largura do recorte como fração da imagem
+        height = tf.minimum(tf.sqrt(scale / tf.exp(log_ratio)), 1.0)
+        width = tf.minimum(tf.sqrt(scale * tf.exp(log_ratio)), 1.0)
+        top = tf.random.uniform((batch_size,)) * (1.0 - height)
+        left = tf.random.uniform((batch_size,)) * (1.0 - width)
+
+        boxes = tf.stack([top, left, top + height, left + width], axis=1)
+        return tf.image.crop_and_resize(images, boxes, tf.range(batch_size), tf.shape(images)[1:3])
+
+    @staticmethod
+    def _grayscale(images):
+        return tf.image.rgb_to_grayscale(images)
+
+    @staticmethod
+    def random_color_jitter(images, strength):
+        batch_size = tf.shape(images)[0]
+
+        images = images * BatchAugmentation._uniform(batch_size, 1 - strength, 1 + strength)
+
+        mean = tf.reduce_mean(images, axis=[1, 2, 3], keepdims=True)
+        images = (images - mean) * BatchAugmentation._uniform(batch_size, 1 - strength, 1 + strength) + mean
+
+        gray = BatchAugmentation._grayscale(images)
+        images = (images - gray) * BatchAugmentation._uniform(batch_size, 1 - strength, 1 + strength) + gray
+
+        return tf.clip_by_value(images, 0.0, 1.0)
+
+    # ------------------------------------------------------------------------------------------------
+    # RandAugment simplificado
+
+    @staticmethod
+    def _color_op(name, images, magnitude):
+        """ Operação de cor com intensidade fixa, calculada para o lote todo """
+        if name == "identity":
+            return images
+        if name == "auto_contrast":
+            low = tf.reduce_min(images, axis=[1, 2], keepdims=True)
+            high = tf.reduce_max(images, axis=[1, 2], keepdims=True)
+            return tf.where(high > low, (images - low) / tf.maximum(high - low, 1e-6), images)
+        if name == "posterize":
+            levels = 2.0 ** (8 - int(round(4 * magnitude)))
+            return tf.floor(images * (levels - 1) + 0.5) / (levels - 1)
+        if name == "solarize":
+            threshold = 1.0 - magnitude
+            return tf.where(images >= threshold, 1.0 - images, images)
+        if name == "color":
+            gray = BatchAugmentation._grayscale(images)
+            return gray + (images - gray) * (1.0 + 0.9 * magnitude)
+        if name == "contrast":
+            mean = tf.reduce_mean(BatchAugmentation._grayscale(images), axis=[1, 2, 3], keepdims=True)
+            return mean + (images - mean) * (1.0 + 0.9 * magnitude)
+        if name == "brightness":
+            return images * (1.0 + 0.9 * magnitude)
+        if name == "sharpness":
+            # Diferença em relação à imagem suavizada (filtro 3x3 por canal)
+            kernel = tf.constant([[1, 1, 1], [1, 5, 1], [1, 1, 1]], tf.float32) / 13.0
+            kernel = tf.tile(kernel[:, :, None, None], [1, 1, 3, 1])
+            blurred = tf.nn.depthwise_conv2d(images, kernel, strides=[1, 1, 1, 1], padding="SAME")
+            return images + (images - blurred) * 0.9 * magnitude
+        raise ValueError(name)
+
+    @staticmethod
+    def _geometric_transforms(op_index, magnitude, height, width):
+        """
+        Matrizes (formato do ImageProjectiveTransform: a0, a1, a2, b0, b1, b2, c0, c1) de cada imagem, conforme
+        a operação sorteada; imagens com operações de cor recebem a identidade
+        """
+        batch_size = tf.shape(op_index)[0]
+        sign = tf.where(tf.random.uniform((batch_size,)) < 0.5, -1.0, 1.0)
+        zeros = tf.zeros((batch_size,))
+        ones = tf.ones((batch_size,))
+        height = tf.cast(height, tf.float32)
+        width = tf.cast(width, tf.float32)
+
+        angle = sign * magnitude * 30.0 * math.pi / 180.0
+        cos, sin = tf.cos(angle), tf.sin(angle)
+        shear = sign * magnitude * 0.3
+        shift = sign * magnitude * 0.3
+
+        transforms = {
+            # Rotação em torno do centro da imagem
+            "rotate": [cos, -sin, ((width - 1) - (cos * (width - 1) - sin * (height - 1))) / 2,
+                       sin, cos, ((height - 1) - (sin * (width - 1) + cos * (height - 1))) / 2, zeros, zeros],
+            "shear_x": [ones, shear, -shear * (height - 1) / 2, zeros, ones, zeros, zeros, zeros],
+            "shear_y": [ones, zeros, zeros, shear, ones, -shear * (width - 1) / 2, zeros, zeros],
+            "translate_x": [ones, zeros, -shift * width, zeros, ones, zeros, zeros, zeros],
+            "translate_y": [ones, zeros, zeros, zeros, ones, -shift * height, zeros, zeros]
+        }
+
+        matrix = tf.stack([ones, zeros, zeros, zeros, ones, zeros, zeros, zeros], axis=1)
+        for offset, name in enumerate(GEOMETRIC_OPS):
+            selected = tf.equal(op_index, len(COLOR_OPS) + offset)[:, None]
+            matrix = tf.where(selected, tf.stack(transforms[name], axis=1), matrix)
+        return matrix
+
+    @staticmethod
+    def rand_augment(images, magnitude):
+        """ Aplica a cada imagem uma operação sorteada (uma camada do RandAugment) """
+        batch_size = tf.shape(images)[0]
+        op_index = tf.random.uniform((batch_size,), 0, len(COLOR_OPS) + len(GEOMETRIC_OPS), dtype=tf.int32)
+
+        # Operações de cor: calculadas para o lote e selecionadas por imagem
+        augmented = images
+        for index, name in enumerate(COLOR_OPS[1:], start=1):
+            selected = tf.equal(op_index, index)[:, None, None, None]
+            augmented = tf.where(selected, BatchAugmentation._color_op(name, images, magnitude), augmented)
+        augmented = tf.clip_by_value(augmented, 0.0, 1.0)
+
+        # Operações geométricas: uma única transformação projetiva com a matriz de cada imagem
+        height, width = tf.shape(images)[1], tf.shape(images)[2]
+        transforms = BatchAugmentation._geometric_transforms(op_index, magnitude, height, width)
+        return tf.raw_ops.ImageProjectiveTransformV3(images=augmented,
+                                                     transforms=transforms,
+                                                     output_shape=tf.shape(images)[1:3],
+                                                     fill_value=0.5,
+                                                     interpolation="BILINEAR",
+                                                     fill_mode="CONSTANT")
+
+    # ------------------------------------------------------------------------------------------------
+    # Mixup e CutMix
+
+    @staticmethod
+    def _beta(batch_size, alpha):
+        """ Amostras da distribuição Beta(alpha, alpha), obtidas de duas distribuições Gamma """
+        first = tf.random.gamma((batch_size,), alpha)
+        second = tf.random.gamma((batch_size,), alpha)
+        return first / (first + second)
+
+    def mix(self, images, labels):
+        """ Combina cada imagem (e seu rótulo) com outra imagem do lote, por Mixup ou CutMix """
+        batch_size = tf.shape(images)[0]
+        height, width = tf.shape(images)[1], tf.shape(images)[2]
+        partner = tf.random.shuffle(tf.range(batch_size))
+        partner_images = tf.gather(images, partner)
+        partner_labels = tf.gather(labels, partner)
+
+        mixed_images, mixed_labels = images, labels
+
+        if self.mixup_alpha:
+            lam = self._beta(batch_size, self.mixup_alpha)
+            mixup_images = lam[:, None, None, None] * images + (1 - lam[:, None, None, None]) * partner_images
+            mixup_labels = lam[:, None] * labels + (1 - lam[:, None]) * partner_labels
+            mixed_images, mixed_labels = mixup_images, mixup_labels
+
+        if self.cutmix_alpha:
+            # Retângulo com área (1 - lam) da imagem, centro sorteado e recortado nas bordas
+            lam = self._beta(batch_size, self.cutmix_alpha)
+            h, w = tf.cast(height, tf.float32), tf.cast(width, tf.float32)
+            cut = tf.sqrt(1.0 - lam)
+            center_y = tf.random.uniform((batch_size,)) * h
+            center_x = tf.random.uniform((batch_size,)) * w
+            top = tf.clip_by_value(center_y - cut * h / 2, 0, h)
+            bottom = tf.clip_by_value(center_y + cut * h / 2, 0, h)
+            left = tf.clip_by_value(center_x - cut * w / 2, 0, w)
+            right = tf.clip_by_value(center_x + cut * w / 2, 0, w)
+
+            rows = tf.cast(tf.range(height), tf.float32)[None, :, None]
+            cols = tf.cast(tf.range(width), tf.float32)[None, None, :]
+            mask = ((rows >= top[:, None, None]) & (rows < bottom[:, None, None]) &
+                    (cols >= left[:, None, None]) & (cols < right[:, None, None]))[..., None]
+            cutmix_images = tf.where(mask, partner_images, images)
+
+            # Proporção real da imagem original, após o recorte nas bordas
+            lam = 1.0 - (bottom - top) * (right - left) / (h * w)
+            cutmix_labels = lam[:, None] * labels + (1 - lam[:, None]) * partner_labels
+
+            if self.mixup_alpha:
+                use_cutmix = tf.random.uniform((batch_size,)) < 0.5
+                mixed_images = tf.where(use_cutmix[:, None, None, None], cutmix_images, mixed_images)
+                mixed_labels = tf.where(use_cutmix[:, None], cutmix_labels, mixed_labels)
+            else:
+                mixed_images, mixed_labels = cutmix_images, cutmix_labels
+
+        return mixed_images, mixed_labels
@@ -0,0 +1,388 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from ImageCache import ImageCache
+from Model import Model
+from ModelCreator import ModelCreator
+from PatchEmbedding import PatchEmbedding
+from PatchEncoder import PatchEncoder
+from PatchExtractor import PatchExtractor
+from SplitManifest import SplitManifest
+
+# Grade padrão do benchmark (cada lista é percorrida em todas as combinações)
+DEFAULT_GRID = {
+    "input_sizes": [128, 224],
+    "patch_sizes": [16],
+    "projection_dims": [64],
+    "num_heads": [4],
+    "batch_sizes": [32],
+    "attentions": ["keras", "chunked"],
+    "patch_embeddings": ["extractor", "fused"],
+    "loaders": ["tfdata", "cache", "generator"]
+}
+
+# Parâmetros fixos da rede nos casos do benchmark
+TRANSFORMER_LAYERS = 8
+MLP_UNITS = 128
+NUM_CLASSES = 10
+ATTENTION_CHUNK_SIZE = 64
+
+
+# A classe executa um benchmark reprodutível dos trechos mais custosos do treinamento:
+#   * patch_extractor - extração dos patches (forward)
+#   * patch_encoder - projeção + codificação posicional dos patches (forward)
+#   * patch_embedding - imagem → tokens, por PatchExtractor + PatchEncoder ('extractor') ou pela camada
+#     convolucional PatchEmbedding ('fused') (forward)
+#   * transformer_block - um bloco Transformer Encoder, com a MultiHeadAttention do Keras ('keras') ou a
+#     ChunkedAttention ('chunked') (forward + backward)
+#   * train_step - passo completo de treinamento do vit_classifier, em cada combinação de atenção e patch
+#     embedding (train_on_batch: forward, backward e Adam)
+#   * loader - leitura de um diretório sintético de imagens por cada carregador de dados (ver Model.load_data)
+#
+# Cada caso é medido em todas as combinações da grade (input size, patch size, projection dim, cabeças,
+# batch size, atenção e patch embedding). O resultado é salvo em JSON e pode ser comparado com um baseline
+# salvo anteriormente (--baseline): casos cujo tempo mediano piorou além da tolerância são apontados como
+# regressões. As variantes fazem parte da chave de cada caso, então cada implementação é comparada com ela
+# mesma.
+#
+# obs: Os valores dependem da máquina. O baseline deve ser gerado (--save-baseline) e comparado no mesmo
+# hardware; por isso nenhum baseline é mantido no repositório.
+#
+# Uso:
+#   python Benchmark.py
+#   python Benchmark.py --input-sizes 224 --batch-sizes 16 32 --save-baseline baseline.json
+#   python Benchmark.py --baseline baseline.json --tolerance 0.1
+class Benchmark:
+
+    def __init__(self, steps=20, warmup=3, seed=42, log=print):
+        self.steps = steps  # repetições medidas em cada caso
+        self.warmup = warmup  # repetições descartadas (tracing, compilação e aquecimento de caches)
+        self.seed = seed
+        self.log = log
+
+    @staticmethod
+    def summarize(times, batch_size):
+        """ Estatísticas das medições (em milissegundos por lote) e vazão em imagens por segundo """
+        times_ms = np.asarray(times) * 1000
+        median = float(np.median(times_ms))
+        return {
+            "median_ms": median,
+            "p90_ms": float(np.percentile(times_ms, 90)),
+            "mean_ms": float(times_ms.mean()),
+            "min_ms": float(times_ms.min()),
+            "images_per_sec": batch_size * 1000 / median if median else None
+        }
+
+    def time_fn(self, fn, batch_size):
+        """
+        Mede o tempo de cada chamada de fn. fn deve retornar um tensor pequeno (ex: um escalar), cuja leitura
+        força a sincronização com a execução assíncrona do runtime sem copiar tensores grandes.
+        """
+        for _ in range(self.warmup):
+            fn().numpy()
+
+        times = []
+        for _ in range(self.steps):
+            start = time.perf_counter()
+            fn().numpy()
+            times.append(time.perf_counter() - start)
+        return self.summarize(times, batch_size)
+
+    # ------------------------------------------------------------------------------------------------
+    # Casos do modelo
+
+    def _images(self, batch_size, input_size):
+        return tf.random.stateless_uniform((batch_size, input_size, input_size, 3), seed=(self.seed, 0))
+
+    def bench_patch_extractor(self, input_size, patch_size, batch_size):
+        layer = PatchExtractor(patch_size)
+        images = self._images(batch_size, input_size)
+        forward = tf.function(lambda: tf.reduce_mean(layer(images)))
+        return self.time_fn(forward, batch_size)
+
+    def bench_patch_encoder(self, input_size, patch_size, projection_dim, batch_size):
+        num_patches = (input_size // patch_size) ** 2
+        layer = PatchEncoder(num_patches, projection_dim)
+        patches = tf.random.stateless_uniform((batch_size, num_patches, patch_size * patch_size * 3),
+                                              seed=(self.seed, 1))
+        forward = tf.function(lambda: tf.reduce_mean(layer(patches)))
+        return self.time_fn(forward, batch_size)
+
+    def bench_patch_embedding(self, input_size, patch_size, projection_dim, batch_size, patch_embedding):
+        num_patches = (input_size // patch_size) ** 2
+        if patch_embedding == 'fused':
+            embed = PatchEmbedding(patch_size, num_patches, projection_dim)
+        else:
+            extractor = PatchExtractor(patch_size)
+            encoder = PatchEncoder(num_patches, projection_dim)
+            embed = lambda images: encoder(extractor(images))
+        images = self._images(batch_size, input_size)
+        forward = tf.function(lambda: tf.reduce_mean(embed(images)))
+        return self.time_fn(forward, batch_size)
+
+    def bench_transformer_block(self, input_size, patch_size, projection_dim, num_heads, batch_size,
+                                attention='keras'):
+        num_patches = (input_size // patch_size) ** 2
+        creator = ModelCreator(projection_dim=projection_dim, num_heads=num_heads, mlp_units=MLP_UNITS,
+                               attention=attention, attention_chunk_size=ATTENTION_CHUNK_SIZE)
+        inputs = tf.keras.layers.Input(shape=(num_patches, projection_dim))
+        block = tf.keras.Model(inputs, creator.transformer_block(inputs))
+
+        tokens = tf.random.stateless_normal((batch_size, num_patches, projection_dim), seed=(self.seed, 2))
+
+        @tf.function
+        def forward_backward():
+            with tf.GradientTape() as tape:
+                loss = tf.reduce_mean(tf.square(block(tokens, training=True)))
+            gradients = tape.gradient(loss, block.trainable_variables)
+            # Os gradientes fazem parte do retorno, garantindo que o backward não seja removido do grafo
+            return tf.add_n([tf.reduce_sum(gradient) for gradient in gradients])
+
+        return self.time_fn(forward_backward, batch_size)
+
+    def bench_train_step(self, input_size, patch_size, projection_dim, num_heads, batch_size, attention='keras',
+                         patch_embedding='extractor'):
+        num_patches = (input_size // patch_size) ** 2
+        creator = ModelCreator((input_size, input_size, 3), patch_size, num_patches, projection_dim,
+                               TRANSFORMER_LAYERS, num_heads, MLP_UNITS, NUM_CLASSES,
+                               patch_embedding=patch_embedding, attention=attention,
+                               attention_chunk_size=ATTENTION_CHUNK_SIZE)
+        model = creator.vit_classifier()
+        # Mesmo otimizador e função de custo do Trainer
+        model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=1e-4),
+                      loss=tf.keras.losses.CategoricalCrossentropy(from_logits=True))
+
+        images = self._images(batch_size, input_size)
+        labels = tf.one_hot(tf.random.stateless_uniform((batch_size,), seed=(self.seed, 3), maxval=NUM_CLASSES,
+                                                        dtype=tf.int32), NUM_CLASSES)
+
+        def step():
+            # O train_on_batch retorna a perda já lida do runtime (sincronizado)
+            return tf.constant(model.train_on_batch(images, labels))
+
+        result = self.time_fn(step, batch_size)
+        result["parameters"] = model.count_params()
+        return result
+
+    # ------------------------------------------------------------------------------------------------
+    # Carregadores de dados
+
+    @staticmethod
+    def synthetic_dataset(root, num_classes=4, images_per_class=128, image_size=256, seed=42):
+        """ Cria um diretório de imagens JPEG aleatórias (uma subpasta por classe) """
+        from PIL import Image
+
+        rng = np.random.default_rng(seed)
+        for class_index in range(num_classes):
+            class_dir = os.path.join(root, f"classe_{class_index}")
+            os.makedirs(class_dir, exist_ok=True)
+            for image_index in range(images_per_class):
+                pixels = rng.integers(0, 256, (image_size, image_size, 3), dtype=np.uint8)
+                Image.fromarray(pixels).save(os.path.join(class_dir, f"{image_index:05d}.jpg"), quality=90)
+        return root
+
+    def bench_loader(self, dataset_path, loader, input_size, batch_size):
+        """ Tempo de preparação (load_data) e tempo por lote ao percorrer uma época do conjunto de treino """
+        manifest = SplitManifest.build(dataset_path, 0.2, self.seed)
+
+        start = time.perf_counter()
+        train_data = Model.load_data(dataset_path, (input_size, input_size), batch_size, 0.2, loader, manifest)[0]
+        setup_time = time.perf_counter() - start
+
+        times = []
+        if isinstance(train_data, tf.data.Dataset):
+            iterator = iter(train_data)
+            while True:
+                start = time.perf_counter()
+                try:
+                    next(iterator)
+                except StopIteration:
+                    break
+                times.append(time.perf_counter() - start)
+        else:
+            for index in range(len(train_data)):
+                start = time.perf_counter()
+                train_data[index]
+                times.append(time.perf_counter() - start)
+
+        result = self.summarize(times, batch_size)
+        result.update({"setup_s": setup_time, "epoch_s": float(np.sum(times)), "batches": len(times)})
+        return result
+
+    # ------------------------------------------------------------------------------------------------
+
+    def run(self, grid, loader_images=512):
+        """ Executa todos os casos da grade e retorna a lista de resultados """
+        results = []
+        seen = set()
+
+        def record(case, params, fn):
+            key = case + "|" + ",".join(f"{name}={value}" for name, value in sorted(params.items()))
+            # Casos que não dependem de todos os parâmetros da grade são medidos uma única vez
+            if key in seen:
+                return
+            seen.add(key)
+            try:
+                result = fn()
+            except Exception as e:
+                self.log(f"[{key}] falhou: {str(e).splitlines()[0]}")
+                result = {"error": str(e)}
+            else:
+                self.log(f"[{key}] mediana {result['median_ms']:.2f} ms | "
+                         f"{result['images_per_sec']:.1f} imagens/s")
+            results.append({"key": key, "case": case, "params": params, **result})
+
+        for input_size, patch_size, projection_dim, num_heads, batch_size in itertools.product(
+                grid["input_sizes"], grid["patch_sizes"], grid["projection_dims"], grid["num_heads"],
+                grid["batch_sizes"]):
+            if input_size % patch_size:
+                self.log(f"input size {input_size} não é múltiplo do patch size {patch_size}; ignorado")
+                continue
+
+            record("patch_extractor", {"input_size": input_size, "patch_size": patch_size, "batch_size": batch_size},
+                   lambda: self.bench_patch_extractor(input_size, patch_size, batch_size))
+            record("patch_encoder", {"input_size": input_size, "patch_size": patch_size,
+                                     "projection_dim": projection_dim, "batch_size": batch_size},
+                   lambda: self.bench_patch_encoder(input_size, patch_size, projection_dim, batch_size))
+            for patch_embedding in grid["patch_embeddings"]:
+                record("patch_embedding", {"input_size": input_size, "patch_size": patch_size,
+                                           "projection_dim": projection_dim, "batch_size": batch_size,
+                                           "patch_embedding": patch_embedding},
+                       lambda: self.bench_patch_embedding(input_size, patch_size, projection_dim, batch_size,
+                                                          patch_embedding))
+
+            params = {"input_size": input_size, "patch_size": patch_size, "projection_dim": projection_dim,
+                      "num_heads": num_heads, "batch_size": batch_size}
+            for attention in grid["attentions"]:
+                record("transformer_block", {**params, "attention": attention},
+                       lambda: self.bench_transformer_block(input_size, patch_size, projection_dim, num_heads,
+                                                            batch_size, attention))
+                for patch_embedding in grid["patch_embeddings"]:
+                    record("train_step", {**params, "attention": attention, "patch_embedding": patch_embedding},
+                           lambda: self.bench_train_step(input_size, patch_size, projection_dim, num_heads,
+                                                         batch_size, attention, patch_embedding))
+
+        if grid["loaders"]:
+            dataset_path = tempfile.mkdtemp(prefix="vit_benchmark_")
+            try:
+                num_classes = 4
+                self.synthetic_dataset(dataset_path, num_classes, max(loader_images // num_classes, 1),
+                                       seed=self.seed)
+                for loader, input_size, batch_size in itertools.product(grid["loaders"], grid["input_sizes"],
+                                                                        grid["batch_sizes"]):
+                    record("loader", {"loader": loader, "input_size": input_size, "batch_size": batch_size,
+                                      "images": loader_images},
+                           lambda: self.bench_loader(dataset_path, loader, input_size, batch_size))
+            finally:
+                # Remove o diretório sintético e os caches de imagens gerados para ele
+                for input_size in grid["input_sizes"]:
+                    shutil.rmtree(ImageCache(dataset_path, (input_size, input_size)).cache_dir, ignore_errors=True)
+                shutil.rmtree(dataset_path, ignore_errors=True)
+
+        return results
+
+    @staticmethod
+    def environment():
+        return {
+            "tensorflow": tf.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "gpus": len(tf.config.list_physical_devices('GPU'))
+        }
+
+    @staticmethod
+    def compare(results, baseline, tolerance=0.1):
+        """
+        Compara o tempo mediano de cada caso com o baseline. Retorna a lista de regressões (casos em que o
+        tempo cresceu mais que a tolerância, ex: 0.1 = 10%).
+        """
+        baseline_times = {result["key"]: result["median_ms"] for result in baseline["results"]
+                          if "median_ms" in result}
+        regressions = []
+        for result in results:
+            reference = baseline_times.get(result["key"])
+            if reference is None or "median_ms" not in result:
+                continue
+            ratio = result["median_ms"] / reference
+            result["baseline_median_ms"] = reference
+            result["ratio_vs_baseline"] = ratio
+            if ratio > 1 + tolerance:
+                regressions.append({"key": result["key"], "median_ms": result["median_ms"],
+                                    "baseline_median_ms": reference, "ratio": ratio})
+        return regressions
+
+    @staticmethod
+    def main(argv=None):
+        parser = argparse.ArgumentParser(description="Benchmark dos blocos da Vision Transformer e do treinamento")
+        parser.add_argument("--input-sizes", type=int, nargs="+", default=DEFAULT_GRID["input_sizes"])
+        parser.add_argument("--patch-sizes", type=int, nargs="+", default=DEFAULT_GRID["patch_sizes"])
+        parser.add_argument("--projection-dims", type=int, nargs="+", default=DEFAULT_GRID["projection_dims"])
+        parser.add_argument("--num-heads", type=int, nargs="+", default=DEFAULT_GRID["num_heads"])
+        parser.add_argument("--batch-sizes", type=int, nargs="+", default=DEFAULT_GRID["batch_sizes"])
+        parser.add_argument("--attentions", nargs="+", default=DEFAULT_GRID["attentions"],
+                            choices=["keras", "chunked"], help="implementações da atenção medidas")
+        parser.add_argument("--patch-embeddings", nargs="+", default=DEFAULT_GRID["patch_embeddings"],
+                            choices=["extractor", "fused"], help="formas de patch embedding medidas")
+        parser.add_argument("--loaders", nargs="*", default=DEFAULT_GRID["loaders"],
+                            choices=["generator", "tfdata", "cache"], help="carregadores medidos (vazio desativa)")
+        parser.add_argument("--loader-images", type=int, default=512, help="imagens do diretório sintético")
+        parser.add_argument("--steps", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument("--output", help="arquivo JSON de saída (padrão: logs/benchmarks/<data>.json)")
+        parser.add_argument("--baseline", help="resultado anterior usado na comparação")
+        parser.add_argument("--tolerance", type=float, default=0.1, help="piora tolerada no tempo mediano")
+        parser.add_argument("--save-baseline", help="salva também o resultado como baseline neste arquivo")
+        args = parser.parse_args(argv)
+
+        grid = {
+            "input_sizes": args.input_sizes,
+            "patch_sizes": args.patch_sizes,
+            "projection_dims": args.projection_dims,
+            "num_heads": args.num_heads,
+            "batch_sizes": args.batch_sizes,
+            "attentions": args.attentions,
+            "patch_embeddings": args.patch_embeddings,
+            "loaders": args.loaders
+        }
+        benchmark = Benchmark(args.steps, args.warmup)
+        results = benchmark.run(grid, args.loader_images)
+
+        report = {"environment": Benchmark.environment(), "grid": grid, "steps": args.steps,
+                  "warmup": args.warmup, "results": results}
+
+        regressions = []
+        if args.baseline:
+            with open(args.baseline, "r", encoding="utf-8") as file:
+                regressions = Benchmark.compare(results, json.load(file), args.tolerance)
+            report["baseline"] = args.baseline
+            report["regressions"] = regressions
+            for regression in regressions:
+                print(f"REGRESSÃO [{regression['key']}]: {regression['median_ms']:.2f} ms "
+                      f"(baseline {regression['baseline_median_ms']:.2f} ms, {regression['ratio']:.2f}x)")
+
+        output = args.output or os.path.join("logs", "benchmarks", time.strftime("%Y%m%d_%H%M%S") + ".json")
+        for path in filter(None, [output, args.save_baseline]):
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=2)
+        print(f"Resultados salvos em {output}")
+
+        # Código de saída diferente de zero quando há regressões (uso em scripts de integração)
+        return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(Benchmark.main())
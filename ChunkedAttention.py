@@ -0,0 +1,161 @@
+import tensorflow as tf
+from tensorflow.keras import layers
+
+
+# A classe implementa a atenção multi-cabeça (multi-head self-attention) calculada em blocos (chunks).
+#
+# A atenção padrão calcula, para cada cabeça, a matriz completa de scores QKᵀ de shape
+# (num_patches, num_patches) antes do softmax. Com patches pequenos ou imagens grandes essa matriz domina
+# o consumo de memória. Aqui as queries e as keys são percorridas em blocos de chunk_size e o softmax é
+# calculado de forma incremental ("running softmax"): para cada bloco de queries são mantidos o máximo
+# parcial dos scores (m), a soma parcial das exponenciais (l) e o acumulador da saída (acc). Ao processar
+# um novo bloco de keys, os valores anteriores são corrigidos pelo fator exp(m_antigo - m_novo), de forma
+# que o resultado final é exatamente softmax(QKᵀ / √d)·V, sem nunca alocar a matriz completa.
+#
+# No treinamento, a economia também vale para o backward: o cálculo de cada bloco de queries é envolvido por
+# tf.recompute_grad, então os scores e pesos são recalculados no backward em vez de guardados. Os blocos são
+# percorridos com tf.map_fn (queries) e tf.while_loop (keys), e os tokens são completados até um múltiplo de
+# chunk_size (as keys de preenchimento são mascaradas).
+#
+# obs: A interface segue a do layers.MultiHeadAttention: a camada é chamada como attention(query, value).
+class ChunkedAttention(layers.Layer):
+
+    # Contrutor da classe
+    # obs: num_heads é o número de cabeças de atenção
+    # obs2: key_dim é a dimensão de cada cabeça (ex: projection_dim // num_heads)
+    # obs3: chunk_size é o número de queries/keys processadas por bloco
+    def __init__(self, num_heads, key_dim, dropout=0.0, chunk_size=64, **kwargs):
+        super(ChunkedAttention, self).__init__(**kwargs)
+
+        self.num_heads = num_heads
+        self.key_dim = key_dim
+        self.dropout = dropout
+        self.chunk_size = chunk_size
+
+    def build(self, input_shape):
+        # Em self-attention query e value têm a mesma dimensão; a saída volta a essa dimensão
+        output_dim = input_shape[-1]
+
+        # Projeções de query, key e value para todas as cabeças de uma vez (num_heads × key_dim)
+        self.query_dense = layers.Dense(self.num_heads * self.key_dim, name='query')
+        self.key_dense = layers.Dense(self.num_heads * self.key_dim, name='key')
+        self.value_dense = layers.Dense(self.num_heads * self.key_dim, name='value')
+        self.output_dense = layers.Dense(output_dim, name='attention_output')
+
+        super(ChunkedAttention, self).build(input_shape)
+
+    def _split_heads(self, x):
+        # (batch_size, tokens, num_heads × key_dim) → (batch_size, num_heads, tokens, key_dim)
+        x = tf.reshape(x, [tf.shape(x)[0], -1, self.num_heads, self.key_dim])
+        return tf.transpose(x, [0, 2, 1, 3])
+
+    def _attend_chunk(self, q_chunk, k_chunks, v_chunks, key_bias, seed, dropout):
+        """
+        Atenção de um bloco de queries sobre todos os blocos de keys, com o softmax incremental.
+        q_chunk: (batch_size, num_heads, chunk, key_dim); k_chunks e v_chunks: (blocos, batch_size, num_heads,
+        chunk, key_dim); key_bias: (blocos, chunk), -1e9 nas keys de preenchimento.
+        """
+        num_key_chunks = tf.shape(k_chunks)[0]
+
+        def body(index, running_max, running_sum, accumulator):
+            # Scores apenas do bloco atual: (batch_size, num_heads, chunk_q, chunk_k)
+            scores = tf.cast(tf.matmul(q_chunk, k_chunks[index], transpose_b=True), tf.float32) + key_bias[index]
+            new_max = tf.maximum(running_max, tf.reduce_max(scores, axis=-1, keepdims=True))
+
+            weights = tf.exp(scores - new_max)
+            chunk_sum = tf.reduce_sum(weights, axis=-1, keepdims=True)
+
+            # O dropout é aplicado antes da normalização; como a normalização é apenas uma divisão por l, o
+            # resultado é equivalente ao dropout sobre as probabilidades da atenção padrão. A máscara é
+            # sorteada de forma determinística (stateless) para ser idêntica no recálculo do backward
+            if dropout:
+                keep = tf.random.stateless_uniform(tf.shape(weights), seed=seed + tf.stack([0, index]))
+                weights = tf.where(keep >= self.dropout, weights / (1.0 - self.dropout), 0.0)
+
+            chunk_output = tf.cast(tf.matmul(tf.cast(weights, v_chunks.dtype), v_chunks[index]), tf.float32)
+
+            # Corrige as somas anteriores para o novo máximo
+            correction = tf.exp(running_max - new_max)
+            return (index + 1,
+                    new_max,
+                    running_sum * correction + chunk_sum,
+                    accumulator * correction + chunk_output)
+
+        # Estatísticas do softmax incremental, mantidas em float32 mesmo com precisão mista
+        running_max = tf.fill(tf.shape(q_chunk[..., :1]), -1e30)  # m: máximo parcial dos scores de cada query
+        running_sum = tf.zeros_like(running_max)  # l: soma parcial de exp(score - m)
+        accumulator = tf.zeros(tf.shape(q_chunk), tf.float32)  # acc: soma parcial de exp(score - m) · V
+
+        _, _, running_sum, accumulator = tf.while_loop(
+            lambda index, *_: index < num_key_chunks,
+            body,
+            (tf.constant(0), running_max, running_sum, accumulator)
+        )
+        return accumulator / running_sum
+
+    def _to_chunks(self, x, num_chunks):
+        # (batch_size, num_heads, tokens, key_dim) → (blocos, batch_size, num_heads, chunk, key_dim),
+        # completando os tokens com zeros até um múltiplo de chunk_size
+        padding = num_chunks * self.chunk_size - x.shape[2]
+        x = tf.pad(x, [[0, 0], [0, 0], [0, padding], [0, 0]])
+        x = tf.reshape(x, [tf.shape(x)[0], self.num_heads, num_chunks, self.chunk_size, self.key_dim])
+        return tf.transpose(x, [2, 0, 1, 3, 4])
+
+    def call(self, query, value, training=None):
+        num_queries = query.shape[1]
+        num_keys = value.shape[1]
+        if num_queries is None or num_keys is None:
+            raise ValueError("ChunkedAttention exige o número de tokens definido (shape estático)")
+
+        # As queries já são escaladas por 1/√d, como na atenção padrão
+        q = self._split_heads(self.query_dense(query)) * tf.cast(self.key_dim ** -0.5, query.dtype)
+        k = self._split_heads(self.key_dense(value))
+        v = self._split_heads(self.value_dense(value))
+
+        num_query_chunks = -(-num_queries // self.chunk_size)
+        num_key_chunks = -(-num_keys // self.chunk_size)
+        q_chunks = self._to_chunks(q, num_query_chunks)
+        k_chunks = self._to_chunks(k, num_key_chunks)
+        v_chunks = self._to_chunks(v, num_key_chunks)
+
+        # As keys de preenchimento recebem score muito negativo (peso zero no softmax)
+        valid_keys = tf.reshape(tf.range(num_key_chunks * self.chunk_size) < num_keys,
+                                [num_key_chunks, self.chunk_size])
+        key_bias = tf.where(valid_keys, 0.0, -1e9)
+
+        dropout = bool(training) and self.dropout > 0
+        seed = tf.random.uniform([2], maxval=2 ** 31 - 1, dtype=tf.int32)
+
+        # O cálculo de cada bloco de queries é refeito no backward (tf.recompute_grad): apenas as entradas
+        # de cada bloco ficam guardadas, em vez dos scores e pesos de todos os pares de blocos (O(n²))
+        attend = tf.recompute_grad(
+            lambda q_chunk, k_all, v_all, bias, chunk_seed: self._attend_chunk(q_chunk, k_all, v_all, bias,
+                                                                                chunk_seed, dropout))
+
+        # Os blocos de queries são percorridos com tf.map_fn (um único laço no grafo, em vez de um
+        # sub-grafo por par de blocos)
+        outputs = tf.map_fn(
+            lambda elems: attend(elems[0], k_chunks, v_chunks, key_bias, seed + tf.stack([elems[1], 0])),
+            (q_chunks, tf.range(num_query_chunks)),
+            fn_output_signature=tf.float32
+        )
+
+        # (blocos, batch_size, num_heads, chunk, key_dim) → (batch_size, tokens, num_heads × key_dim)
+        attention = tf.transpose(outputs, [1, 2, 0, 3, 4])
+        attention = tf.reshape(attention, [tf.shape(attention)[0], self.num_heads,
+                                           num_query_chunks * self.chunk_size, self.key_dim])
+        attention = tf.cast(attention[:, :, :num_queries], query.dtype)
+        attention = tf.transpose(attention, [0, 2, 1, 3])
+        attention = tf.reshape(attention, [tf.shape(attention)[0], num_queries, self.num_heads * self.key_dim])
+
+        return self.output_dense(attention)
+
+    def get_config(self):
+        config = super(ChunkedAttention, self).get_config()
+        config.update({
+            'num_heads': self.num_heads,
+            'key_dim': self.key_dim,
+            'dropout': self.dropout,
+            'chunk_size': self.chunk_size
+        })
+        return config
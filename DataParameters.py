@@ -1,4 +1,5 @@
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox,
+                             QComboBox)
 
 
 class DataParameters(QDialog):
@@ -12,6 +13,7 @@ class DataParameters(QDialog):
         self.input_size = None
         self.batch_size = None
         self.split = None
+        self.loader = None
 
         # Layout principal, organizando verticalmente os widgets na janela
         layout = QVBoxLayout()
@@ -41,6 +43,17 @@ class DataParameters(QDialog):
         h_layout.addWidget(self.split_edit)
         layout.addLayout(h_layout)
 
+        # Carregador de dados: o ImageDataGenerator (padrão) ou o pipeline paralelo tf.data
+        # O texto exibido é associado ao identificador usado pelo Model.load_data
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(QLabel("Carregador de dados:"))
+        self.loader_combo = QComboBox()
+        self.loader_combo.addItem("ImageDataGenerator", 'generator')
+        self.loader_combo.addItem("tf.data (paralelo)", 'tfdata')
+        self.loader_combo.addItem("tf.data + cache em disco", 'cache')
+        h_layout.addWidget(self.loader_combo)
+        layout.addLayout(h_layout)
+
         # Botões OK e Cancel (Análogo à organização do bloco de código referente ao Input_Size)
         button_layout = QHBoxLayout()
         ok_button = QPushButton("OK")
@@ -60,6 +73,7 @@ class DataParameters(QDialog):
             self.input_size = int(self.input_size_edit.text())
             self.batch_size = int(self.batch_size_edit.text())
             self.split = float(self.split_edit.text())
+            self.loader = self.loader_combo.currentData()
 
             # valida o intervalo do split
             if not (0 < self.split < 1):
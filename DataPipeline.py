@@ -0,0 +1,151 @@
+import numpy as np
+import tensorflow as tf
+from PIL import Image
+
+from ImageCache import ImageCache
+
+# Extensões decodificadas dentro do grafo pelo tf.io.decode_image (as demais passam pelo PIL)
+TF_DECODE_PATTERN = r".*\.(jpe?g|png|bmp|gif)"
+
+
+# A classe é responsável por construir o pipeline de entrada baseado em tf.data.
+# Diferente do ImageDataGenerator, que decodifica e redimensiona uma imagem por vez
+# em Python, aqui a leitura dos arquivos, a decodificação, o redimensionamento e a
+# normalização são executados dentro do grafo do TensorFlow, em paralelo, enquanto
+# o modelo treina (batching + prefetch com AUTOTUNE).
+#
+# A lista de arquivos e a divisão entre treino e validação vêm do SplitManifest.
+class DataPipeline:
+
+    @staticmethod
+    def decode_image(path, img_size):
+        """
+        Lê o arquivo e executa, dentro do grafo, a decodificação, o redimensionamento e a normalização
+        dos pixels para a faixa de 0 à 1 (equivalente ao rescale=1.0 / 255 do ImageDataGenerator).
+
+        obs: O tf.io.decode_image suporta apenas JPEG, PNG, BMP e GIF. Os demais formatos aceitos pelo
+        SplitManifest (TIFF, PPM) são decodificados pelo PIL (decode_with_pil), como no ImageDataGenerator.
+        """
+        native = tf.strings.regex_full_match(tf.strings.lower(path), TF_DECODE_PATTERN)
+        return tf.cond(native,
+                       lambda: DataPipeline.preprocess_image(tf.io.read_file(path), img_size),
+                       lambda: DataPipeline.decode_with_pil(path, img_size))
+
+    @staticmethod
+    def decode_with_pil(path, img_size):
+        """ Decodificação pelo PIL (fora do grafo, via numpy_function), com o mesmo pré-processamento """
+        def load(file_path):
+            with Image.open(file_path.decode("utf-8")) as image:
+                # O PIL recebe o tamanho como (largura, altura); interpolação 'nearest', como no resize do grafo
+                image = image.convert("RGB").resize((img_size[1], img_size[0]), Image.NEAREST)
+                return np.asarray(image, dtype=np.uint8)
+
+        image = tf.numpy_function(load, [path], tf.uint8)
+        image.set_shape((img_size[0], img_size[1], 3))
+        return tf.cast(image, tf.float32) / 255.0
+
+    @staticmethod
+    def preprocess_image(raw, img_size):
+        """ Decodifica os bytes de uma imagem (JPEG, PNG, BMP, GIF) e aplica o mesmo pré-processamento """
+        # expand_animations=False garante um tensor 3D mesmo para GIFs e afins
+        image = tf.io.decode_image(raw, channels=3, expand_animations=False)
+        # Interpolação 'nearest', a mesma usada por padrão no flow_from_directory
+        image = tf.image.resize(image, img_size, method='nearest')
+        image.set_shape((img_size[0], img_size[1], 3))
+        return tf.cast(image, tf.float32) / 255.0
+
+    @staticmethod
+    def build_dataset(files, labels, num_classes, img_size, batch_size, shuffle):
+        """
+        Constrói o tf.data.Dataset a partir das listas de arquivos e rótulos. As leituras e decodificações
+        acontecem em paralelo (num_parallel_calls=AUTOTUNE) e o prefetch mantém os próximos lotes prontos
+        enquanto o passo de treinamento atual é executado.
+        """
+        autotune = tf.data.AUTOTUNE
+
+        dataset = tf.data.Dataset.from_tensor_slices((tf.constant(files, dtype=tf.string),
+                                                      tf.constant(labels, dtype=tf.int32)))
+
+        # O embaralhamento é feito sobre os caminhos (strings), o que é barato mesmo com buffer grande
+        if shuffle:
+            dataset = dataset.shuffle(buffer_size=max(len(files), 1), reshuffle_each_iteration=True)
+
+        dataset = dataset.map(
+            lambda path, label: (DataPipeline.decode_image(path, img_size), tf.one_hot(label, num_classes)),
+            num_parallel_calls=autotune,
+            deterministic=not shuffle
+        )
+
+        return dataset.batch(batch_size).prefetch(autotune)
+
+    @staticmethod
+    def build_cached_dataset(images, labels, rows, num_classes, batch_size, shuffle):
+        """
+        Constrói o tf.data.Dataset a partir do cache de imagens já decodificadas (ver ImageCache).
+        Apenas os índices das linhas passam pelo pipeline; cada lote é lido do memmap de uma só vez e
+        a conversão para float e a normalização acontecem dentro do grafo.
+        """
+        autotune = tf.data.AUTOTUNE
+        height, width = images.shape[1], images.shape[2]
+
+        def gather(batch_rows):
+            # A leitura em ordem crescente de linhas é sequencial no disco; como imagens e rótulos
+            # usam a mesma ordenação, os pares continuam corretos
+            batch_rows = np.sort(batch_rows)
+            return images[batch_rows], labels[batch_rows]
+
+        def to_tensors(batch_rows):
+            batch_images, batch_labels = tf.numpy_function(gather, [batch_rows], [tf.uint8, tf.int32])
+            batch_images.set_shape((None, height, width, 3))
+            batch_labels.set_shape((None,))
+            return tf.cast(batch_images, tf.float32) / 255.0, tf.one_hot(batch_labels, num_classes)
+
+        dataset = tf.data.Dataset.from_tensor_slices(tf.constant(rows, dtype=tf.int64))
+
+        if shuffle:
+            dataset = dataset.shuffle(buffer_size=max(len(rows), 1), reshuffle_each_iteration=True)
+
+        dataset = dataset.batch(batch_size).map(to_tensors, num_parallel_calls=autotune)
+
+        return dataset.prefetch(autotune)
+
+    @staticmethod
+    def load_data(manifest, img_size=(128, 128), batch_size=32, use_cache=False, cancelled=None):
+        """
+        Equivalente ao Model.load_data, porém baseado em tf.data. Retorna os mesmos elementos:
+        (treino, validação, log de treino, log de validação, log de índices, número de classes)
+
+        obs: Com use_cache=True as imagens são lidas do cache persistente (ImageCache), que é
+        atualizado de forma incremental antes da construção dos datasets.
+        """
+        train_files, train_labels = manifest.files('training'), manifest.labels('training')
+        val_files, val_labels = manifest.files('validation'), manifest.labels('validation')
+        class_indices = manifest.class_indices
+        num_classes = manifest.num_classes
+
+        if use_cache:
+            images, labels, index = ImageCache(manifest.dataset_path, img_size).refresh_manifest(manifest,
+                                                                                                 cancelled=cancelled)
+
+            train_dataset = DataPipeline.build_cached_dataset(images, labels, [index[f] for f in train_files],
+                                                              num_classes, batch_size, shuffle=True)
+            val_dataset = DataPipeline.build_cached_dataset(images, labels, [index[f] for f in val_files],
+                                                            num_classes, batch_size, shuffle=False)
+        else:
+            train_dataset = DataPipeline.build_dataset(train_files, train_labels, num_classes,
+                                                       img_size, batch_size, shuffle=True)
+            val_dataset = DataPipeline.build_dataset(val_files, val_labels, num_classes,
+                                                     img_size, batch_size, shuffle=False)
+
+        log_training_samples = (f"Foram encontradas {len(train_files)} imagens "
+                                f"pertencentes a {num_classes} classes distintas para o treinamento")
+        log_validation_samples = (f"Foram encontradas {len(val_files)} imagens "
+                                  f"pertencentes a {num_classes} classes distintas para a validação")
+        log_indexes = f"Classes identificadas: {class_indices}"
+
+        return (train_dataset,
+                val_dataset,
+                log_training_samples,
+                log_validation_samples,
+                log_indexes,
+                num_classes)
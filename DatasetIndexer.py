@@ -0,0 +1,63 @@
+import threading
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from Model import Model
+from SplitManifest import SplitManifest
+
+
+# A thread indexa o dataset e prepara os carregadores de dados fora da thread da interface.
+#
+# Em diretórios com centenas de milhares de arquivos, percorrer as pastas de classes (e, com o carregador
+# 'cache', decodificar as imagens novas) congelaria a janela. Aqui:
+#   * o manifesto treino/validação (SplitManifest) é reaproveitado do disco ou montado, informando o
+#     progresso (arquivos encontrados em cada classe) pelo sinal progress
+#   * a indexação e o carregamento podem ser cancelados (cancel); o cancelamento é verificado entre as
+#     classes, a cada bloco de arquivos lidos e, na atualização do cache de imagens, antes de cada decodificação
+#   * em seguida, os dados são carregados com Model.load_data a partir do manifesto, sem percorrer a árvore
+#     novamente; o manifesto fica disponível para as etapas seguintes (construção da rede e treinamento)
+class DatasetIndexer(QThread):
+
+    progress = pyqtSignal(str, int)  # classe, arquivos encontrados até o momento
+    manifest_ready = pyqtSignal(object)  # SplitManifest montado (ou reaproveitado)
+    data_loaded = pyqtSignal(object)  # tupla retornada por Model.load_data
+    failed = pyqtSignal(str)  # mensagem de erro (ou de cancelamento)
+
+    def __init__(self, dataset_path, input_size, batch_size, val_split, loader, manifest=None):
+        super().__init__()
+        self.dataset_path = dataset_path
+        self.input_size = input_size
+        self.batch_size = batch_size
+        self.val_split = val_split
+        self.loader = loader
+        self.manifest = manifest  # manifesto já existente (ex: retomada de uma execução), sem nova indexação
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        """ Solicita o cancelamento (seguro para chamadas da thread da interface) """
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            manifest = self.manifest
+            if manifest is None:
+                manifest = SplitManifest.load_or_build(self.dataset_path, self.val_split,
+                                                       progress=self.progress.emit,
+                                                       cancelled=self.cancel_event.is_set)
+            self.manifest_ready.emit(manifest)
+
+            data = Model.load_data(self.dataset_path,
+                                   (self.input_size, self.input_size),
+                                   self.batch_size,
+                                   self.val_split,
+                                   self.loader,
+                                   manifest,
+                                   cancelled=self.cancel_event.is_set)
+            if self.cancel_event.is_set():
+                raise InterruptedError("Carregamento do dataset cancelado")
+            self.data_loaded.emit(data)
+
+        except InterruptedError as e:
+            self.failed.emit(str(e))
+        except Exception as e:
+            self.failed.emit(f"Erro ao carregar o dataset: {str(e)}")
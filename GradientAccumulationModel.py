@@ -0,0 +1,91 @@
+import tensorflow as tf
+
+
+# Modelo com acúmulo de gradientes: simula um lote efetivo de accumulation_steps x batch_size imagens, com a
+# memória de um único lote.
+#
+# O tamanho do lote escolhido em DataParameters é limitado pela memória disponível (que depende do input size,
+# do projection_dim e da quantidade de blocos transformer), enquanto ViTs costumam treinar melhor com lotes
+# grandes. Aqui, o train_step soma os gradientes de cada micro-lote (já divididos por accumulation_steps) e o
+# otimizador só é aplicado a cada accumulation_steps micro-lotes, com a média acumulada.
+#
+# O modelo é construído sobre as mesmas entradas e saídas da rede original (wrap), compartilhando as camadas e
+# os pesos: o arquivo de pesos salvo a partir da rede original não muda. Na compilação, steps_per_execution é
+# igual a accumulation_steps, então os callbacks (log, TensorBoard, checkpoints e PerformanceCallback) são
+# chamados uma vez por lote efetivo, sempre logo após a atualização dos pesos.
+#
+# obs: Os acumuladores não fazem parte de model.weights, para que checkpoints e arquivos .h5 sejam idênticos aos
+# do treinamento sem acúmulo. Se a quantidade de lotes por época não for múltipla de accumulation_steps, os
+# gradientes restantes são somados aos da época seguinte.
+class GradientAccumulationModel(tf.keras.Model):
+
+    def __init__(self, inputs, outputs, accumulation_steps=1, **kwargs):
+        super().__init__(inputs=inputs, outputs=outputs, **kwargs)
+        self.accumulation_steps = int(accumulation_steps)
+        object.__setattr__(self, "accumulators", None)
+        object.__setattr__(self, "accumulated", None)
+
+    @staticmethod
+    def wrap(model, accumulation_steps):
+        """ Cria o modelo com acúmulo sobre as camadas (e pesos) da rede recebida """
+        return GradientAccumulationModel(model.inputs, model.outputs, accumulation_steps, name=model.name)
+
+    def build_accumulators(self):
+        """
+        Cria os acumuladores e as variáveis do otimizador antes do treinamento. A aplicação dos gradientes
+        acontece dentro de um tf.cond, onde novas variáveis (momentos do Adam) não podem ser criadas.
+        Deve ser chamado após o compile.
+        """
+        if self.accumulators is None:
+            # object.__setattr__ evita o rastreamento automático do Keras (ver obs acima)
+            object.__setattr__(self, "accumulators", [
+                tf.Variable(tf.zeros_like(variable), trainable=False, name=f"accumulator_{index}")
+                for index, variable in enumerate(self.trainable_variables)
+            ])
+            object.__setattr__(self, "accumulated", tf.Variable(0, dtype=tf.int64, trainable=False,
+                                                                name="accumulated_steps"))
+
+        optimizer = getattr(self.optimizer, "inner_optimizer", self.optimizer)
+        optimizer._create_all_weights(self.trainable_variables)
+
+    def reset_accumulators(self):
+        for accumulator in self.accumulators:
+            accumulator.assign(tf.zeros_like(accumulator))
+        self.accumulated.assign(0)
+
+    def compile(self, *args, **kwargs):
+        kwargs.setdefault("steps_per_execution", self.accumulation_steps)
+        super().compile(*args, **kwargs)
+        self.build_accumulators()
+
+    def apply_accumulated(self):
+        self.optimizer.apply_gradients(zip(self.accumulators, self.trainable_variables))
+        self.reset_accumulators()
+        return tf.constant(True)
+
+    def train_step(self, data):
+        x, y, sample_weight = tf.keras.utils.unpack_x_y_sample_weight(data)
+        mixed_precision = isinstance(self.optimizer, tf.keras.mixed_precision.LossScaleOptimizer)
+
+        with tf.GradientTape() as tape:
+            y_pred = self(x, training=True)
+            loss = self.compute_loss(x, y, y_pred, sample_weight)
+            # Cada micro-lote contribui com 1/N do gradiente: a soma acumulada é a média do lote efetivo
+            scaled_loss = loss / self.accumulation_steps
+            if mixed_precision:
+                scaled_loss = self.optimizer.get_scaled_loss(scaled_loss)
+
+        gradients = tape.gradient(scaled_loss, self.trainable_variables)
+        if mixed_precision:
+            gradients = self.optimizer.get_unscaled_gradients(gradients)
+
+        for accumulator, gradient in zip(self.accumulators, gradients):
+            if gradient is not None:
+                accumulator.assign_add(tf.cast(tf.convert_to_tensor(gradient), accumulator.dtype))
+        self.accumulated.assign_add(1)
+
+        tf.cond(tf.equal(self.accumulated, self.accumulation_steps),
+                self.apply_accumulated,
+                lambda: tf.constant(False))
+
+        return self.compute_metrics(x, y, y_pred, sample_weight)
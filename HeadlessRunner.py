@@ -0,0 +1,246 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# Parâmetros padrão de uma execução. O arquivo de configuração (JSON ou YAML) precisa informar apenas
+# os valores que diferem destes, sendo obrigatório somente o dataset_path.
+DEFAULT_CONFIG = {
+    # Dataset
+    "dataset_path": None,  # pasta com uma subpasta por classe
+    "input_size": 224,  # altura e largura das imagens de entrada
+    "batch_size": 32,
+    "split": 0.2,  # fração destinada à validação
+    "seed": 42,  # semente da divisão treino/validação
+    "loader": "tfdata",  # 'generator', 'tfdata' ou 'cache' (ver Model.load_data)
+
+    # Vision Transformer (ver ModelCreator)
+    "patch_size": 16,
+    "projection_dim": 64,
+    "transformer_layers": 8,
+    "num_heads": 4,
+    "mlp_units": 128,
+    "patch_embedding": "extractor",
+    "head": "flatten",
+    "head_dim": None,
+    "attention": "keras",
+    "attention_chunk_size": 64,
+
+    # Treinamento
+    "epochs": 20,
+    "run_name": "headless",  # nome da execução (logs/fit/<run_name>_run_N e <run_name>_weights.h5)
+    "mixed_precision": False,
+    "jit_compile": False,
+    "checkpoint_every": 1,  # checkpoint assíncrono a cada N épocas (null desativa)
+    "checkpoint_every_steps": None,  # checkpoint a cada N passos de treinamento (null desativa)
+    "learning_rate": 1e-4,
+    "lr_schedule": "constant",  # constant, cosine (aquecimento + cosseno) ou step
+    "warmup_epochs": 0,
+    "decay_epochs": 10,
+    "decay_rate": 0.5,
+    "early_stopping": None,  # val_accuracy ou val_loss (null desativa)
+    "patience": 10,
+    "min_delta": 0.0,
+    "performance_log": True,  # tempo por passo, imagens/s e percentis (performance.jsonl e TensorBoard)
+    "measure_input_wait": False,  # separa a espera pelos dados do tempo de cálculo (opcional)
+    "histogram_freq": 1,  # histogramas dos pesos no TensorBoard a cada N épocas (0 desativa)
+    "write_graph": True,
+    "update_freq": "epoch",  # epoch, batch ou um número de lotes
+    "profile_batch": None,  # [início, fim]: passos capturados pelo tf.profiler (null desativa)
+    "augmentation": None,  # aumento de dados em lote: light ou strong (null desativa; ver BatchAugmentation)
+    "mixup_alpha": 0.0,  # Mixup entre as imagens do lote (0 desativa)
+    "cutmix_alpha": 0.0,  # CutMix entre as imagens do lote (0 desativa)
+    "accumulation_steps": 1,  # lotes com gradientes somados por atualização (lote efetivo = N x batch_size)
+    "save_weights": True
+}
+
+
+# Execução do treinamento sem interface gráfica, voltada para servidores sem display.
+#
+# Diferente do fluxo Main → Interface → janelas de diálogo, aqui todos os parâmetros vêm de um arquivo de
+# configuração e nenhum módulo do PyQt5 ou do tkinter é importado. As mesmas etapas da interface são
+# executadas: divisão dos dados (SplitManifest), carregamento (Model.load_data), construção da rede
+# (ModelCreator) e treinamento (Trainer, o mesmo utilizado pela TrainerThread).
+#
+# Uso:
+#   python HeadlessRunner.py config.json
+#   python HeadlessRunner.py config.yaml (exige o PyYAML)
+#   python HeadlessRunner.py config.json --set epochs=5 --set run_name=teste
+#   python HeadlessRunner.py --resume logs/fit/<execução>
+class HeadlessRunner:
+
+    @staticmethod
+    def load_config(path, overrides=None):
+        """ Lê o arquivo de configuração (JSON ou YAML) e completa os valores ausentes com o DEFAULT_CONFIG """
+        with open(path, "r", encoding="utf-8") as file:
+            if path.lower().endswith((".yaml", ".yml")):
+                # O PyYAML é necessário apenas para configurações em YAML
+                try:
+                    import yaml
+                except ImportError:
+                    raise ImportError("Configurações em YAML exigem o PyYAML (pip install pyyaml); "
+                                      "use um arquivo JSON ou instale o pacote")
+                loaded = yaml.safe_load(file) or {}
+            else:
+                loaded = json.load(file)
+
+        return HeadlessRunner.resolve_config(loaded, overrides)
+
+    @staticmethod
+    def resolve_config(config, overrides=None):
+        """ Combina a configuração com os valores padrão e com as substituições no formato chave=valor """
+        resolved = dict(DEFAULT_CONFIG)
+        resolved.update(config)
+
+        for override in overrides or []:
+            key, _, value = override.partition("=")
+            # Valores numéricos, booleanos e null são interpretados como JSON; o restante é texto
+            try:
+                resolved[key] = json.loads(value)
+            except ValueError:
+                resolved[key] = value
+
+        unknown = set(resolved) - set(DEFAULT_CONFIG)
+        if unknown:
+            raise ValueError(f"Parâmetros desconhecidos na configuração: {sorted(unknown)}")
+        if not resolved["dataset_path"]:
+            raise ValueError("O parâmetro dataset_path é obrigatório")
+        augmented = resolved["augmentation"] or resolved["mixup_alpha"] or resolved["cutmix_alpha"]
+        if augmented and resolved["loader"] == 'generator':
+            raise ValueError("O aumento de dados (augmentation, mixup_alpha, cutmix_alpha) exige o carregador "
+                             "tf.data: use loader 'tfdata' ou 'cache'")
+
+        return resolved
+
+    @staticmethod
+    def network_creator(config, num_classes):
+        """ ModelCreator da ViT descrita na configuração (mesmo cálculo feito em Interface.build_network) """
+        from ModelCreator import ModelCreator
+
+        input_size = config["input_size"]
+        return ModelCreator((input_size, input_size, 3),
+                           config["patch_size"],
+                           (input_size // config["patch_size"]) ** 2,
+                           config["projection_dim"],
+                           config["transformer_layers"],
+                           config["num_heads"],
+                           config["mlp_units"],
+                           num_classes,
+                           mixed_precision=config["mixed_precision"],
+                           patch_embedding=config["patch_embedding"],
+                           head=config["head"],
+                           head_dim=config["head_dim"],
+                           attention=config["attention"],
+                           attention_chunk_size=config["attention_chunk_size"])
+
+    @staticmethod
+    def build_network(config, num_classes):
+        """ Constrói a ViT descrita na configuração """
+        return HeadlessRunner.network_creator(config, num_classes).vit_classifier()
+
+    @staticmethod
+    def trainer_options(config):
+        """ Parâmetros de treinamento da configuração, no formato recebido pelo Trainer """
+        keys = ("mixed_precision", "jit_compile", "checkpoint_every", "checkpoint_every_steps", "learning_rate",
+                "lr_schedule", "warmup_epochs", "decay_epochs", "decay_rate", "early_stopping", "patience",
+                "min_delta", "performance_log", "measure_input_wait", "histogram_freq", "write_graph",
+                "update_freq", "profile_batch", "augmentation", "mixup_alpha", "cutmix_alpha",
+                "accumulation_steps")
+        return {key: config[key] for key in keys}
+
+    @staticmethod
+    def run(config, log=print, resume_from=None):
+        """
+        Executa o treinamento descrito na configuração e retorna um dicionário com o resultado
+        (caminho dos logs, arquivo de pesos, tempo total e histórico das métricas).
+
+        obs: Com resume_from (pasta de uma execução), a divisão treino/validação salva na execução é
+        reutilizada e o treinamento continua a partir do último checkpoint.
+        """
+        # Os módulos que dependem do TensorFlow são importados apenas no momento da execução
+        from Model import Model
+        from SplitManifest import SplitManifest
+        from Trainer import Trainer
+
+        start = time.perf_counter()
+        input_size = config["input_size"]
+
+        if resume_from is not None:
+            manifest = SplitManifest.load(os.path.join(resume_from, "split_manifest.json"))
+        else:
+            manifest = SplitManifest.load_or_build(config["dataset_path"], config["split"], config["seed"])
+        if manifest.reused:
+            log("Divisão treino/validação reaproveitada (dataset inalterado)")
+
+        train_data, val_data, log_training_samples, log_validation_samples, log_indexes, num_classes = (
+            Model.load_data(config["dataset_path"],
+                            (input_size, input_size),
+                            config["batch_size"],
+                            config["split"],
+                            config["loader"],
+                            manifest))
+
+        log(log_training_samples)
+        log(log_validation_samples)
+        log(log_indexes)
+
+        network = HeadlessRunner.build_network(config, num_classes)
+        log(f"Rede construída com {network.count_params():,} parâmetros")
+
+        trainer = Trainer(network, train_data, val_data, config["epochs"], config["run_name"],
+                          log=log,
+                          split_manifest=manifest,
+                          run_config=config,
+                          resume_from=resume_from,
+                          **HeadlessRunner.trainer_options(config))
+        history = trainer.train()
+
+        # Mesmo formato de arquivo gerado por Interface.save_weights
+        weights_path = None
+        if config["save_weights"]:
+            weights_path = f"{config['run_name']}_weights.h5"
+            network.save(weights_path)
+            log(f"Pesos de treinamento salvos como {weights_path}")
+
+        # Aguarda a ingestão dos escalares no índice de execuções antes de encerrar o processo
+        if trainer.ingest_thread is not None:
+            trainer.ingest_thread.join()
+
+        return {
+            "run_name": config["run_name"],
+            "run_id": trainer.run_id,
+            "log_path": trainer.log_path,
+            "weights_path": weights_path,
+            "wall_time": time.perf_counter() - start,
+            "history": {key: [float(value) for value in values] for key, values in history.history.items()}
+        }
+
+    @staticmethod
+    def main(argv=None):
+        parser = argparse.ArgumentParser(description="Treinamento da Vision Transformer sem interface gráfica")
+        parser.add_argument("config", nargs="?", help="arquivo de configuração (.json; .yaml ou .yml com o PyYAML)")
+        parser.add_argument("--resume", metavar="PASTA_DA_EXECUCAO",
+                            help="retoma uma execução interrompida a partir do último checkpoint")
+        parser.add_argument("--set", action="append", default=[], metavar="CHAVE=VALOR",
+                            help="substitui um parâmetro da configuração (pode ser repetido)")
+        args = parser.parse_args(argv)
+
+        if args.resume:
+            # Na retomada, a configuração salva na pasta da execução é utilizada
+            config = HeadlessRunner.load_config(os.path.join(args.resume, "run_config.json"), args.set)
+        elif args.config:
+            config = HeadlessRunner.load_config(args.config, args.set)
+        else:
+            parser.error("informe o arquivo de configuração ou --resume")
+
+        result = HeadlessRunner.run(config, resume_from=args.resume)
+
+        # Resumo da execução, em JSON, para facilitar o uso por scripts de fila
+        summary = {key: value for key, value in result.items() if key != "history"}
+        print(json.dumps(summary, indent=2))
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(HeadlessRunner.main())
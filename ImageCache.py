@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+
+# A classe mantém um cache em disco das imagens já decodificadas e redimensionadas, evitando que
+# cada execução (e cada época) decodifique novamente os mesmos JPEGs.
+#
+# O cache é identificado pelo caminho do dataset e pelo tamanho de entrada escolhido, e é composto por:
+#   * images.<versão>.npy - array uint8 (num_imagens, altura, largura, 3), aberto como memmap (leitura sem
+#     cópia). Cada reconstrução grava uma nova versão, e o manifesto passa a apontar para ela
+#   * labels.npy - array int32 com o rótulo de cada linha do array de imagens (conferido com o manifesto a
+#     cada atualização, pois o índice das classes pode mudar sem que as imagens mudem)
+#   * manifest.json - versão atual das imagens e caminho relativo, mtime e linha de cada arquivo armazenado
+#
+# Quando imagens são adicionadas ou removidas das pastas de classes, apenas os arquivos novos ou
+# modificados são decodificados; as linhas já existentes são apenas copiadas do cache anterior.
+#
+# obs: O arquivo de imagens nunca é substituído no lugar: no Windows, um arquivo aberto como memmap (pelo
+# dataset de uma execução anterior, por exemplo) não pode ser sobrescrito nem removido. As versões antigas são
+# removidas quando possível; as que ainda estão abertas ficam para a próxima reconstrução.
+class ImageCache:
+
+    def __init__(self, dataset_path, img_size, cache_root="cache/images/"):
+        self.dataset_path = os.path.abspath(dataset_path)
+        self.img_size = tuple(img_size)
+
+        # A chave do cache combina o caminho absoluto do dataset e o tamanho (altura x largura)
+        key_source = f"{self.dataset_path}|{self.img_size[0]}x{self.img_size[1]}"
+        key = hashlib.sha1(key_source.encode("utf-8")).hexdigest()[:16]
+
+        self.cache_dir = os.path.join(cache_root, key)
+        self.labels_path = os.path.join(self.cache_dir, "labels.npy")
+        self.manifest_path = os.path.join(self.cache_dir, "manifest.json")
+
+    def _load_manifest(self):
+        """ Retorna (arquivos do manifesto, caminho da versão atual das imagens), ou ({}, None) sem cache válido """
+        if not os.path.exists(self.manifest_path):
+            return {}, None
+
+        with open(self.manifest_path, "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+
+        # Um manifesto de outro dataset/tamanho (colisão de chave) ou sem o arquivo de imagens é descartado
+        images_path = os.path.join(self.cache_dir, manifest.get("images_file", "images.npy"))
+        if manifest.get("img_size") != list(self.img_size) or not os.path.exists(images_path):
+            return {}, None
+        return manifest.get("files", {}), images_path
+
+    def _decode(self, path):
+        # O PIL recebe o tamanho como (largura, altura); a interpolação 'nearest' segue o padrão do Keras
+        with Image.open(path) as image:
+            image = image.convert("RGB").resize((self.img_size[1], self.img_size[0]), Image.NEAREST)
+            return np.asarray(image, dtype=np.uint8)
+
+    def refresh_manifest(self, manifest, workers=None, cancelled=None):
+        """
+        Sincroniza o cache com todos os arquivos do manifesto (treino e validação) e retorna o mesmo que refresh.
+        O cache armazena os arquivos em ordem canônica (ordenada), independente do split, para que mudar a
+        divisão entre treino e validação não invalide as linhas já decodificadas.
+        """
+        files = manifest.files('training') + manifest.files('validation')
+        labels = manifest.labels('training') + manifest.labels('validation')
+        pairs = sorted(zip(files, labels))
+        all_files = [path for path, _ in pairs]
+        all_labels = [label for _, label in pairs]
+        return self.refresh(all_files, all_labels, workers, cancelled)
+
+    def refresh(self, files, labels, workers=None, cancelled=None):
+        """
+        Sincroniza o cache com a lista de arquivos informada e retorna (imagens, rótulos, índice), sendo:
+            * imagens - memmap somente leitura com as imagens uint8
+            * rótulos - array com o rótulo de cada linha
+            * índice - dicionário {caminho do arquivo: linha no array de imagens}
+
+        Apenas arquivos novos ou com mtime diferente do registrado no manifesto são decodificados. Uma lista vazia
+        retorna arrays vazios, sem alterar o cache.
+        cancelled() é consultada antes de cada decodificação: quando retorna True, a atualização é interrompida
+        com InterruptedError e o cache anterior é mantido.
+        """
+        if not files:
+            height, width = self.img_size
+            return np.zeros((0, height, width, 3), dtype=np.uint8), np.zeros((0,), dtype=np.int32), {}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        old_files, images_path = self._load_manifest()
+        relative_paths = [os.path.relpath(os.path.abspath(path), self.dataset_path) for path in files]
+        mtimes = [os.stat(path).st_mtime for path in files]
+
+        # Linhas reaproveitáveis: mesmo arquivo e mesma data de modificação do cache anterior
+        reused = {}
+        for row, (relative, mtime) in enumerate(zip(relative_paths, mtimes)):
+            entry = old_files.get(relative)
+            if entry is not None and entry["mtime"] == mtime:
+                reused[row] = entry["row"]
+
+        unchanged = (len(reused) == len(files) == len(old_files)
+                     and all(old_row == row for row, old_row in reused.items()))
+
+        if not unchanged:
+            images_path = self._rebuild(files, labels, relative_paths, mtimes, reused, images_path, workers,
+                                        cancelled)
+
+        images = np.load(images_path, mmap_mode="r")
+
+        # Os rótulos vêm sempre do manifesto: se o mapeamento classe → índice mudou (pasta de classe
+        # adicionada ou renomeada) sem alterar as imagens, o labels.npy do cache é atualizado
+        labels = np.asarray(labels, dtype=np.int32)
+        if not os.path.exists(self.labels_path) or not np.array_equal(np.load(self.labels_path), labels):
+            self._save_labels(labels)
+        index = {path: row for row, path in enumerate(files)}
+
+        return images, labels, index
+
+    def _rebuild(self, files, labels, relative_paths, mtimes, reused, old_images_path, workers, cancelled=None):
+        """ Grava uma nova versão do arquivo de imagens, aponta o manifesto para ela e retorna o seu caminho """
+        height, width = self.img_size
+        # Versão única por processo e instante: execuções simultâneas (ver SweepRunner) não escrevem no mesmo
+        # arquivo, e a versão em uso por um memmap aberto nunca é sobrescrita
+        images_file = f"images.{time.strftime('%Y%m%d%H%M%S')}.{os.getpid()}.npy"
+        tmp_path = os.path.join(self.cache_dir, f"{images_file}.tmp")
+
+        new_images = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint8,
+                                               shape=(len(files), height, width, 3))
+
+        # Decodifica em paralelo apenas os arquivos novos ou modificados. A decodificação do PIL
+        # libera o GIL, então as threads utilizam vários núcleos.
+        pending = [row for row in range(len(files)) if row not in reused]
+
+        def decode_into(row):
+            if cancelled is not None and cancelled():
+                raise InterruptedError("Atualização do cache de imagens cancelada")
+            new_images[row] = self._decode(files[row])
+
+        try:
+            # Copia as linhas já decodificadas do cache anterior (cópia de memória, sem decodificação)
+            if reused:
+                old_images = np.load(old_images_path, mmap_mode="r")
+                for row, old_row in reused.items():
+                    new_images[row] = old_images[old_row]
+                del old_images
+
+            with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+                list(executor.map(decode_into, pending))
+            new_images.flush()
+        except BaseException:
+            # Cancelamento ou falha na decodificação (imagem corrompida, por exemplo): o arquivo temporário é
+            # descartado e o cache anterior continua válido
+            del new_images
+            os.remove(tmp_path)
+            raise
+
+        del new_images
+
+        images_path = os.path.join(self.cache_dir, images_file)
+        os.replace(tmp_path, images_path)
+        self._save_labels(labels)
+
+        manifest = {
+            "dataset_path": self.dataset_path,
+            "img_size": list(self.img_size),
+            "images_file": images_file,
+            "files": {relative: {"mtime": mtime, "row": row}
+                      for row, (relative, mtime) in enumerate(zip(relative_paths, mtimes))}
+        }
+        tmp_manifest = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_manifest, "w", encoding="utf-8") as file:
+            json.dump(manifest, file)
+        os.replace(tmp_manifest, self.manifest_path)
+
+        self._remove_old_versions(images_file)
+        return images_path
+
+    def _remove_old_versions(self, current_file):
+        """ Remove as versões anteriores do arquivo de imagens que não estão mais abertas """
+        for name in os.listdir(self.cache_dir):
+            if name.startswith("images.") and name.endswith(".npy") and name != current_file:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    # Ainda aberta como memmap (Windows): será removida em uma próxima reconstrução
+                    pass
+
+    def _save_labels(self, labels):
+        tmp_labels = os.path.join(self.cache_dir, f"labels.{os.getpid()}.tmp.npy")
+        np.save(tmp_labels, np.asarray(labels, dtype=np.int32))
+        os.replace(tmp_labels, self.labels_path)
@@ -0,0 +1,167 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import tensorflow as tf
+
+from ChunkedAttention import ChunkedAttention
+from DataPipeline import DataPipeline
+from PatchEmbedding import PatchEmbedding
+from PatchEncoder import PatchEncoder
+from PatchExtractor import PatchExtractor
+from SplitManifest import IMAGE_EXTENSIONS
+from XlaCompiler import XlaCompiler
+
+# Camadas personalizadas necessárias para reconstruir a rede salva em <nome>_weights.h5
+CUSTOM_OBJECTS = {
+    'PatchExtractor': PatchExtractor,
+    'PatchEncoder': PatchEncoder,
+    'PatchEmbedding': PatchEmbedding,
+    'ChunkedAttention': ChunkedAttention
+}
+
+
+# A classe executa a predição em lote com uma rede treinada (arquivo salvo por Interface.save_weights ou
+# pelo HeadlessRunner).
+#
+# As imagens são lidas de diretórios, listas de arquivos (.txt, um caminho por linha) ou caminhos
+# individuais, percorridos de forma preguiçosa (gerador), e passam pelo mesmo pipeline tf.data do
+# treinamento: leitura e decodificação em paralelo, lotes e prefetch. As predições (índice da classe,
+# nome da classe e probabilidades) são gravadas de forma incremental em CSV ou JSONL, então o consumo de
+# memória não depende do número de imagens.
+#
+# Uso:
+#   python InferenceEngine.py modelo_weights.h5 pasta_imagens --output predicoes.csv
+#       --classes logs/fit/<execução>/split_manifest.json
+class InferenceEngine:
+
+    def __init__(self, model_path, class_names=None, batch_size=64, jit_compile=False):
+        self.model = InferenceEngine.load_model(model_path)
+        self.batch_size = batch_size
+        # Altura e largura esperadas pela rede, obtidas da camada de entrada
+        self.input_size = tuple(self.model.input_shape[1:3])
+        self.class_names = class_names
+        self.predict = XlaCompiler.predict_function(self.model, jit_compile)
+        self.listed_files = 0  # arquivos encontrados nas fontes (para contabilizar os descartados)
+
+    @staticmethod
+    def load_model(model_path):
+        """ Carrega a rede salva, incluindo as camadas personalizadas (sem o otimizador) """
+        return tf.keras.models.load_model(model_path, custom_objects=CUSTOM_OBJECTS, compile=False)
+
+    @staticmethod
+    def load_class_names(path):
+        """
+        Lê os nomes das classes, na ordem dos índices, a partir do split_manifest.json salvo na pasta da
+        execução ou de um JSON com o dicionário {nome da classe: índice} (class_indices).
+        """
+        with open(path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        class_indices = data.get("class_indices", data)
+        return sorted(class_indices, key=class_indices.get)
+
+    @staticmethod
+    def iter_files(sources):
+        """ Percorre diretórios (recursivamente), listas de arquivos .txt e caminhos de imagens, sob demanda """
+        for source in sources:
+            if os.path.isdir(source):
+                for root, dirs, files in os.walk(source):
+                    dirs.sort()
+                    for name in sorted(files):
+                        if name.lower().endswith(IMAGE_EXTENSIONS):
+                            yield os.path.join(root, name)
+            elif source.lower().endswith(".txt"):
+                with open(source, "r", encoding="utf-8") as file:
+                    for line in file:
+                        if line.strip():
+                            yield line.strip()
+            else:
+                yield source
+
+    def dataset(self, sources):
+        """ Pipeline de predição: (caminhos, imagens) em lotes, com decodificação paralela e prefetch """
+        autotune = tf.data.AUTOTUNE
+
+        self.listed_files = 0
+
+        def list_paths():
+            for path in InferenceEngine.iter_files(sources):
+                self.listed_files += 1
+                yield path
+
+        paths = tf.data.Dataset.from_generator(list_paths,
+                                               output_signature=tf.TensorSpec(shape=(), dtype=tf.string))
+
+        dataset = paths.map(lambda path: (path, DataPipeline.decode_image(path, self.input_size)),
+                            num_parallel_calls=autotune)
+        # Arquivos que não puderem ser lidos ou decodificados são descartados (e contabilizados ao final)
+        dataset = dataset.apply(tf.data.experimental.ignore_errors())
+
+        return dataset.batch(self.batch_size).prefetch(autotune)
+
+    def run(self, sources, output_path, log=print, log_every=50):
+        """
+        Executa a predição sobre as imagens e grava os resultados em output_path (.csv ou .jsonl).
+        Retorna um dicionário com o total de imagens, o tempo e a vazão (imagens/s).
+        """
+        as_jsonl = output_path.lower().endswith(".jsonl")
+        total = 0
+        start = time.perf_counter()
+
+        with open(output_path, "w", encoding="utf-8", newline="") as file:
+            writer = None if as_jsonl else csv.writer(file)
+
+            for batch_index, (paths, images) in enumerate(self.dataset(sources)):
+                probabilities = tf.nn.softmax(tf.cast(self.predict(images), tf.float32), axis=-1).numpy()
+                predicted = probabilities.argmax(axis=-1)
+
+                if writer is not None and total == 0:
+                    names = self.class_names or [str(i) for i in range(probabilities.shape[-1])]
+                    writer.writerow(["path", "class_index", "class_name"] + [f"prob_{name}" for name in names])
+
+                for path, index, probs in zip(paths.numpy(), predicted, probabilities):
+                    path = path.decode("utf-8")
+                    class_name = self.class_names[index] if self.class_names else str(index)
+                    if as_jsonl:
+                        file.write(json.dumps({"path": path, "class_index": int(index), "class_name": class_name,
+                                               "probabilities": [round(float(p), 6) for p in probs]}) + "\n")
+                    else:
+                        writer.writerow([path, int(index), class_name] + [f"{p:.6f}" for p in probs])
+
+                total += len(predicted)
+                # Grava o lote imediatamente, permitindo acompanhar o arquivo durante a execução
+                file.flush()
+
+                if (batch_index + 1) % log_every == 0:
+                    log(f"{total} imagens processadas ({total / (time.perf_counter() - start):.1f} imagens/s)")
+
+        elapsed = time.perf_counter() - start
+        stats = {"images": total, "skipped": self.listed_files - total, "seconds": elapsed,
+                 "images_per_sec": total / elapsed if elapsed > 0 else 0.0}
+        if stats["skipped"]:
+            log(f"{stats['skipped']} arquivos não puderam ser lidos e foram ignorados")
+        log(f"Predição finalizada: {total} imagens em {elapsed:.1f} s ({stats['images_per_sec']:.1f} imagens/s)")
+        return stats
+
+    @staticmethod
+    def main(argv=None):
+        parser = argparse.ArgumentParser(description="Predição em lote com a Vision Transformer treinada")
+        parser.add_argument("model", help="arquivo da rede salva (ex: nome_weights.h5)")
+        parser.add_argument("sources", nargs="+", help="diretórios, listas .txt ou arquivos de imagem")
+        parser.add_argument("--output", default="predicoes.csv", help="arquivo de saída (.csv ou .jsonl)")
+        parser.add_argument("--classes", help="split_manifest.json da execução (nomes das classes)")
+        parser.add_argument("--batch-size", type=int, default=64)
+        parser.add_argument("--xla", action="store_true", help="compila a predição com XLA")
+        args = parser.parse_args(argv)
+
+        class_names = InferenceEngine.load_class_names(args.classes) if args.classes else None
+        engine = InferenceEngine(args.model, class_names, args.batch_size, args.xla)
+        engine.run(args.sources, args.output)
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(InferenceEngine.main())
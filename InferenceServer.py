@@ -0,0 +1,280 @@
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import tensorflow as tf
+
+from DataPipeline import DataPipeline
+from InferenceEngine import InferenceEngine
+from XlaCompiler import XlaCompiler
+
+
+# Uma requisição de predição aguardando na fila do agrupador de lotes
+class _PendingRequest:
+
+    def __init__(self, image, received):
+        self.image = image  # imagem pré-processada (altura, largura, 3)
+        self.received = received  # instante de chegada (time.perf_counter)
+        self.done = threading.Event()  # sinalizado quando o resultado (ou erro) estiver pronto
+        self.result = None
+        self.error = None
+
+
+# A classe implementa um servidor HTTP local (localhost) de predição com agrupamento dinâmico de lotes
+# (micro-batching).
+#
+# Cada requisição traz uma única imagem, mas chamar a rede imagem a imagem desperdiça a maior parte da CPU
+# com o custo fixo de cada chamada. Aqui as requisições são decodificadas nas threads do servidor HTTP e
+# colocadas em uma fila; uma única thread agrupa as requisições pendentes em lotes de até max_batch_size,
+# esperando no máximo max_wait_ms pela chegada de novas requisições, e executa o lote em uma única instância
+# da rede. O resultado de cada requisição é devolvido individualmente.
+#
+# Endpoints:
+#   POST /predict - corpo com os bytes da imagem (JPEG, PNG, BMP ou GIF); retorna a classe e as probabilidades
+#   GET /metrics - latências p50/p99, tamanho médio dos lotes e vazão
+#   GET /health - verificação de disponibilidade
+#
+# Uso:
+#   python InferenceServer.py nome_weights.h5 --classes logs/fit/<execução>/split_manifest.json --port 8500
+class InferenceServer:
+
+    def __init__(self, model_path, class_names=None, max_batch_size=32, max_wait_ms=5.0,
+                 host="127.0.0.1", port=8500, jit_compile=False, log=print):
+        # Mesmo carregamento usado pela predição em lote (rede salva por Interface.save_weights)
+        self.model = InferenceEngine.load_model(model_path)
+        self.input_size = tuple(self.model.input_shape[1:3])
+        self.class_names = class_names
+        self.predict = XlaCompiler.predict_function(self.model, jit_compile)
+
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.host = host
+        self.port = port
+        self.log = log
+
+        self.requests = queue.Queue()
+        self.running = False
+
+        # Métricas: janelas com as últimas latências e tamanhos de lote
+        self.metrics_lock = threading.Lock()
+        self.latencies_ms = deque(maxlen=10000)
+        self.queue_waits_ms = deque(maxlen=10000)
+        self.batch_sizes = deque(maxlen=10000)
+        self.total_requests = 0
+        self.total_errors = 0
+        self.started_at = None
+
+        self.httpd = None
+        self.batcher_thread = None
+
+    # ------------------------------------------------------------------------------------------------
+
+    def _padded_size(self, size):
+        """
+        Tamanho do lote executado: a menor potência de 2 que comporta as requisições (limitada a
+        max_batch_size). Assim a função de predição é compilada para poucos formatos de entrada.
+        """
+        padded = 1
+        while padded < size:
+            padded *= 2
+        return min(padded, self.max_batch_size)
+
+    def _collect_batch(self):
+        """ Aguarda a primeira requisição e agrupa as seguintes até encher o lote ou esgotar max_wait """
+        try:
+            batch = [self.requests.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _batch_loop(self):
+        while self.running:
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            try:
+                images = np.stack([request.image for request in batch])
+                padding = self._padded_size(len(batch)) - len(batch)
+                if padding:
+                    images = np.concatenate([images, np.zeros((padding,) + images.shape[1:], images.dtype)])
+
+                logits = self.predict(tf.constant(images))
+                probabilities = tf.nn.softmax(tf.cast(logits, tf.float32), axis=-1).numpy()[:len(batch)]
+
+                for request, probs in zip(batch, probabilities):
+                    index = int(np.argmax(probs))
+                    request.result = {
+                        "class_index": index,
+                        "class_name": self.class_names[index] if self.class_names else str(index),
+                        "probabilities": [round(float(p), 6) for p in probs],
+                        "batch_size": len(batch)
+                    }
+            except Exception as e:
+                for request in batch:
+                    request.error = str(e)
+
+            finished = time.perf_counter()
+            with self.metrics_lock:
+                self.batch_sizes.append(len(batch))
+                for request in batch:
+                    self.queue_waits_ms.append((started - request.received) * 1000)
+                    self.latencies_ms.append((finished - request.received) * 1000)
+
+            for request in batch:
+                request.done.set()
+
+    # ------------------------------------------------------------------------------------------------
+
+    def submit(self, image_bytes, timeout=30.0):
+        """ Decodifica a imagem, coloca-a na fila e aguarda o resultado do lote correspondente """
+        received = time.perf_counter()
+        image = DataPipeline.preprocess_image(tf.constant(image_bytes), self.input_size).numpy()
+
+        request = _PendingRequest(image, received)
+        self.requests.put(request)
+        if not request.done.wait(timeout):
+            raise TimeoutError("Tempo limite excedido aguardando a predição")
+        if request.error is not None:
+            raise RuntimeError(request.error)
+
+        request.result["latency_ms"] = round((time.perf_counter() - received) * 1000, 3)
+        return request.result
+
+    def metrics(self):
+        with self.metrics_lock:
+            latencies = np.asarray(self.latencies_ms)
+            waits = np.asarray(self.queue_waits_ms)
+            batch_sizes = np.asarray(self.batch_sizes)
+            total, errors = self.total_requests, self.total_errors
+
+        def percentile(values, q):
+            return round(float(np.percentile(values, q)), 3) if len(values) else None
+
+        uptime = time.perf_counter() - self.started_at if self.started_at else 0.0
+        return {
+            "requests": total,
+            "errors": errors,
+            "batches": len(batch_sizes),
+            "avg_batch_size": round(float(batch_sizes.mean()), 2) if len(batch_sizes) else None,
+            "latency_ms_p50": percentile(latencies, 50),
+            "latency_ms_p99": percentile(latencies, 99),
+            "queue_wait_ms_p50": percentile(waits, 50),
+            "queue_wait_ms_p99": percentile(waits, 99),
+            "requests_per_sec": round(total / uptime, 2) if uptime else None,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def _send_json(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/metrics":
+                    self._send_json(200, server.metrics())
+                elif self.path == "/health":
+                    self._send_json(200, {"status": "ok"})
+                else:
+                    self._send_json(404, {"error": "endpoint não encontrado"})
+
+            def do_POST(self):
+                if self.path != "/predict":
+                    self._send_json(404, {"error": "endpoint não encontrado"})
+                    return
+
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    result = server.submit(self.rfile.read(length))
+                    with server.metrics_lock:
+                        server.total_requests += 1
+                    self._send_json(200, result)
+                except Exception as e:
+                    with server.metrics_lock:
+                        server.total_requests += 1
+                        server.total_errors += 1
+                    self._send_json(400, {"error": str(e)})
+
+            def log_message(self, format, *args):
+                # Evita uma linha de log por requisição
+                pass
+
+        return Handler
+
+    def warmup(self):
+        """ Compila a função de predição para todos os tamanhos de lote usados, antes das requisições """
+        size = 1
+        while True:
+            self.predict(tf.zeros((size,) + self.input_size + (3,)))
+            if size >= self.max_batch_size:
+                break
+            size = self._padded_size(size * 2)
+
+    def start(self):
+        self.warmup()
+        self.running = True
+        self.started_at = time.perf_counter()
+        self.batcher_thread = threading.Thread(target=self._batch_loop, daemon=True)
+        self.batcher_thread.start()
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self.log(f"Servidor de predição em http://{self.host}:{self.port} "
+                 f"(lote máximo {self.max_batch_size}, espera máxima {self.max_wait * 1000:.1f} ms)")
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.running = False
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+    @staticmethod
+    def main(argv=None):
+        parser = argparse.ArgumentParser(description="Servidor local de predição da Vision Transformer")
+        parser.add_argument("model", help="arquivo da rede salva (ex: nome_weights.h5)")
+        parser.add_argument("--classes", help="split_manifest.json da execução (nomes das classes)")
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8500)
+        parser.add_argument("--max-batch-size", type=int, default=32)
+        parser.add_argument("--max-wait-ms", type=float, default=5.0)
+        parser.add_argument("--xla", action="store_true", help="compila a predição com XLA")
+        args = parser.parse_args(argv)
+
+        class_names = InferenceEngine.load_class_names(args.classes) if args.classes else None
+        server = InferenceServer(args.model, class_names, args.max_batch_size, args.max_wait_ms,
+                                 args.host, args.port, args.xla)
+        try:
+            server.start()
+        except KeyboardInterrupt:
+            server.stop()
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(InferenceServer.main())
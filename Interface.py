@@ -6,15 +6,25 @@ from PyQt5.QtWidgets import (
 )
 
 from DataParameters import DataParameters
+from DatasetIndexer import DatasetIndexer
+from HeadlessRunner import HeadlessRunner
+from LogSink import LogSink
+from RunRegistry import RunRegistry
 from Model import Model
 from NetworkLogName import NetworkLogName
-from TrainerThread import TrainerThread
-from ModelCreator import ModelCreator
-import subprocess
+from SplitManifest import SplitManifest
+from TensorBoardManager import TensorBoardManager
+import threading
 import webbrowser
-import time
 
 from VitParameters import VitParameters
+from WarmupThread import WarmupThread
+import json
+import os
+
+# obs: Os módulos que dependem do TensorFlow (ModelCreator, TrainerThread, AsyncCheckpoint) são importados
+# apenas nos métodos que os utilizam, para que a janela seja exibida sem aguardar o carregamento do TensorFlow
+# (que é feito em segundo plano pela WarmupThread)
 
 
 class Interface(QWidget):
@@ -41,20 +51,41 @@ class Interface(QWidget):
         self.log_area.setPlaceholderText("Status do treinamento aparecerá aqui...") # Texto de placeholder
         main_layout.addWidget(self.log_area, stretch=3)  # Adiciona o widget no layout principal
 
+        # As mensagens passam por um buffer e são inseridas em lote periodicamente (ver LogSink), mantendo
+        # apenas as linhas mais recentes na tela; o log completo de cada treinamento é salvo em arquivo
+        self.log_sink = LogSink(self.log_area, parent=self)
+
+        # Ingestão periódica dos logs do TensorBoard no índice de execuções (logs/runs.sqlite). A ingestão
+        # importa o TensorFlow, então só começa depois da WarmupThread (ver start_ingester)
+        self.ingester_stop = None
+
+        # Servidores do TensorBoard (um por pasta de logs, reutilizados entre cliques)
+        self.tensorboard = TensorBoardManager()
+
+        # Carregamento do TensorFlow em segundo plano, enquanto o usuário escolhe o dataset
+        self.warmup_thread = WarmupThread()
+        self.warmup_thread.warmup_finished.connect(self.add_log_message)
+        self.warmup_thread.finished.connect(self.start_ingester)
+        self.warmup_thread.start()
+
         # Layout vertical para os botões
         button_layout = QVBoxLayout()
 
         # Definição dos botões
         self.btn_select_folder = QPushButton("Selecionar Dataset")
+        self.btn_cancel_indexing = QPushButton("Cancelar Indexação")
         self.btn_network_build = QPushButton("Construir Modelo ViT")
         self.btn_train = QPushButton("Iniciar Treinamento")
+        self.btn_resume = QPushButton("Retomar Treinamento")
         self.btn_tensorboard = QPushButton("Abrir Tensorboard")
         self.btn_exit = QPushButton("Sair")
 
         # Adiciona botões ao layout vertical
         button_layout.addWidget(self.btn_select_folder)
+        button_layout.addWidget(self.btn_cancel_indexing)
         button_layout.addWidget(self.btn_network_build)
         button_layout.addWidget(self.btn_train)
+        button_layout.addWidget(self.btn_resume)
         button_layout.addWidget(self.btn_tensorboard)
         button_layout.addWidget(self.btn_exit)
         button_layout.addStretch()  # empurra os botões para cima
@@ -64,15 +95,19 @@ class Interface(QWidget):
 
         # Conexão dos botões de função
         self.btn_select_folder.clicked.connect(self.select_data)
+        self.btn_cancel_indexing.clicked.connect(self.cancel_indexing)
         self.btn_network_build.clicked.connect(self.build_network)
         self.btn_train.clicked.connect(self.train_network)
+        self.btn_resume.clicked.connect(self.resume_training)
         self.btn_tensorboard.clicked.connect(self.open_logs)
         self.btn_exit.clicked.connect(self.exit_program)
 
         # Definindo o status inicial dos botões
         self.btn_select_folder.setEnabled(True)
+        self.btn_cancel_indexing.setEnabled(False)
         self.btn_network_build.setEnabled(False)
         self.btn_train.setEnabled(False)
+        self.btn_resume.setEnabled(True)
         self.btn_tensorboard.setEnabled(True)
         self.btn_exit.setEnabled(True)
 
@@ -82,8 +117,13 @@ class Interface(QWidget):
         self.image_generator_input_size = None
         self.image_generator_batch_size = None
         self.image_generator_split = None
+        self.image_generator_loader = None
         self.train_data = None
         self.val_data = None
+        self.split_manifest = None
+        self.dataset_path = None
+        self.indexer_thread = None
+        self.pending_resume = None  # (pasta, configuração) da execução retomada, aguardando os dados
 
         # ----------------------------------------------
 
@@ -97,6 +137,11 @@ class Interface(QWidget):
         self.transformer_layers = None
         self.num_heads = None
         self.mlp_units = None
+        self.patch_embedding = None
+        self.head = None
+        self.head_dim = None
+        self.attention = None
+        self.attention_chunk_size = None
 
         # ----------------------------------------------
 
@@ -126,7 +171,24 @@ class Interface(QWidget):
 
     def add_log_message(self, msg: str):
 
-        self.log_area.append(msg)
+        self.log_sink.write(msg)
+
+    def start_trainer_thread(self):
+        """ Conecta os sinais da thread de treinamento e a inicia """
+        self.log_sink.start_run()
+        # Conexão direta: as mensagens entram no buffer a partir da própria thread de treinamento,
+        # sem gerar um evento na thread da interface para cada mensagem
+        self.trainer_thread.log_signal.connect(self.log_sink.write, Qt.DirectConnection)
+        self.trainer_thread.log_path_signal.connect(self.open_run_log)
+        self.trainer_thread.training_finished.connect(self.save_weights)  # conecta flag
+        self.trainer_thread.training_finished.connect(self.close_run_log)
+        self.trainer_thread.start()
+
+    def open_run_log(self, log_path):
+        self.log_sink.open_file(os.path.join(log_path, "training.log"))
+
+    def close_run_log(self, success: bool):
+        self.log_sink.close_file()
 
     def select_data(self):
 
@@ -135,11 +197,14 @@ class Interface(QWidget):
             QMessageBox.warning(self, "Erro de valor", "Seleção de dados cancelada pelo usuário.")
             return  # encerra a função sem travar
 
+        self.dataset_path = path
+
         dialog = DataParameters()
         if dialog.exec_() == QDialog.Accepted:
             self.image_generator_input_size = dialog.input_size
             self.image_generator_batch_size = dialog.batch_size
             self.image_generator_split = dialog.split
+            self.image_generator_loader = dialog.loader
         else:
             QMessageBox.warning(self, "Erro de valor","Seleção de dados cancelada pelo usuário.")
             return  # encerra a função sem travar
@@ -147,24 +212,80 @@ class Interface(QWidget):
         self.add_log_message(f'Input Size escolhido: {self.image_generator_input_size}')
         self.add_log_message(f'Batch Size escolhido: {self.image_generator_batch_size}')
         self.add_log_message(f'Taxa de divisão escolhida: {self.image_generator_split}')
+        self.add_log_message(f'Carregador de dados escolhido: {self.image_generator_loader}')
         self.add_log_message('--------------------------------------------------------')
 
-        model = Model()
+        # A indexação do dataset (divisão estratificada entre treino e validação, reaproveitada do disco quando
+        # o dataset não mudou) e o carregamento dos dados são feitos em segundo plano pela DatasetIndexer
+        self.split_manifest = None
+        self.pending_resume = None
+        self.start_indexer()
+        self.add_log_message('Indexando o dataset...')
 
-        self.train_data, self.val_data, log_training_samples, log_validation_samples, log_indexes, self.dataset_classes\
-            =  (model.load_data(path,
-                                (self.image_generator_input_size, self.image_generator_input_size),
-                                self.image_generator_batch_size,
-                                self.image_generator_split))
+    def start_indexer(self, manifest=None):
+        """ Inicia a DatasetIndexer com os parâmetros de dados atuais (manifest evita uma nova indexação) """
+        self.btn_select_folder.setEnabled(False)
+        self.btn_network_build.setEnabled(False)
+        self.btn_train.setEnabled(False)
+        self.btn_resume.setEnabled(False)
+        self.btn_cancel_indexing.setEnabled(True)
+
+        self.indexer_thread = DatasetIndexer(self.dataset_path,
+                                             self.image_generator_input_size,
+                                             self.image_generator_batch_size,
+                                             self.image_generator_split,
+                                             self.image_generator_loader,
+                                             manifest)
+        self.indexer_thread.progress.connect(self.indexing_progress)
+        self.indexer_thread.manifest_ready.connect(self.manifest_ready)
+        self.indexer_thread.data_loaded.connect(self.data_loaded)
+        self.indexer_thread.failed.connect(self.indexing_failed)
+        self.indexer_thread.finished.connect(self.indexing_finished)
+        self.indexer_thread.start()
+
+    def indexing_progress(self, class_name, files):
+        self.add_log_message(f'Classe {class_name}: {files} arquivos encontrados')
+
+    def manifest_ready(self, manifest):
+        # O manifesto é mantido para as etapas seguintes (construção e treinamento), sem nova leitura do diretório
+        self.split_manifest = manifest
+        if manifest.reused:
+            self.add_log_message('Divisão treino/validação reaproveitada (dataset inalterado)')
+        self.add_log_message('Carregando os dados...')
+
+    def data_loaded(self, data):
+        self.train_data, self.val_data, log_training_samples, log_validation_samples, log_indexes, \
+            self.dataset_classes = data
 
         self.add_log_message(log_training_samples)
         self.add_log_message(log_validation_samples)
         self.add_log_message(log_indexes)
         self.add_log_message('--------------------------------------------------------')
 
+        if self.pending_resume is not None:
+            self.start_resume()
+            return
+
         # Definindo o status do botão de construção da rede
         self.btn_network_build.setEnabled(True)
 
+    def indexing_failed(self, msg):
+        self.add_log_message(msg)
+        self.add_log_message('--------------------------------------------------------')
+        self.split_manifest = None
+        self.pending_resume = None
+
+    def indexing_finished(self):
+        self.btn_select_folder.setEnabled(True)
+        self.btn_resume.setEnabled(True)
+        self.btn_cancel_indexing.setEnabled(False)
+
+    def cancel_indexing(self):
+        if self.indexer_thread is not None and self.indexer_thread.isRunning():
+            self.indexer_thread.cancel()
+            self.btn_cancel_indexing.setEnabled(False)
+            self.add_log_message('Cancelando a indexação do dataset...')
+
     def build_network(self):
 
         if self.image_generator_input_size is None or self.dataset_classes is None:
@@ -178,6 +299,11 @@ class Interface(QWidget):
             self.transformer_layers = dialog.transformer_layers
             self.num_heads = dialog.num_heads
             self.mlp_units = dialog.mlp_units
+            self.patch_embedding = dialog.patch_embedding
+            self.head = dialog.head
+            self.head_dim = dialog.head_dim
+            self.attention = dialog.attention
+            self.attention_chunk_size = dialog.attention_chunk_size
         else:
             QMessageBox.warning(self, "Erro de valor", "Seleção de dados cancelada pelo usuário.")
             return  # encerra a função sem travar
@@ -187,6 +313,9 @@ class Interface(QWidget):
         self.add_log_message(f'Camadas de transformer: {self.transformer_layers}')
         self.add_log_message(f'Numero de cabeças de atenção: {self.num_heads}')
         self.add_log_message(f'Unidades do multilayer perceptron: {self.mlp_units}')
+        self.add_log_message(f'Patch embedding: {self.patch_embedding}')
+        self.add_log_message(f'Cabeça de classificação: {self.head}')
+        self.add_log_message(f'Atenção: {self.attention} (chunk: {self.attention_chunk_size})')
         self.add_log_message('--------------------------------------------------------')
 
         # O input size da rede tem o mesmo formato dos dados gerados, com 3 camadas (normal de imagens sem tratamento)
@@ -199,6 +328,8 @@ class Interface(QWidget):
 
 
 
+        from ModelCreator import ModelCreator
+
         self.vit = ModelCreator(vit_input_size,
                                 self.patch_size,
                                 num_patches,
@@ -206,14 +337,21 @@ class Interface(QWidget):
                                 self.transformer_layers,
                                 self.num_heads,
                                 self.mlp_units,
-                                self.dataset_classes)
+                                self.dataset_classes,
+                                patch_embedding=self.patch_embedding,
+                                head=self.head,
+                                head_dim=self.head_dim,
+                                attention=self.attention,
+                                attention_chunk_size=self.attention_chunk_size)
 
         self.vit_model = self.vit.vit_classifier()
+        self.add_log_message(f'Dimensão de cada cabeça de atenção: {self.vit.head_dim}')
 
         if self.vit_model:
             self.add_log_message(f'Rede construída: {self.vit_model}')
             self.add_log_message(f'Rede compilada com sucesso!')
             self.add_log_message(f'Quantidade de classes encontradas: {self.dataset_classes}')
+            self.add_log_message(f'Quantidade de parâmetros: {self.vit_model.count_params():,}')
         self.add_log_message('--------------------------------------------------------')
 
         # Definindo o status do botão de construção da rede
@@ -225,21 +363,132 @@ class Interface(QWidget):
             QMessageBox.warning(self, "Erro", "Dataset inválido para iniciar treinamento ou rede não construída")
             return
 
-        dialog = NetworkLogName()
+        dialog = NetworkLogName(loader=self.image_generator_loader)
         if dialog.exec_() == QDialog.Accepted:
             fileName = dialog.log_name
             self.fileName_weights = fileName
             epochs = dialog.epochs
+            training_options = dialog.training_options()
+            mixed_precision = training_options["mixed_precision"]
 
         else:
             QMessageBox.warning(self, "Erro de valor", "Seleção de nome dos logs cancelada pelo usuário.")
             return  # encerra a função sem travar
 
+        # A política de precisão é definida na criação das camadas, então a rede é reconstruída
+        # quando a opção escolhida difere daquela usada na construção
+        if mixed_precision != self.vit.mixed_precision:
+            self.vit.mixed_precision = mixed_precision
+            self.vit_model = self.vit.vit_classifier()
+            self.add_log_message(f'Rede reconstruída com precisão {"mista" if mixed_precision else "float32"}')
+
+        config = self.run_config(epochs, fileName, training_options)
+
+        from TrainerThread import TrainerThread
+
         # cria a thread de treinamento
-        self.trainer_thread = TrainerThread(self.vit_model, self.train_data, self.val_data, epochs, fileName)
-        self.trainer_thread.log_signal.connect(self.add_log_message)  # conecta o log ao QTextEdit
-        self.trainer_thread.training_finished.connect(self.save_weights)  # conecta flag
-        self.trainer_thread.start()
+        self.trainer_thread = TrainerThread(self.vit_model, self.train_data, self.val_data, epochs, fileName,
+                                            split_manifest=self.split_manifest,
+                                            run_config=config,
+                                            **HeadlessRunner.trainer_options(config))
+        self.start_trainer_thread()
+
+    def resume_training(self):
+        """
+        Retoma um treinamento interrompido a partir do último checkpoint. A pasta da execução (em logs/fit/)
+        contém os parâmetros (run_config.json) e a divisão treino/validação (split_manifest.json) usados,
+        então os dados e a rede são reconstruídos exatamente como no treinamento original.
+        """
+        run_dir = self.model.open_directory()
+        if not run_dir:
+            QMessageBox.warning(self, "Erro", "Pasta da execução não foi definida")
+            return
+
+        from AsyncCheckpoint import AsyncCheckpoint
+
+        config_path = os.path.join(run_dir, "run_config.json")
+        manifest_path = os.path.join(run_dir, "split_manifest.json")
+        state = AsyncCheckpoint.latest_state(run_dir)
+        if not os.path.exists(config_path) or not os.path.exists(manifest_path) or state is None:
+            QMessageBox.warning(self, "Erro", "A pasta escolhida não contém um treinamento com checkpoint")
+            return
+
+        with open(config_path, "r", encoding="utf-8") as file:
+            config = HeadlessRunner.resolve_config(json.load(file))
+
+        self.add_log_message(f'Retomando a execução {run_dir} a partir da época {state["epoch"]}')
+
+        # Restaura os atributos da interface com os parâmetros da execução
+        self.dataset_path = config["dataset_path"]
+        self.image_generator_input_size = config["input_size"]
+        self.image_generator_batch_size = config["batch_size"]
+        self.image_generator_split = config["split"]
+        self.image_generator_loader = config["loader"]
+        self.split_manifest = SplitManifest.load(manifest_path)
+        self.patch_size = config["patch_size"]
+        self.projection_dim = config["projection_dim"]
+        self.transformer_layers = config["transformer_layers"]
+        self.num_heads = config["num_heads"]
+        self.mlp_units = config["mlp_units"]
+        self.patch_embedding = config["patch_embedding"]
+        self.head = config["head"]
+        self.head_dim = config["head_dim"]
+        self.attention = config["attention"]
+        self.attention_chunk_size = config["attention_chunk_size"]
+        self.fileName_weights = config["run_name"]
+
+        # Os dados são carregados em segundo plano (a divisão salva na execução é reutilizada, sem nova
+        # indexação); o treinamento continua em start_resume, quando a DatasetIndexer termina
+        self.pending_resume = (run_dir, config)
+        self.start_indexer(self.split_manifest)
+        self.add_log_message('Carregando os dados da execução...')
+
+    def start_resume(self):
+        """ Reconstrói a rede da execução retomada e inicia o treinamento a partir do último checkpoint """
+        from TrainerThread import TrainerThread
+
+        run_dir, config = self.pending_resume
+        self.pending_resume = None
+
+        self.vit = HeadlessRunner.network_creator(config, self.dataset_classes)
+        self.vit_model = self.vit.vit_classifier()
+        self.btn_train.setEnabled(True)
+
+        self.trainer_thread = TrainerThread(self.vit_model, self.train_data, self.val_data, config["epochs"],
+                                            config["run_name"],
+                                            split_manifest=self.split_manifest,
+                                            run_config=config,
+                                            resume_from=run_dir,
+                                            **HeadlessRunner.trainer_options(config))
+        self.start_trainer_thread()
+
+    def run_config(self, epochs, fileName, training_options):
+        """
+        Parâmetros da execução no mesmo formato da configuração do HeadlessRunner, salvos junto aos logs.
+        Com esse arquivo, a mesma execução pode ser repetida em um servidor sem interface gráfica.
+        """
+        # Os parâmetros não definidos pela interface recebem os valores padrão do HeadlessRunner
+        return HeadlessRunner.resolve_config({
+            "dataset_path": self.dataset_path,
+            "input_size": self.image_generator_input_size,
+            "batch_size": self.image_generator_batch_size,
+            "split": self.image_generator_split,
+            "seed": self.split_manifest.seed if self.split_manifest is not None else 42,
+            "loader": self.image_generator_loader,
+            "patch_size": self.patch_size,
+            "projection_dim": self.projection_dim,
+            "transformer_layers": self.transformer_layers,
+            "num_heads": self.num_heads,
+            "mlp_units": self.mlp_units,
+            "patch_embedding": self.patch_embedding,
+            "head": self.head,
+            "head_dim": self.head_dim,
+            "attention": self.attention,
+            "attention_chunk_size": self.attention_chunk_size,
+            "epochs": epochs,
+            "run_name": fileName,
+            **training_options
+        })
 
     def save_weights(self, success: bool):
         if success:
@@ -257,22 +506,36 @@ class Interface(QWidget):
             QMessageBox.warning(self, "Erro", "Caminho para o diretório não foi definido")
             return
 
+        # A inicialização (e a espera até o servidor responder) acontece fora da thread da interface
+        threading.Thread(target=self.launch_tensorboard, args=(log_path,), daemon=True).start()
+
+    def launch_tensorboard(self, log_path):
         try:
-            process = subprocess.Popen(
-                ["tensorboard", f"--logdir=\"{log_path}\"", "--port=6006"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
+            url, reused = self.tensorboard.open(log_path)
+        except Exception as e:
+            self.add_log_message(f'Erro ao inicializar o tensorboard: {str(e)}')
+            return
 
-            time.sleep(3)  # dá tempo do servidor iniciar
-            webbrowser.open("http://localhost:6006")
-            self.add_log_message(f'Tensorboard inicializado no caminho: {self.log_path}')
-            self.add_log_message('--------------------------------------------------------')
+        webbrowser.open(url)
+        if reused:
+            self.add_log_message(f'Tensorboard já em execução para o caminho: {log_path} ({url})')
+        else:
+            self.add_log_message(f'Tensorboard inicializado no caminho: {log_path} ({url})')
+        self.add_log_message('--------------------------------------------------------')
 
-        except ValueError:
-            QMessageBox.information(self, 'Erro', 'Erro ao inicializar o tensorboard. Tente novamente')
+    def start_ingester(self):
+        """ Inicia a ingestão periódica após o carregamento do TensorFlow, evitando duas importações simultâneas """
+        if self.ingester_stop is None:
+            self.ingester_stop = RunRegistry().start_ingester(interval=300)
 
     def exit_program(self):
 
+        if self.indexer_thread is not None and self.indexer_thread.isRunning():
+            self.indexer_thread.cancel()
+            self.indexer_thread.wait()
+        self.log_sink.close_file()
+        if self.ingester_stop is not None:
+            self.ingester_stop.set()
+        self.tensorboard.stop_all()  # encerra os servidores do TensorBoard abertos pela interface
         self.close()  # Fecha a janela principal
         QApplication.quit()  # Finaliza o loop da aplicação corretamente
@@ -0,0 +1,78 @@
+import threading
+from collections import deque
+
+from PyQt5.QtCore import QObject, QTimer
+
+
+# A classe concentra as mensagens exibidas na área de log da interface.
+#
+# Inserir cada mensagem diretamente no QTextEdit (uma chamada de append por sinal) sobrecarrega a thread da
+# interface quando o treinamento registra mensagens com frequência, e o documento cresce sem limite em
+# execuções longas. Aqui:
+#   * write() apenas guarda a mensagem em um buffer protegido por lock, podendo ser chamado de qualquer thread
+#     (a TrainerThread o chama diretamente, sem passar pela fila de eventos da interface)
+#   * um QTimer esvazia o buffer periodicamente, inserindo todas as mensagens pendentes em uma única operação
+#   * o documento mantém apenas as últimas max_lines linhas (as mais antigas são descartadas da tela)
+#   * o log completo é gravado em arquivo (training.log, na pasta da execução), sem descarte
+class LogSink(QObject):
+
+    def __init__(self, text_edit, max_lines=5000, flush_interval_ms=200, parent=None):
+        super().__init__(parent)
+        self.text_edit = text_edit
+        self.max_lines = max_lines
+
+        # Limite de linhas (blocos) do documento: funciona como um buffer circular da área de log
+        self.text_edit.document().setMaximumBlockCount(max_lines)
+
+        self.lock = threading.Lock()
+        self.buffer = []  # mensagens ainda não exibidas
+
+        # Mensagens já exibidas que ainda não foram gravadas em arquivo (antes da pasta da execução existir)
+        self.unspilled = deque(maxlen=max_lines)
+        self.file = None
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start(flush_interval_ms)
+
+    def write(self, msg: str):
+        """ Adiciona uma mensagem ao buffer (seguro para chamadas de qualquer thread) """
+        with self.lock:
+            self.buffer.append(msg)
+
+    def flush(self):
+        """ Exibe as mensagens pendentes de uma só vez e as grava no arquivo de log (thread da interface) """
+        with self.lock:
+            if not self.buffer:
+                return
+            messages, self.buffer = self.buffer, []
+
+        # Apenas as últimas max_lines mensagens chegariam a ficar visíveis
+        self.text_edit.append("\n".join(messages[-self.max_lines:]))
+
+        if self.file is not None:
+            self.file.write("\n".join(messages) + "\n")
+            self.file.flush()
+        else:
+            self.unspilled.extend(messages)
+
+    def open_file(self, path):
+        """ Passa a gravar o log em path, incluindo as mensagens exibidas desde o início da execução """
+        self.close_file()
+        self.flush()
+        self.file = open(path, "a", encoding="utf-8")
+        if self.unspilled:
+            self.file.write("\n".join(self.unspilled) + "\n")
+            self.file.flush()
+            self.unspilled.clear()
+
+    def start_run(self):
+        """ Descarta as mensagens anteriores ainda não gravadas: o arquivo da próxima execução começa aqui """
+        self.flush()
+        self.unspilled.clear()
+
+    def close_file(self):
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
@@ -1,4 +1,10 @@
+import time
+
+# Instante de início do programa, usado para medir o tempo até a exibição da janela
+START_TIME = time.perf_counter()
+
 import sys
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QApplication
 from Interface import Interface
 
@@ -18,8 +24,14 @@ class Main:
     def run(self):
         self.interface.show()
         self.interface.resize(800, 600)
+        # Executado na primeira iteração do loop de eventos, logo após a janela ser desenhada
+        QTimer.singleShot(0, self.report_startup)
         sys.exit(self.app.exec())
 
+    def report_startup(self):
+        elapsed = time.perf_counter() - START_TIME
+        self.interface.add_log_message(f"Janela exibida em {elapsed:.2f} s após o início do programa")
+
 if __name__ == "__main__":
     main = Main()
     main.run()
@@ -1,8 +1,11 @@
 import os
 import sys
-import tkinter as tk
-from tkinter import filedialog
-from tensorflow.keras.preprocessing.image import  ImageDataGenerator
+
+from SplitManifest import SplitManifest
+
+# obs: Os módulos que dependem do TensorFlow (ImageDataGenerator, DataPipeline) são importados apenas dentro
+# de load_data. Assim, a interface pode usar resource_path e open_directory sem aguardar o carregamento do
+# TensorFlow, que leva alguns segundos.
 
 class Model:
 
@@ -20,6 +23,10 @@ class Model:
                 * root.withdraw() -  Oculta a janela principal (para exibir apenas o pop-up)
                 * filedialog.askdirectory(title="") - Abre a janela de seleção de pastas e retorna o caminho escolhido
         """
+        # O tkinter é importado apenas aqui, permitindo usar o restante da classe em máquinas sem display
+        import tkinter as tk
+        from tkinter import filedialog
+
         root = tk.Tk()
         root.withdraw()
 
@@ -31,48 +38,83 @@ class Model:
         return path
 
     @staticmethod
-    def load_data(dataset_path, img_size=(128, 128), batch_size=32, val_split=0.3):
+    def load_data(dataset_path, img_size=(128, 128), batch_size=32, val_split=0.3, loader='generator',
+                  manifest=None, cancelled=None):
         """
         O ImageDataGenerator é uma classe do Keras (tensorflow.keras.preprocessing.image) que facilita o
         pré-processamento de imagens para redes neurais. Ele permite carregar imagens de um diretório e aplicar
         transformações como normalização, rotação, espelhamento, aumento de dados (data augmentation), entre outras
 
-        obs: A divisão entre treino e validação não é aleatória por padrão no ImageDataGenerator quando
-        usamos o parâmetro validation_split. A separação é feita de forma ordenada, baseada na ordem
-        dos arquivos dentro das pastas.
+        obs: A divisão entre treino e validação não usa mais o validation_split do ImageDataGenerator (que é
+        ordenada pela ordem dos arquivos e percorre o diretório duas vezes). Ela é definida pelo SplitManifest,
+        que percorre o diretório uma única vez e faz uma divisão estratificada e embaralhada com semente fixa.
+        O manifesto pode ser informado já pronto (parâmetro manifest) para evitar qualquer nova leitura.
+
+        obs2: O parâmetro loader permite escolher o carregador de dados:
+            * 'generator' - ImageDataGenerator (decodificação imagem a imagem, em Python)
+            * 'tfdata' - pipeline tf.data paralelo (ver DataPipeline), com o mesmo retorno
+            * 'cache' - pipeline tf.data lendo do cache persistente de imagens decodificadas (ver ImageCache)
+
+        obs3: cancelled() é consultada durante a indexação e a atualização do cache; quando retorna True, o
+        carregamento é interrompido com InterruptedError (ver DatasetIndexer).
         """
 
+        if manifest is None:
+            manifest = SplitManifest.load_or_build(dataset_path, val_split, cancelled=cancelled)
+
+        if loader in ('tfdata', 'cache'):
+            from DataPipeline import DataPipeline
+            return DataPipeline.load_data(manifest, img_size, batch_size, use_cache=(loader == 'cache'),
+                                          cancelled=cancelled)
+
+        # O pandas é necessário apenas para o flow_from_dataframe
+        import pandas as pd
+        from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
         # Instância de uma objeto do ImageDataGenerator, definindo como parâmetros operações para o pré processamento
         datagen = ImageDataGenerator(
-            rescale=1.0 / 255,  # Normalização do valor dos pixels das imagens (Faixa de 0 à 1)
-            validation_split=val_split  # Define a divisão dos dados (imagens )entre treino e validação
+            rescale=1.0 / 255  # Normalização do valor dos pixels das imagens (Faixa de 0 à 1)
         )
 
+        # Nomes das classes na ordem dos índices do manifesto, garantindo os mesmos class_indices
+        class_names = sorted(manifest.class_indices, key=manifest.class_indices.get)
+
+        def subset_dataframe(subset):
+            return pd.DataFrame({
+                'filename': manifest.files(subset),
+                'class': [class_names[label] for label in manifest.labels(subset)]
+            })
+
         """
-        O flow_from_directory do ImageDataGenerator é utilizado para carregar automaticamente as imagens de um 
-        diretório organizado em subpastas, onde cada subpasta representa uma classe. Além disso, são aplicadas 
-        as transformações definidas no momento da instância (como normalização) e as prepara em batches para 
-        serem usadas no treinamento da CNN.
+        O flow_from_dataframe do ImageDataGenerator é utilizado para carregar as imagens listadas no manifesto
+        (caminho do arquivo + classe). Além disso, são aplicadas as transformações definidas no momento da 
+        instância (como normalização) e as prepara em batches para serem usadas no treinamento da CNN.
         """
         # Define a geração do grupo de treinamento, utilizando a instância do ImageData generator
-        train_generator = datagen.flow_from_directory(
+        train_generator = datagen.flow_from_dataframe(
 
-            dataset_path,  # Indica o caminho do diretório onde estão armazenadas as imagens
+            subset_dataframe('training'),  # Arquivos do treinamento definidos no manifesto
+            x_col='filename',  # Coluna com o caminho absoluto das imagens
+            y_col='class',  # Coluna com o nome da classe de cada imagem
+            classes=class_names,  # Fixa a ordem das classes (mesmos índices do manifesto)
             target_size=img_size,  # Redimensiona o tamanho das imagens que serão carregadas na CNN
             batch_size=batch_size,  # Define o número de imagens por lote que será carregado em cada iteração
             class_mode='categorical',  # Define as classes. 'categorical' indica que as saídas serão vetores one-hot.
-            subset='training'  # Aqui indicamos se queremos carregar os dados definidos em validation_split
-            # obs: Os dados definidos em validation_split podem ser descritos po 'training' ou 'validation'
+            validate_filenames=False  # Os arquivos já foram listados pelo manifesto, evitando uma nova verificação
         )
 
-        # Define a geração do grupo de treinamento, utilizando a instância do ImageData generator
-        val_generator = datagen.flow_from_directory(
-
-            dataset_path,  # Indica o caminho do diretório onde estão armazenadas as imagens
-            target_size=img_size,  # Redimensiona o tamanho das imagens que serão carregadas na CNN
-            batch_size=batch_size,  # Define o número de imagens por lote que será carregado em cada iteração
-            class_mode='categorical',   # Define as classes. 'categorical' indica que as saídas serão vetores one-hot.
-            subset='validation'  # Aqui indicamos se queremos carregar os dados definidos em validation_split
+        # Define a geração do grupo de validação, utilizando a instância do ImageData generator
+        val_generator = datagen.flow_from_dataframe(
+
+            subset_dataframe('validation'),  # Arquivos da validação definidos no manifesto
+            x_col='filename',
+            y_col='class',
+            classes=class_names,
+            target_size=img_size,
+            batch_size=batch_size,
+            class_mode='categorical',
+            shuffle=False,  # A ordem da validação não influencia o resultado
+            validate_filenames=False
         )
 
         log_training_samples = (f"Foram encontradas {train_generator.samples} imagens "
@@ -87,15 +129,3 @@ class Model:
                  log_validation_samples,
                  log_indexes,
                  train_generator.num_classes)
-
-    @staticmethod
-    def log_directory_manager(logName):
-        # Criar o diretório "logs/fit/" caso não exista
-        log_dir = "logs/fit/"
-        os.makedirs(log_dir, exist_ok=True)  # Garante que o diretório existe
-
-        # Criar um subdiretório único para cada execução
-        run_id = logName + '_run_' + str(len(os.listdir(log_dir)) + 1)
-        full_log_path = os.path.join(log_dir, run_id)
-
-        return full_log_path
\ No newline at end of file
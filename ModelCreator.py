@@ -6,6 +6,8 @@ from tensorflow.keras.callbacks import TensorBoard
 
 import PatchEncoder
 import PatchExtractor
+from ChunkedAttention import ChunkedAttention
+from PatchEmbedding import PatchEmbedding
 from PatchEncoder import PatchEncoder
 from PatchExtractor import PatchExtractor
 
@@ -15,7 +17,9 @@ from PatchExtractor import PatchExtractor
 class ModelCreator:
 
     def __init__(self, input_shape=None, patch_size=None, num_patches=None, projection_dim=None,
-                 transformer_layers=None, num_heads=None, mlp_units=None, num_classes=None):
+                 transformer_layers=None, num_heads=None, mlp_units=None, num_classes=None, mixed_precision=False,
+                 patch_embedding='extractor', head='flatten', head_dim=None, attention='keras',
+                 attention_chunk_size=64):
         # Parâmetros para o ViT
         # -------------------------------------------------------------------------
 
@@ -27,59 +31,78 @@ class ModelCreator:
         self.num_heads = num_heads  # número de cabeças de atenção (multi-head attention)
         self.mlp_units = mlp_units  # número de neurônios da MLP interna (ex: 128)
         self.num_classes = num_classes  # total de classes do problema de classificação
+        self.mixed_precision = mixed_precision  # constrói a rede com a política mista bfloat16/float32
+        # forma de gerar os embeddings dos patches: 'extractor' (PatchExtractor + PatchEncoder)
+        # ou 'fused' (PatchEmbedding, convolução com stride que faz a extração e a projeção de uma vez)
+        self.patch_embedding = patch_embedding
+        # cabeça de classificação: 'flatten' (todos os patches concatenados), 'gap' (média global dos tokens)
+        # ou 'cls' (token de classe aprendido, inserido no início da sequência)
+        self.head = head
+        # dimensão de cada cabeça de atenção; por padrão o projection_dim é dividido entre as cabeças
+        # (ex: 512 // 8 = 64), mantendo o custo da atenção independente do número de cabeças
+        if head_dim is None and projection_dim and num_heads:
+            head_dim = max(projection_dim // num_heads, 1)
+        self.head_dim = head_dim
+        # implementação da atenção: 'keras' (layers.MultiHeadAttention) ou 'chunked' (ChunkedAttention,
+        # que calcula o softmax em blocos de attention_chunk_size sem alocar a matriz completa de scores)
+        self.attention = attention
+        self.attention_chunk_size = attention_chunk_size
 
     # Construção da arquitetura do ViT
     # Recebe como parâmetros os subsets de treino e validação
     def vit_classifier(self):
+        # Com precisão mista, as camadas criadas a seguir calculam em bfloat16 e mantêm as variáveis em float32.
+        # A política é global no Keras e é capturada por cada camada no momento da sua criação, por isso ela
+        # é definida antes da construção e, ao final, volta a ser a política que estava em uso.
+        previous_policy = tf.keras.mixed_precision.global_policy()
+        tf.keras.mixed_precision.set_global_policy('mixed_bfloat16' if self.mixed_precision else 'float32')
+
+        try:
+            return self._build_vit()
+        finally:
+            tf.keras.mixed_precision.set_global_policy(previous_policy)
+
+    def _build_vit(self):
         # Aqui é definida a entrada do modelo, criando um placeholder para imagens com a
         # forma especificada por self.input_shape
         inputs = layers.Input(shape=self.input_shape)
-        # Usa a camada personalizada PatchExtractor para dividir a imagem em patches não sobrepostos.
-        patches = PatchExtractor(self.patch_size)(inputs)
-        # Aplica a camada PatchEncoder, responsável por projetar cada patch em um vetor projection_dim
-        # além de adiciona codificação posicional
-        encoded_patches = PatchEncoder(self.num_patches, self.projection_dim)(patches)
+        if self.patch_embedding == 'fused':
+            # A camada PatchEmbedding extrai e projeta os patches em uma única convolução, somando a
+            # codificação posicional, sem materializar o tensor intermediário de patches
+            encoded_patches = PatchEmbedding(self.patch_size, self.num_patches, self.projection_dim,
+                                             use_cls_token=(self.head == 'cls'))(inputs)
+        else:
+            # Usa a camada personalizada PatchExtractor para dividir a imagem em patches não sobrepostos.
+            # obs: A extração apenas reorganiza os pixels, então é mantida em float32 mesmo com precisão mista;
+            # a conversão para bfloat16 acontece na projeção do PatchEncoder.
+            patches = PatchExtractor(self.patch_size, dtype='float32')(inputs)
+            # Aplica a camada PatchEncoder, responsável por projetar cada patch em um vetor projection_dim
+            # além de adiciona codificação posicional
+            encoded_patches = PatchEncoder(self.num_patches, self.projection_dim,
+                                           use_cls_token=(self.head == 'cls'))(patches)
 
         # Blocos Transformer: executa vários blocos de Transformer Encoder (quantidade definida por transformer_layers)
         for _ in range(self.transformer_layers):
-            # Aqui ocorre o processo de normalização por camada, antes do processo de atenção
-            # Importante salientar que epsilon = 1e-6 representa um pequeno valor para evitar divisão por zero.
-            # Tal processo é importante por melhorar a estabilidade do treinamento
-            x1 = layers.LayerNormalization(epsilon=1e-6)(encoded_patches)
-
-            # Aplica atenção multi-cabeça (multi-head self-attention), onde cada "cabeça" foca em partes
-            # diferentes da sequência de patches. x1 é usado como query, key e value (self-attention) e
-            # dropout=0.1: evita overfitting.
-            attention_output = layers.MultiHeadAttention(
-                num_heads=self.num_heads, key_dim=self.projection_dim, dropout=0.1
-            )(x1, x1)
-
-            # Aplica uma conexão residual. Soma a saída da atenção com a entrada original, preservando
-            # a informação inicial e melhora o fluxo de gradiente.
-            x2 = layers.Add()([attention_output, encoded_patches])
-
-            # Normaliza novamente a sequência, antes de passar por uma MLP.
-            # A normalização antes de cada sub-bloco é prática padrão em Transformers.
-            x3 = layers.LayerNormalization(epsilon=1e-6)(x2)
-
-            # Aplica um MLP com duas camadas:
-            # Primeira camada: expande a capacidade (ex: 512 → 2048)
-            # Segunda camada: retorna ao projection_dim (ex: 2048 → 512)
-            # A ativação GELU é suave e eficaz para Transformers.
-            x3 = layers.Dense(self.mlp_units, activation=tf.nn.gelu)(x3)
-            x3 = layers.Dense(self.projection_dim)(x3)
-
-            # Outra conexão residual, agora para o sub-bloco MLP.
-            # Resultado é a entrada para o próximo bloco Transformer, se houver mais
-            encoded_patches = layers.Add()([x3, x2])
+            encoded_patches = self.transformer_block(encoded_patches)
 
         # Trecho referente à cabeça de classificação
         # Normaliza o vetor final de cada patch após os blocos do encoder.
-        representation = layers.LayerNormalization(epsilon=1e-6)(encoded_patches)
+        # obs: Com precisão mista, essa normalização é calculada em float32 para estabilizar a cabeça de classificação
+        representation = layers.LayerNormalization(epsilon=1e-6, dtype='float32')(encoded_patches)
 
-        # "Achata" todos os vetores em um único vetor plano por imagem.
-        # Isso cria um vetor representando toda a imagem (todos os patches).
-        representation = layers.Flatten()(representation)
+        if self.head == 'gap':
+            # Média global sobre os tokens: o vetor resultante tem tamanho projection_dim, independente
+            # da resolução da imagem (e, portanto, do número de patches)
+            representation = layers.GlobalAveragePooling1D()(representation)
+        elif self.head == 'cls':
+            # Usa apenas o token de classe (posição 0), que agregou a informação dos patches via atenção
+            representation = representation[:, 0]
+        else:
+            # "Achata" todos os vetores em um único vetor plano por imagem.
+            # Isso cria um vetor representando toda a imagem (todos os patches).
+            # obs: O tamanho do vetor (num_patches × projection_dim) e, portanto, da Dense seguinte,
+            # cresce com a resolução da imagem
+            representation = layers.Flatten()(representation)
 
         # Aplica dropout com 50% de taxa, ajudando a reduzir o overfitting.
         representation = layers.Dropout(0.5)(representation)
@@ -92,7 +115,8 @@ class ModelCreator:
         # Na última camada, temos:
         # Gera um vetor com num_classes valores (logits).
         # Cada valor representa o grau de associação com uma classe.
-        logits = layers.Dense(self.num_classes)(features)
+        # obs: Os logits são sempre mantidos em float32, pois o softmax e a perda são sensíveis à baixa precisão
+        logits = layers.Dense(self.num_classes, dtype='float32')(features)
 
         # Cria o modelo final com entrada inputs e saída logits.
         model = tf.keras.Model(inputs=inputs, outputs=logits)
@@ -101,6 +125,114 @@ class ModelCreator:
         # self.vit_compile_train(model, train_generator, validation_generator, eps)
         return model
 
+    def transformer_block(self, encoded_patches):
+        """
+        Bloco Transformer Encoder (atenção multi-cabeça + MLP, ambos com normalização prévia e conexão residual).
+        Recebe e retorna a sequência de tokens (batch, tokens, projection_dim).
+        """
+        # Aqui ocorre o processo de normalização por camada, antes do processo de atenção
+        # Importante salientar que epsilon = 1e-6 representa um pequeno valor para evitar divisão por zero.
+        # Tal processo é importante por melhorar a estabilidade do treinamento
+        x1 = layers.LayerNormalization(epsilon=1e-6)(encoded_patches)
+
+        # Aplica atenção multi-cabeça (multi-head self-attention), onde cada "cabeça" foca em partes
+        # diferentes da sequência de patches. x1 é usado como query, key e value (self-attention) e
+        # dropout=0.1: evita overfitting.
+        # obs: key_dim é a dimensão de cada cabeça (head_dim), e não o projection_dim completo
+        if self.attention == 'chunked':
+            attention_output = ChunkedAttention(
+                num_heads=self.num_heads, key_dim=self.head_dim, dropout=0.1,
+                chunk_size=self.attention_chunk_size
+            )(x1, x1)
+        else:
+            attention_output = layers.MultiHeadAttention(
+                num_heads=self.num_heads, key_dim=self.head_dim, dropout=0.1
+            )(x1, x1)
+
+        # Aplica uma conexão residual. Soma a saída da atenção com a entrada original, preservando
+        # a informação inicial e melhora o fluxo de gradiente.
+        x2 = layers.Add()([attention_output, encoded_patches])
+
+        # Normaliza novamente a sequência, antes de passar por uma MLP.
+        # A normalização antes de cada sub-bloco é prática padrão em Transformers.
+        x3 = layers.LayerNormalization(epsilon=1e-6)(x2)
+
+        # Aplica um MLP com duas camadas:
+        # Primeira camada: expande a capacidade (ex: 512 → 2048)
+        # Segunda camada: retorna ao projection_dim (ex: 2048 → 512)
+        # A ativação GELU é suave e eficaz para Transformers.
+        x3 = layers.Dense(self.mlp_units, activation=tf.nn.gelu)(x3)
+        x3 = layers.Dense(self.projection_dim)(x3)
+
+        # Outra conexão residual, agora para o sub-bloco MLP.
+        # Resultado é a entrada para o próximo bloco Transformer, se houver mais
+        return layers.Add()([x3, x2])
+
+    @staticmethod
+    def transfer_patch_weights(source_layer, target_layer):
+        """
+        Converte os pesos da projeção dos patches entre PatchEncoder ('extractor') e PatchEmbedding ('fused'), em
+        qualquer direção. O kernel da Dense tem shape (patch_size² · 3, projection_dim) e o da convolução
+        (patch_size, patch_size, 3, projection_dim); como o extract_patches achata cada patch na ordem
+        (linha, coluna, canal), a mesma do kernel da convolução, a conversão é um reshape. O bias, o token de
+        classe e a codificação posicional são copiados sem alteração.
+        """
+        if source_layer.use_cls_token != target_layer.use_cls_token:
+            raise ValueError("As camadas de embedding diferem no uso do token de classe")
+
+        target_layer.projection.kernel.assign(tf.reshape(source_layer.projection.kernel,
+                                                         target_layer.projection.kernel.shape))
+        target_layer.projection.bias.assign(source_layer.projection.bias)
+        if source_layer.use_cls_token:
+            target_layer.cls_token.assign(source_layer.cls_token)
+        target_layer.position_embedding.embeddings.assign(source_layer.position_embedding.embeddings)
+
+    @staticmethod
+    def transfer_weights(source_model, target_model):
+        """
+        Copia os pesos entre duas redes com os mesmos hiperparâmetros, que podem diferir na forma de gerar os
+        embeddings dos patches ('extractor' ↔ 'fused'). As camadas com pesos são pareadas na ordem da rede (o
+        PatchExtractor não tem pesos); a camada de embedding é convertida por transfer_patch_weights.
+        """
+        source_layers = [layer for layer in source_model.layers if layer.weights]
+        target_layers = [layer for layer in target_model.layers if layer.weights]
+        if len(source_layers) != len(target_layers):
+            raise ValueError("As redes não têm a mesma arquitetura (quantidade de camadas com pesos diferente)")
+
+        embedding_types = (PatchEncoder, PatchEmbedding)
+        for source_layer, target_layer in zip(source_layers, target_layers):
+            if isinstance(source_layer, embedding_types) and isinstance(target_layer, embedding_types):
+                ModelCreator.transfer_patch_weights(source_layer, target_layer)
+            else:
+                target_layer.set_weights(source_layer.get_weights())
+
+    @staticmethod
+    def check_transfer(source_model, target_model, tolerance=1e-3):
+        """
+        Compara as saídas (logits) das duas redes em uma imagem aleatória e retorna a maior diferença relativa.
+        Uma diferença acima de tolerance indica que a conversão dos pesos não preservou a rede.
+        """
+        images = tf.random.uniform((1,) + tuple(source_model.input_shape[1:]))
+        expected = source_model(images, training=False)
+        converted = target_model(images, training=False)
+
+        difference = float(tf.reduce_max(tf.abs(expected - converted)) / (1.0 + tf.reduce_max(tf.abs(expected))))
+        if difference > tolerance:
+            raise ValueError(f"As saídas da rede convertida diferem da original (diferença relativa {difference:.2e})")
+        return difference
+
+    def convert_model(self, source_model):
+        """
+        Constrói a rede desta configuração (com o patch_embedding definido no construtor) usando os pesos de
+        source_model, treinada com o outro tipo de embedding. Ex: reaproveitar os pesos de uma rede 'extractor'
+        em uma rede 'fused'. A equivalência é conferida em uma imagem aleatória (check_transfer).
+        """
+        target_model = self.vit_classifier()
+        ModelCreator.transfer_weights(source_model, target_model)
+        # Com precisão mista (bfloat16), a tolerância acompanha a menor precisão do cálculo
+        ModelCreator.check_transfer(source_model, target_model, tolerance=5e-2 if self.mixed_precision else 1e-3)
+        return target_model
+
     '''
     def vit_compile_train(self, model, train_generator, validation_generator, eps):
         # Esse metodo prepara o modelo para o treinamento.
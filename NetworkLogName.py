@@ -1,8 +1,9 @@
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox,
+                             QCheckBox, QComboBox)
 
 
 class NetworkLogName(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, loader='generator'):
         super().__init__(parent)
 
         # Cria uma nova janela para definição de parâmetros do tratamento de
@@ -11,6 +12,22 @@ class NetworkLogName(QDialog):
 
         self.log_name = None
         self.epochs = None
+        self.mixed_precision = False
+        self.jit_compile = False
+        self.checkpoint_every = 1
+        self.learning_rate = 1e-4
+        self.lr_schedule = 'constant'
+        self.warmup_epochs = 0
+        self.decay_epochs = 10
+        self.decay_rate = 0.5
+        self.early_stopping = None
+        self.patience = 10
+        self.histogram_freq = 1
+        self.profile_batch = None
+        self.augmentation = None
+        self.mixup_alpha = 0.0
+        self.cutmix_alpha = 0.0
+        self.accumulation_steps = 1
 
         # Layout principal, organizando verticalmente os widgets na janela
         layout = QVBoxLayout()
@@ -32,6 +49,130 @@ class NetworkLogName(QDialog):
         h_layout.addWidget(self.epochs_edit)  # Adição do widget QLineEdit ao layout horizontal
         layout.addLayout(h_layout)  # Adição do layout horizonatal deste bloco ao layout vertical principal
 
+        # Frequência dos checkpoints (permitem retomar um treinamento interrompido)
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(QLabel("Salvar checkpoint a cada N épocas (0 desativa):"))
+        self.checkpoint_edit = QLineEdit()
+        self.checkpoint_edit.setPlaceholderText('1')
+        h_layout.addWidget(self.checkpoint_edit)
+        layout.addLayout(h_layout)
+
+        # Taxa de aprendizado inicial (máxima, nos agendamentos)
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(QLabel("Taxa de aprendizado:"))
+        self.learning_rate_edit = QLineEdit()
+        self.learning_rate_edit.setPlaceholderText('1e-4')
+        h_layout.addWidget(self.learning_rate_edit)
+        layout.addLayout(h_layout)
+
+        # Agendamento da taxa de aprendizado (O texto exibido é associado ao identificador do Trainer)
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(QLabel("Agendamento da taxa:"))
+        self.lr_schedule_combo = QComboBox()
+        self.lr_schedule_combo.addItem("Constante", 'constant')
+        self.lr_schedule_combo.addItem("Aquecimento + cosseno", 'cosine')
+        self.lr_schedule_combo.addItem("Decaimento em degraus", 'step')
+        h_layout.addWidget(self.lr_schedule_combo)
+        layout.addLayout(h_layout)
+
+        # Épocas de aquecimento (usadas apenas pelo agendamento com cosseno)
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(QLabel("Épocas de aquecimento:"))
+        self.warmup_epochs_edit = QLineEdit()
+        self.warmup_epochs_edit.setPlaceholderText('0')
+        h_layout.addWidget(self.warmup_epochs_edit)
+        layout.addLayout(h_layout)
+
+        # Intervalo e fator do decaimento (usados apenas pelo agendamento em degraus)
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(QLabel("Decaimento a cada N épocas:"))
+        self.decay_epochs_edit = QLineEdit()
+        self.decay_epochs_edit.setPlaceholderText('10')
+        h_layout.addWidget(self.decay_epochs_edit)
+        h_layout.addWidget(QLabel("Fator:"))
+        self.decay_rate_edit = QLineEdit()
+        self.decay_rate_edit.setPlaceholderText('0.5')
+        h_layout.addWidget(self.decay_rate_edit)
+        layout.addLayout(h_layout)
+
+        # Parada antecipada (O texto exibido é associado à métrica monitorada)
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(QLabel("Parada antecipada:"))
+        self.early_stopping_combo = QComboBox()
+        self.early_stopping_combo.addItem("Desativada", None)
+        self.early_stopping_combo.addItem("Acurácia de validação", 'val_accuracy')
+        self.early_stopping_combo.addItem("Perda de validação", 'val_loss')
+        h_layout.addWidget(self.early_stopping_combo)
+        layout.addLayout(h_layout)
+
+        # Paciência da parada antecipada
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(QLabel("Paciência (épocas sem melhora):"))
+        self.patience_edit = QLineEdit()
+        self.patience_edit.setPlaceholderText('10')
+        h_layout.addWidget(self.patience_edit)
+        layout.addLayout(h_layout)
+
+        # Frequência dos histogramas de pesos no TensorBoard (custosos em redes grandes)
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(QLabel("Histogramas a cada N épocas (0 desativa):"))
+        self.histogram_freq_edit = QLineEdit()
+        self.histogram_freq_edit.setPlaceholderText('1')
+        h_layout.addWidget(self.histogram_freq_edit)
+        layout.addLayout(h_layout)
+
+        # Intervalo de passos capturado pelo profiler (vazio desativa)
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(QLabel("Profiler nos passos (início,fim):"))
+        self.profile_batch_edit = QLineEdit()
+        self.profile_batch_edit.setPlaceholderText('Ex: 10,20')
+        h_layout.addWidget(self.profile_batch_edit)
+        layout.addLayout(h_layout)
+
+        # Aumento de dados em lote (O texto exibido é associado à configuração do BatchAugmentation)
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(QLabel("Aumento de dados (tf.data):"))
+        self.augmentation_combo = QComboBox()
+        self.augmentation_combo.addItem("Desativado", None)
+        self.augmentation_combo.addItem("Leve (flip + recorte)", 'light')
+        self.augmentation_combo.addItem("Forte (+ cor e RandAugment)", 'strong')
+        h_layout.addWidget(self.augmentation_combo)
+        layout.addLayout(h_layout)
+
+        # Mixup e CutMix (alpha da distribuição Beta; 0 desativa)
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(QLabel("Mixup alpha:"))
+        self.mixup_alpha_edit = QLineEdit()
+        self.mixup_alpha_edit.setPlaceholderText('0 (ex: 0.8)')
+        h_layout.addWidget(self.mixup_alpha_edit)
+        h_layout.addWidget(QLabel("CutMix alpha:"))
+        self.cutmix_alpha_edit = QLineEdit()
+        self.cutmix_alpha_edit.setPlaceholderText('0 (ex: 1.0)')
+        h_layout.addWidget(self.cutmix_alpha_edit)
+        layout.addLayout(h_layout)
+
+        # O aumento em lote é aplicado no pipeline tf.data, então fica indisponível com o ImageDataGenerator
+        if loader == 'generator':
+            for widget in (self.augmentation_combo, self.mixup_alpha_edit, self.cutmix_alpha_edit):
+                widget.setEnabled(False)
+                widget.setToolTip("Disponível apenas com os carregadores tf.data (com ou sem cache)")
+
+        # Acúmulo de gradientes (lote efetivo = N x batch size, com a memória de um lote)
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(QLabel("Acumular gradientes de N lotes:"))
+        self.accumulation_steps_edit = QLineEdit()
+        self.accumulation_steps_edit.setPlaceholderText('1')
+        h_layout.addWidget(self.accumulation_steps_edit)
+        layout.addLayout(h_layout)
+
+        # Opção de treinamento com precisão mista (bfloat16 no cálculo, float32 nas variáveis)
+        self.mixed_precision_check = QCheckBox("Precisão mista (bfloat16)")
+        layout.addWidget(self.mixed_precision_check)
+
+        # Opção de compilação da rede com XLA (fusão de operações)
+        self.jit_compile_check = QCheckBox("Compilar com XLA (jit_compile)")
+        layout.addWidget(self.jit_compile_check)
+
         # Botões OK e Cancel (Análogo à organização do bloco de código anterior)
         button_layout = QHBoxLayout()
         ok_button = QPushButton("OK")
@@ -50,13 +191,87 @@ class NetworkLogName(QDialog):
         try:
             self.log_name = str(self.name_edit.text())
             self.epochs = int(self.epochs_edit.text())
+            self.mixed_precision = self.mixed_precision_check.isChecked()
+            self.jit_compile = self.jit_compile_check.isChecked()
+            # Campo vazio mantém o padrão (checkpoint a cada época)
+            checkpoint_text = self.checkpoint_edit.text().strip()
+            self.checkpoint_every = int(checkpoint_text) if checkpoint_text else 1
+            learning_rate_text = self.learning_rate_edit.text().strip()
+            self.learning_rate = float(learning_rate_text) if learning_rate_text else 1e-4
+            self.lr_schedule = self.lr_schedule_combo.currentData()
+            warmup_text = self.warmup_epochs_edit.text().strip()
+            self.warmup_epochs = int(warmup_text) if warmup_text else 0
+            decay_epochs_text = self.decay_epochs_edit.text().strip()
+            self.decay_epochs = int(decay_epochs_text) if decay_epochs_text else 10
+            decay_rate_text = self.decay_rate_edit.text().strip()
+            self.decay_rate = float(decay_rate_text) if decay_rate_text else 0.5
+            self.early_stopping = self.early_stopping_combo.currentData()
+            patience_text = self.patience_edit.text().strip()
+            self.patience = int(patience_text) if patience_text else 10
+            histogram_text = self.histogram_freq_edit.text().strip()
+            self.histogram_freq = int(histogram_text) if histogram_text else 1
+            profile_text = self.profile_batch_edit.text().strip()
+            self.profile_batch = [int(value) for value in profile_text.split(",")] if profile_text else None
+            self.augmentation = self.augmentation_combo.currentData()
+            mixup_text = self.mixup_alpha_edit.text().strip()
+            self.mixup_alpha = float(mixup_text) if mixup_text else 0.0
+            cutmix_text = self.cutmix_alpha_edit.text().strip()
+            self.cutmix_alpha = float(cutmix_text) if cutmix_text else 0.0
+            accumulation_text = self.accumulation_steps_edit.text().strip()
+            self.accumulation_steps = int(accumulation_text) if accumulation_text else 1
 
             # valida se o valor das épocas é inteiro positivo
             if not self.epochs > 0:
                 QMessageBox.warning(self, "Erro", "O valor da quantidade de épocas deve ser positivo e inteiro")
                 return
+            if self.checkpoint_every < 0:
+                QMessageBox.warning(self, "Erro", "A frequência dos checkpoints não pode ser negativa")
+                return
+            if not self.learning_rate > 0:
+                QMessageBox.warning(self, "Erro", "A taxa de aprendizado deve ser positiva")
+                return
+            # As épocas de aquecimento só são usadas pelo agendamento com cosseno
+            if self.lr_schedule == 'cosine' and not 0 <= self.warmup_epochs < self.epochs:
+                QMessageBox.warning(self, "Erro", "As épocas de aquecimento devem ser menores que a quantidade "
+                                                  "de épocas")
+                return
+            if self.lr_schedule == 'step' and (self.decay_epochs < 1 or not 0 < self.decay_rate <= 1):
+                QMessageBox.warning(self, "Erro", "O decaimento deve ocorrer a cada 1 ou mais épocas, com fator "
+                                                  "entre 0 e 1")
+                return
+            if self.profile_batch is not None and (len(self.profile_batch) != 2
+                                                   or not 0 < self.profile_batch[0] <= self.profile_batch[1]):
+                QMessageBox.warning(self, "Erro", "Informe o intervalo do profiler como início,fim (ex: 10,20)")
+                return
+            if self.mixup_alpha < 0 or self.cutmix_alpha < 0:
+                QMessageBox.warning(self, "Erro", "Os valores de alpha do Mixup e do CutMix não podem ser negativos")
+                return
+            if self.accumulation_steps < 1:
+                QMessageBox.warning(self, "Erro", "O acúmulo de gradientes deve ser de pelo menos 1 lote")
+                return
 
             self.accept()  # fecha o dialog com resultado "aceito"
         except ValueError:
             QMessageBox.information(self, 'Erro', 'Erro ao definir parâmetros, possivelmente algum valor foi inserido '
-                                                  'incorretamente. Tente novamente')
\ No newline at end of file
+                                                  'incorretamente. Tente novamente')
+
+    def training_options(self):
+        """ Opções de treinamento escolhidas, no formato da configuração do HeadlessRunner """
+        return {
+            "mixed_precision": self.mixed_precision,
+            "jit_compile": self.jit_compile,
+            "checkpoint_every": self.checkpoint_every or None,  # 0 desativa os checkpoints
+            "learning_rate": self.learning_rate,
+            "lr_schedule": self.lr_schedule,
+            "warmup_epochs": self.warmup_epochs,
+            "decay_epochs": self.decay_epochs,
+            "decay_rate": self.decay_rate,
+            "early_stopping": self.early_stopping,
+            "patience": self.patience,
+            "histogram_freq": self.histogram_freq,
+            "profile_batch": self.profile_batch,
+            "augmentation": self.augmentation,
+            "mixup_alpha": self.mixup_alpha,
+            "cutmix_alpha": self.cutmix_alpha,
+            "accumulation_steps": self.accumulation_steps
+        }
@@ -0,0 +1,74 @@
+import tensorflow as tf
+from tensorflow.keras import layers
+
+
+# A classe funde, em uma única camada, o trabalho do PatchExtractor e do PatchEncoder.
+#
+# Em vez de extrair os patches com tf.image.extract_patches (gerando um tensor intermediário de shape
+# (batch_size, num_patches, patch_size * patch_size * 3)) e depois projetá-los com uma camada Dense, aqui
+# uma convolução com kernel e stride iguais ao patch_size faz as duas etapas de uma vez: cada posição da
+# convolução "enxerga" exatamente um patch e produz diretamente o vetor projection_dim. A codificação
+# posicional é somada na mesma camada.
+#
+# obs: A convolução é matematicamente equivalente à extração + Dense. O kernel da Dense, de shape
+# (patch_size * patch_size * 3, projection_dim), é o mesmo kernel da convolução, de shape
+# (patch_size, patch_size, 3, projection_dim), apenas reorganizado. Os pesos de uma rede treinada com o
+# PatchEncoder podem ser convertidos com ModelCreator.convert_model (a equivalência das saídas é conferida).
+class PatchEmbedding(layers.Layer):
+
+    # Contrutor da classe
+    # obs: patch_size define as dimensões de cada patch (ex: 16)
+    # obs2: num_patches é o número total de patches por imagem (ex: 14×14 = 196)
+    # obs3: projection_dim é a dimensão do vetor em que cada patch será projetado (ex: 512)
+    # obs4: use_cls_token adiciona um token de classe aprendido no início da sequência (como no PatchEncoder)
+    def __init__(self, patch_size, num_patches, projection_dim, use_cls_token=False, **kwargs):
+        super(PatchEmbedding, self).__init__(**kwargs)
+
+        self.patch_size = patch_size
+        self.num_patches = num_patches
+        self.projection_dim = projection_dim
+        self.use_cls_token = use_cls_token
+        self.num_positions = num_patches + 1 if use_cls_token else num_patches
+
+        # Convolução sem sobreposição (stride = kernel = patch_size) que projeta cada patch em projection_dim
+        self.projection = layers.Conv2D(filters=projection_dim, kernel_size=patch_size,
+                                        strides=patch_size, padding='valid')
+
+        # Tabela de embeddings posicionais, idêntica à do PatchEncoder
+        self.position_embedding = layers.Embedding(input_dim=self.num_positions, output_dim=projection_dim)
+
+    def build(self, input_shape):
+        # Token de classe (CLS), criado da mesma forma que no PatchEncoder
+        if self.use_cls_token:
+            self.cls_token = self.add_weight(
+                name='cls_token', shape=(1, 1, self.projection_dim), initializer='zeros', trainable=True
+            )
+        super(PatchEmbedding, self).build(input_shape)
+
+    # obs: Aqui, images é um tensor de shape: (batch_size, height, width, channels)
+    def call(self, images):
+        # Shape: (batch_size, height // patch_size, width // patch_size, projection_dim)
+        projected = self.projection(images)
+
+        # A grade de patches é achatada na mesma ordem (linha a linha) usada pelo PatchExtractor
+        # Shape: (batch_size, num_patches, projection_dim)
+        projected = tf.reshape(projected, [-1, self.num_patches, self.projection_dim])
+
+        # Insere o token de classe no início da sequência: (batch_size, num_patches + 1, projection_dim)
+        if self.use_cls_token:
+            cls_tokens = tf.broadcast_to(tf.cast(self.cls_token, projected.dtype),
+                                         [tf.shape(projected)[0], 1, self.projection_dim])
+            projected = tf.concat([cls_tokens, projected], axis=1)
+
+        positions = tf.range(start=0, limit=self.num_positions, delta=1)
+        return projected + self.position_embedding(positions)
+
+    def get_config(self):
+        config = super(PatchEmbedding, self).get_config()
+        config.update({
+            'patch_size': self.patch_size,
+            'num_patches': self.num_patches,
+            'projection_dim': self.projection_dim,
+            'use_cls_token': self.use_cls_token
+        })
+        return config
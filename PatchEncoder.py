@@ -14,13 +14,20 @@ class PatchEncoder(layers.Layer):
     # Contrutor da classe
     # obs: número total de patches por imagem (ex: 14×14 = 196)
     # obs2: dimensão do vetor em que cada patch será projetado (embedding size)
-    def __init__(self, num_patches, projection_dim):
+    # obs3: use_cls_token adiciona um token de classe aprendido no início da sequência (ver ModelCreator, head='cls')
+    def __init__(self, num_patches, projection_dim, use_cls_token=False, **kwargs):
         # Inicializa corretamente a superclasse Layer, garantindo que a camada
         # funcione dentro do ecossistema Keras (com suporte a treinamento, salvamento, etc).
-        super(PatchEncoder, self).__init__()
+        # obs: **kwargs repassa argumentos padrão de camadas do Keras, como name e dtype (política de precisão)
+        super(PatchEncoder, self).__init__(**kwargs)
 
         # Armazena o número de patches como atributo da instância para uso posterior.
         self.num_patches = num_patches
+        self.projection_dim = projection_dim
+        self.use_cls_token = use_cls_token
+
+        # Com o token de classe, a sequência passa a ter num_patches + 1 posições
+        self.num_positions = num_patches + 1 if use_cls_token else num_patches
 
         # Define uma camada Dense (fully connected) que será aplicada a cada patch individualmente.
         # Ela vai transformar o vetor bruto do patch (por exemplo, 768 valores de pixels) em um vetor
@@ -31,9 +38,20 @@ class PatchEncoder(layers.Layer):
         # tem um vetor associado. Essa camada vai gerar os vetores de codificação posicional, logo,
         # ao patch 0 associamos o vetor pos_encoding[0], ao patch 1 o pos_encoding[1], etc.
         self.position_embedding = layers.Embedding(
-            input_dim=num_patches, output_dim=projection_dim
+            input_dim=self.num_positions, output_dim=projection_dim
         )
 
+    # O metodo build cria os pesos próprios da camada quando o shape da entrada é conhecido
+    def build(self, input_shape):
+        # Token de classe (CLS): um único vetor aprendido, compartilhado por todas as imagens, que é
+        # inserido no início da sequência. Ao longo dos blocos transformer ele agrega, via atenção, a
+        # informação de todos os patches e serve de representação da imagem na cabeça de classificação.
+        if self.use_cls_token:
+            self.cls_token = self.add_weight(
+                name='cls_token', shape=(1, 1, self.projection_dim), initializer='zeros', trainable=True
+            )
+        super(PatchEncoder, self).build(input_shape)
+
     # O metodo call define o que a camada faz quando ela é chamada durante o modelo
     # É necessário compreender que a classe está sendo usada como se fosse uma função chamável.
     # Em Python, isso é chamado de overloading do operador (), e é habilitado por meio do
@@ -48,7 +66,7 @@ class PatchEncoder(layers.Layer):
     def call(self, patches):
         # Gera um tensor com os índices dos patches:[0, 1, 2, ..., num_patches-1]
         # servindo para buscar os embeddings de posição na linha seguinte.
-        positions = tf.range(start=0, limit=self.num_patches, delta=1)
+        positions = tf.range(start=0, limit=self.num_positions, delta=1)
 
         # Essa linha é o coração da camada, responsável por gerar o vetor final que
         # representa o patch com conteúdo + posição.
@@ -63,7 +81,26 @@ class PatchEncoder(layers.Layer):
         #
         # A soma entre a projeção do conteúdo de cada patch ea codificação de sua posição
         # gera o vetor final que representa o patch com conteúdo + posição.
-        encoded = self.projection(patches) + self.position_embedding(positions)
+        encoded = self.projection(patches)
+
+        # Insere o token de classe no início da sequência: (batch_size, num_patches + 1, projection_dim)
+        if self.use_cls_token:
+            cls_tokens = tf.broadcast_to(tf.cast(self.cls_token, encoded.dtype),
+                                         [tf.shape(encoded)[0], 1, self.projection_dim])
+            encoded = tf.concat([cls_tokens, encoded], axis=1)
+
+        encoded = encoded + self.position_embedding(positions)
 
         # Retorna a sequência de vetores com conteúdo e posição embutida
         return encoded
+
+    # O metodo get_config informa os parâmetros do construtor, permitindo que o Keras salve a camada no
+    # arquivo do modelo (.h5) e a reconstrua no carregamento (tf.keras.models.load_model)
+    def get_config(self):
+        config = super(PatchEncoder, self).get_config()
+        config.update({
+            'num_patches': self.num_patches,
+            'projection_dim': self.projection_dim,
+            'use_cls_token': self.use_cls_token
+        })
+        return config
@@ -10,10 +10,11 @@ from tensorflow.keras import layers
 class PatchExtractor(layers.Layer):
 
     # Contrutor da classe
-    def __init__(self, patch_size):
+    def __init__(self, patch_size, **kwargs):
         # super().__init__() chama o construtor da classe mãe (Layer),
         # garantindo a inicialização correta da camada no TensorFlow.
-        super(PatchExtractor, self).__init__()
+        # obs: **kwargs repassa argumentos padrão de camadas do Keras, como name e dtype (política de precisão)
+        super(PatchExtractor, self).__init__(**kwargs)
         # O patch_size define as dimensões de cada patch
         self.patch_size = patch_size
 
@@ -72,3 +73,10 @@ class PatchExtractor(layers.Layer):
 
         # Retorna os patches
         return patches
+
+    # O metodo get_config informa os parâmetros do construtor, permitindo que o Keras salve a camada no
+    # arquivo do modelo (.h5) e a reconstrua no carregamento (tf.keras.models.load_model)
+    def get_config(self):
+        config = super(PatchExtractor, self).get_config()
+        config.update({'patch_size': self.patch_size})
+        return config
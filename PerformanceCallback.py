@@ -0,0 +1,229 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.callbacks import Callback
+
+
+# Callback que mede o desempenho de cada passo de treinamento:
+#   * tempo total do passo (wall time) e imagens por segundo
+#   * tempo de espera pelos dados (o passo aguardando o próximo lote) versus tempo de cálculo
+#   * percentis p50/p95/p99 do tempo por passo, a cada época
+#
+# As imagens por segundo são calculadas em toda execução, a partir do tamanho do lote (batch_size x lotes por
+# chamada da função de treinamento) e do tempo medido de cada passo.
+#
+# Para separar a espera pelos dados do cálculo (opcional), instrument() substitui a função de treinamento do modelo:
+# os lotes de cada passo são retirados do iterador do Keras (o mesmo pipeline tf.data, com paralelismo e
+# prefetch intactos) fora do grafo, com a chamada cronometrada, e entregues à função de treinamento original.
+# Se o carregamento acompanha a rede, a espera é próxima de zero (o prefetch já deixou o lote pronto); quando
+# a espera ocupa boa parte do passo, o treinamento está limitado pela entrada de dados.
+#
+# Os resultados são enviados para o log (resumo por época), para o TensorBoard (escalares em
+# <pasta da execução>/performance) e para <pasta da execução>/performance.jsonl (uma linha por passo e um
+# resumo por época).
+#
+# obs: O primeiro passo do treinamento inclui o tracing e a compilação do grafo. Ele é registrado, mas não
+# entra nos percentis nem na vazão. Com instrument(), um lote final menor gera um segundo tracing.
+class PerformanceCallback(Callback):
+
+    def __init__(self, log_path, log=print, scalar_every_steps=10, batch_size=None, num_samples=None):
+        super().__init__()
+        self.log_path = log_path
+        self.log = log
+        self.scalar_every_steps = scalar_every_steps  # intervalo entre os escalares por passo no TensorBoard
+        # Sem instrument(), as imagens de cada passo vêm do tamanho do lote (limitadas à quantidade de imagens de
+        # treino da época, para o lote final menor)
+        self.batch_size = batch_size
+        self.num_samples = num_samples
+        self.epoch_images = 0
+
+        # Contadores alimentados pela função de treinamento cronometrada (ver instrument)
+        self.lock = threading.Lock()
+        self.wait_time = 0.0
+        self.images = 0
+        self.instrumented = False
+
+        self.writer = None
+        self.jsonl = None
+        self.global_step = 0
+        self.first_step = True
+        self.epoch = 0
+        self.epoch_steps = []
+        self.step_start = None
+        self.last_summary = None  # resumo da última época concluída
+
+    # ------------------------------------------------------------------------------------------------
+
+    def _record_batches(self, wait, batches):
+        with self.lock:
+            self.wait_time += wait
+            self.images += sum(int(batch[0].shape[0]) for batch in batches)
+
+    def estimated_images(self):
+        """ Imagens do passo pelo tamanho do lote (lotes por chamada = steps_per_execution) """
+        if not self.batch_size:
+            return None
+        images = self.batch_size * int(self.model._steps_per_execution.numpy())
+        if self.num_samples:
+            images = max(min(images, self.num_samples - self.epoch_images), 0)
+        return images
+
+    def _read_counters(self):
+        """ Retorna e zera os contadores acumulados desde a última leitura """
+        with self.lock:
+            wait, images = self.wait_time, self.images
+            self.wait_time, self.images = 0.0, 0
+        return wait, images
+
+    def instrument(self, model):
+        """
+        Passa a cronometrar a obtenção dos lotes de cada passo do model.fit, sem alterar o conjunto de treino.
+        Deve ser chamado após o compile (que descarta a função de treinamento já criada).
+        """
+        callback = self
+        make_train_function = model.make_train_function
+
+        def make_timed_train_function(force=False):
+            train_function = make_train_function(force)
+            if getattr(train_function, "timed", False):
+                return train_function
+
+            def timed_train_function(iterator):
+                # Quantidade de lotes da chamada (steps_per_execution, reduzido pelo Keras no final da época)
+                steps = int(model._steps_per_execution.numpy())
+                start = time.perf_counter()
+                batches = [iterator.get_next()]
+                for _ in range(steps - 1):
+                    try:
+                        batches.append(iterator.get_next())
+                    except tf.errors.OutOfRangeError:
+                        break
+                callback._record_batches(time.perf_counter() - start, batches)
+
+                # Os lotes já obtidos são entregues à função original por um iterador próprio
+                dataset = tf.data.Dataset.from_tensors(batches[0])
+                for batch in batches[1:]:
+                    dataset = dataset.concatenate(tf.data.Dataset.from_tensors(batch))
+                return train_function(iter(dataset))
+
+            timed_train_function.timed = True
+            model.train_function = timed_train_function
+            return timed_train_function
+
+        model.make_train_function = make_timed_train_function
+        self.instrumented = True
+
+    # ------------------------------------------------------------------------------------------------
+
+    def on_train_begin(self, logs=None):
+        os.makedirs(self.log_path, exist_ok=True)
+        self.writer = tf.summary.create_file_writer(os.path.join(self.log_path, "performance"))
+        self.jsonl = open(os.path.join(self.log_path, "performance.jsonl"), "a", encoding="utf-8")
+        self.first_step = True
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch = epoch
+        self.epoch_steps = []  # (tempo do passo, espera pelos dados, imagens)
+        self.epoch_images = 0
+        self._read_counters()
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self.step_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        step_time = time.perf_counter() - self.step_start
+        wait, images = self._read_counters()
+        if not self.instrumented:
+            images = self.estimated_images()
+        self.epoch_images += images or 0
+        self.global_step += 1
+
+        record = {
+            "type": "step",
+            "epoch": self.epoch + 1,
+            "step": self.global_step,
+            "step_ms": round(step_time * 1000, 3),
+            "data_wait_ms": round(wait * 1000, 3) if self.instrumented else None,
+            "images": images
+        }
+        if self.first_step:
+            # Passo com tracing/compilação: registrado à parte
+            record["compile"] = True
+            self.first_step = False
+            self.log(f"Primeiro passo (tracing e compilação): {step_time * 1000:.1f} ms")
+        else:
+            self.epoch_steps.append((step_time, wait, images))
+            if self.scalar_every_steps and self.global_step % self.scalar_every_steps == 0:
+                with self.writer.as_default(step=self.global_step):
+                    tf.summary.scalar("performance/step_ms", step_time * 1000)
+                    if self.instrumented:
+                        tf.summary.scalar("performance/data_wait_ms", wait * 1000)
+
+        self.jsonl.write(json.dumps(record) + "\n")
+
+    def on_epoch_end(self, epoch, logs=None):
+        summary = self.summarize(epoch)
+        if summary is None:
+            return
+        self.last_summary = summary
+
+        self.jsonl.write(json.dumps(summary) + "\n")
+        self.jsonl.flush()
+
+        with self.writer.as_default(step=epoch):
+            tf.summary.scalar("performance/step_ms_p50", summary["step_ms_p50"])
+            tf.summary.scalar("performance/step_ms_p95", summary["step_ms_p95"])
+            tf.summary.scalar("performance/step_ms_p99", summary["step_ms_p99"])
+            if "images_per_sec" in summary:
+                tf.summary.scalar("performance/images_per_sec", summary["images_per_sec"])
+            if self.instrumented:
+                tf.summary.scalar("performance/data_wait_fraction", summary["data_wait_fraction"])
+        self.writer.flush()
+
+        msg = (f"Desempenho época {epoch + 1}: passo p50 {summary['step_ms_p50']:.1f} ms | "
+               f"p95 {summary['step_ms_p95']:.1f} ms | p99 {summary['step_ms_p99']:.1f} ms")
+        if "images_per_sec" in summary:
+            msg += f" | {summary['images_per_sec']:.1f} imagens/s"
+        if self.instrumented:
+            bound = "pela entrada de dados" if summary["data_wait_fraction"] > 0.2 else "pelo cálculo"
+            msg += f" | espera por dados {summary['data_wait_fraction'] * 100:.1f}% (limitado {bound})"
+        self.log(msg)
+
+    def summarize(self, epoch):
+        """ Resumo da época: percentis do tempo por passo, vazão e fração do tempo esperando dados """
+        if not self.epoch_steps:
+            return None
+
+        steps = np.asarray(self.epoch_steps)
+        step_ms = steps[:, 0] * 1000
+        total_time = float(steps[:, 0].sum())
+        summary = {
+            "type": "epoch",
+            "epoch": epoch + 1,
+            "steps": len(steps),
+            "step_ms_mean": float(step_ms.mean()),
+            "step_ms_p50": float(np.percentile(step_ms, 50)),
+            "step_ms_p95": float(np.percentile(step_ms, 95)),
+            "step_ms_p99": float(np.percentile(step_ms, 99))
+        }
+        if self.instrumented or self.batch_size:
+            summary["images_per_sec"] = float(steps[:, 2].sum()) / total_time if total_time else 0.0
+        if self.instrumented:
+            wait_time = float(steps[:, 1].sum())
+            summary.update({
+                "data_wait_ms_mean": wait_time * 1000 / len(steps),
+                "compute_ms_mean": (total_time - wait_time) * 1000 / len(steps),
+                "data_wait_fraction": wait_time / total_time if total_time else 0.0
+            })
+        return summary
+
+    def on_train_end(self, logs=None):
+        if self.jsonl is not None:
+            self.jsonl.close()
+            self.jsonl = None
+        if self.writer is not None:
+            self.writer.close()
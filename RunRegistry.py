@@ -0,0 +1,281 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Estrutura do banco (criada na primeira utilização)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    log_path TEXT UNIQUE,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    config TEXT,
+    manifest_digest TEXT,
+    wall_time REAL,
+    images_per_sec REAL,
+    final_metrics TEXT,
+    best_val_accuracy REAL,
+    best_val_loss REAL,
+    best_epoch INTEGER
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    tag TEXT NOT NULL,
+    step INTEGER NOT NULL,
+    value REAL NOT NULL,
+    wall_time REAL,
+    PRIMARY KEY (run_id, tag, step)
+);
+CREATE TABLE IF NOT EXISTS event_files (
+    path TEXT PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+"""
+
+
+# A classe mantém um índice (SQLite) das execuções de treinamento.
+#
+# Antes, cada execução recebia o nome <nome>_run_<quantidade de pastas em logs/fit + 1>, o que exigia listar o
+# diretório, gerava nomes repetidos quando duas execuções começavam juntas e não guardava nenhuma informação
+# sobre a execução. Agora o número da execução é o id autoincremental do banco (único mesmo entre processos)
+# e cada execução registra:
+#   * runs - parâmetros (run_config), hash da divisão treino/validação, tempo total, imagens/s, métricas
+#            finais e melhores métricas de validação
+#   * metrics - os escalares dos arquivos events.out.tfevents (uma linha por tag e passo), extraídos pelo
+#               ingestor em segundo plano
+#
+# Com isso, comparar dezenas de execuções é uma consulta SQL, sem carregar os arquivos de eventos no TensorBoard:
+#   python RunRegistry.py list
+#   python RunRegistry.py query "SELECT name, best_val_accuracy, wall_time FROM runs ORDER BY 2 DESC"
+class RunRegistry:
+
+    def __init__(self, db_path="logs/runs.sqlite", log_root="logs/fit/"):
+        self.db_path = db_path
+        self.log_root = log_root
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # Uma conexão por operação: conexões SQLite não podem ser compartilhadas entre threads.
+        # O modo WAL permite leituras durante a escrita do ingestor.
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.row_factory = sqlite3.Row
+        try:
+            with connection:  # commit ao final do bloco (ou rollback em caso de erro)
+                yield connection
+        finally:
+            connection.close()
+
+    # ------------------------------------------------------------------------------------------------
+    # Registro das execuções
+
+    def register(self, name, config=None, manifest_digest=None):
+        """
+        Registra uma nova execução e retorna (id, pasta de logs). A pasta segue o formato anterior
+        (logs/fit/<nome>_run_<id>); pastas já existentes, criadas antes do registro, são puladas.
+        """
+        os.makedirs(self.log_root, exist_ok=True)
+        with self._connect() as connection:
+            while True:
+                cursor = connection.execute(
+                    "INSERT INTO runs (name, status, created_at, config, manifest_digest) VALUES (?, ?, ?, ?, ?)",
+                    (name, "running", time.time(), json.dumps(config) if config is not None else None,
+                     manifest_digest))
+                run_id = cursor.lastrowid
+                log_path = os.path.join(self.log_root, f"{name}_run_{run_id}")
+                if not os.path.exists(log_path):
+                    break
+                # O id autoincremental nunca é reutilizado; a linha da tentativa é descartada
+                connection.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+
+            connection.execute("UPDATE runs SET log_path = ? WHERE id = ?", (log_path, run_id))
+        os.makedirs(log_path)
+        return run_id, log_path
+
+    def run_id(self, log_path, create=True):
+        """ Id da execução associada à pasta (execuções anteriores ao registro são incluídas com create) """
+        # Comparação por caminho absoluto: a mesma pasta informada como caminho relativo ou absoluto
+        # (ex: na retomada) corresponde à mesma execução
+        absolute_path = os.path.abspath(os.path.normpath(log_path))
+        with self._connect() as connection:
+            for row in connection.execute("SELECT id, log_path FROM runs WHERE log_path IS NOT NULL"):
+                if os.path.abspath(os.path.normpath(row["log_path"])) == absolute_path:
+                    return row["id"]
+            if not create:
+                return None
+            cursor = connection.execute(
+                "INSERT INTO runs (name, log_path, status, created_at) VALUES (?, ?, ?, ?)",
+                (os.path.basename(absolute_path), os.path.normpath(log_path), "imported",
+                 os.path.getmtime(log_path)))
+            return cursor.lastrowid
+
+    def update(self, run_id, **fields):
+        """ Atualiza campos da execução (ex: status='running' na retomada) """
+        if not fields:
+            return
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._connect() as connection:
+            connection.execute(f"UPDATE runs SET {assignments} WHERE id = ?", (*fields.values(), run_id))
+
+    def finish(self, run_id, status, wall_time=None, images_per_sec=None, history=None):
+        """ Registra o resultado da execução: tempo, vazão e métricas (finais e melhores) do histórico """
+        fields = {"status": status, "finished_at": time.time(), "wall_time": wall_time,
+                  "images_per_sec": images_per_sec}
+        if history:
+            fields["final_metrics"] = json.dumps({key: float(values[-1]) for key, values in history.items()
+                                                  if values})
+            if history.get("val_accuracy"):
+                fields["best_val_accuracy"] = float(max(history["val_accuracy"]))
+                fields["best_epoch"] = int(history["val_accuracy"].index(max(history["val_accuracy"]))) + 1
+            if history.get("val_loss"):
+                fields["best_val_loss"] = float(min(history["val_loss"]))
+        self.update(run_id, **fields)
+
+    # ------------------------------------------------------------------------------------------------
+    # Ingestão dos arquivos de eventos do TensorBoard
+
+    @staticmethod
+    def _scalars(path):
+        """ Lê os escalares (tag, passo, valor, instante) de um arquivo events.out.tfevents """
+        import tensorflow as tf
+
+        for event in tf.compat.v1.train.summary_iterator(path):
+            for value in event.summary.value:
+                if value.HasField("simple_value"):
+                    yield value.tag, event.step, float(value.simple_value), event.wall_time
+                elif value.HasField("tensor"):
+                    # Os resumos do TF2 guardam escalares como tensores de dimensão zero; histogramas e
+                    # imagens (tensores com dimensões) são ignorados
+                    array = tf.make_ndarray(value.tensor)
+                    if array.ndim == 0 and array.dtype.kind in "fiu":
+                        yield value.tag, event.step, float(array), event.wall_time
+
+    def ingest(self, log_path=None):
+        """
+        Extrai os escalares dos arquivos de eventos para a tabela metrics. Apenas arquivos novos ou alterados
+        desde a última ingestão são lidos. Com log_path, somente aquela execução é processada.
+        Retorna a quantidade de arquivos lidos.
+        """
+        if log_path is not None:
+            roots = [log_path]
+        elif os.path.isdir(self.log_root):
+            roots = [os.path.join(self.log_root, name) for name in sorted(os.listdir(self.log_root))
+                     if os.path.isdir(os.path.join(self.log_root, name))]
+        else:
+            roots = []
+
+        ingested = 0
+        for run_path in roots:
+            event_files = [os.path.join(directory, name)
+                           for directory, _, names in os.walk(run_path)
+                           for name in names if "tfevents" in name]
+            if not event_files:
+                continue
+
+            run_id = self.run_id(run_path)
+            with self._connect() as connection:
+                known = {row["path"]: (row["size"], row["mtime"])
+                         for row in connection.execute("SELECT path, size, mtime FROM event_files WHERE run_id = ?",
+                                                       (run_id,))}
+
+            for path in event_files:
+                stat = os.stat(path)
+                if known.get(path) == (stat.st_size, stat.st_mtime):
+                    continue
+
+                # A tag recebe o nome da subpasta (train/validation/performance), como no TensorBoard
+                subdir = os.path.relpath(os.path.dirname(path), run_path)
+                prefix = "" if subdir == "." else subdir.replace(os.sep, "/") + "/"
+                try:
+                    rows = [(run_id, prefix + tag, step, value, wall_time)
+                            for tag, step, value, wall_time in self._scalars(path)]
+                except Exception:
+                    # Arquivo ainda sendo escrito ou corrompido: tentado novamente na próxima passagem
+                    continue
+
+                with self._connect() as connection:
+                    connection.executemany("INSERT OR REPLACE INTO metrics VALUES (?, ?, ?, ?, ?)", rows)
+                    connection.execute("INSERT OR REPLACE INTO event_files VALUES (?, ?, ?, ?)",
+                                       (path, run_id, stat.st_size, stat.st_mtime))
+                ingested += 1
+        return ingested
+
+    def ingest_in_background(self, log_path=None):
+        """ Executa a ingestão em uma thread separada e retorna a thread """
+        thread = threading.Thread(target=self.ingest, args=(log_path,), daemon=True)
+        thread.start()
+        return thread
+
+    def start_ingester(self, interval=60.0):
+        """ Ingestão periódica de todas as execuções em segundo plano; retorna o evento que a interrompe """
+        stop = threading.Event()
+
+        def loop():
+            while not stop.is_set():
+                try:
+                    self.ingest()
+                except Exception:
+                    pass
+                stop.wait(interval)
+
+        threading.Thread(target=loop, daemon=True).start()
+        return stop
+
+    # ------------------------------------------------------------------------------------------------
+    # Consultas
+
+    def query(self, sql, parameters=()):
+        with self._connect() as connection:
+            return [dict(row) for row in connection.execute(sql, parameters)]
+
+    def runs(self):
+        return self.query("SELECT id, name, status, log_path, wall_time, images_per_sec, best_val_accuracy, "
+                          "best_val_loss, best_epoch, manifest_digest FROM runs ORDER BY id")
+
+    def metric(self, tag, run_ids=None):
+        """ Série de uma métrica (ex: 'validation/epoch_accuracy') para as execuções informadas """
+        sql = "SELECT run_id, step, value FROM metrics WHERE tag = ?"
+        parameters = [tag]
+        if run_ids:
+            sql += f" AND run_id IN ({', '.join('?' * len(run_ids))})"
+            parameters += list(run_ids)
+        return self.query(sql + " ORDER BY run_id, step", parameters)
+
+    @staticmethod
+    def main(argv=None):
+        parser = argparse.ArgumentParser(description="Índice das execuções de treinamento")
+        parser.add_argument("command", choices=["ingest", "list", "query"])
+        parser.add_argument("sql", nargs="?", help="consulta SQL (comando query)")
+        parser.add_argument("--db", default="logs/runs.sqlite")
+        args = parser.parse_args(argv)
+
+        registry = RunRegistry(args.db)
+        if args.command == "ingest":
+            print(f"{registry.ingest()} arquivo(s) de eventos processado(s)")
+        elif args.command == "list":
+            for run in registry.runs():
+                print(json.dumps(run))
+        else:
+            if not args.sql:
+                parser.error("informe a consulta SQL")
+            for row in registry.query(args.sql):
+                print(json.dumps(row))
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(RunRegistry.main())
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import random
+
+# Extensões de imagem aceitas, as mesmas consideradas pelo flow_from_directory do Keras
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.ppm', '.tif', '.tiff')
+
+# Intervalo (em arquivos) entre as atualizações de progresso durante a leitura de uma classe
+PROGRESS_EVERY_FILES = 5000
+
+
+# A classe representa a divisão entre treino e validação de um dataset (uma subpasta por classe).
+#
+# Diferente do validation_split do ImageDataGenerator, que divide os arquivos na ordem em que aparecem
+# nas pastas e percorre a árvore de diretórios uma vez para cada subset, aqui o diretório é percorrido
+# uma única vez e a divisão é estratificada (a proporção é respeitada em cada classe) e embaralhada com
+# uma semente fixa, o que a torna reprodutível.
+#
+# O manifesto é salvo em disco e reaproveitado pelos carregadores de dados (ImageDataGenerator, tf.data
+# e cache). Para verificar se ele ainda é válido basta comparar o mtime da pasta raiz e das pastas de
+# classe (que mudam quando arquivos são adicionados ou removidos), sem percorrer todos os arquivos.
+class SplitManifest:
+
+    def __init__(self, dataset_path, val_split, seed, class_indices, train, val, dir_mtimes):
+        self.dataset_path = dataset_path  # caminho absoluto do dataset
+        self.val_split = val_split  # fração destinada à validação (ex: 0.2)
+        self.seed = seed  # semente usada no embaralhamento
+        self.class_indices = class_indices  # {nome da classe: índice}
+        self.train = train  # lista de pares [caminho relativo, rótulo] do treinamento
+        self.val = val  # lista de pares [caminho relativo, rótulo] da validação
+        self.dir_mtimes = dir_mtimes  # {pasta relativa: mtime}, usado para validar o manifesto
+        self.reused = False  # indica se o manifesto foi reaproveitado do disco
+
+    # ------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def _directory_mtimes(dataset_path, class_names):
+        mtimes = {'.': os.stat(dataset_path).st_mtime}
+        for class_name in class_names:
+            mtimes[class_name] = os.stat(os.path.join(dataset_path, class_name)).st_mtime
+        return mtimes
+
+    @staticmethod
+    def _scan_class(class_path, class_name, progress, cancelled):
+        files = []
+        for entry in os.scandir(class_path):
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                files.append(entry.name)
+                # Em pastas muito grandes, o progresso também é informado durante a leitura da classe
+                if len(files) % PROGRESS_EVERY_FILES == 0:
+                    if cancelled is not None and cancelled():
+                        raise InterruptedError("Indexação do dataset cancelada")
+                    if progress is not None:
+                        progress(class_name, len(files))
+        return files
+
+    @staticmethod
+    def build(dataset_path, val_split, seed=42, progress=None, cancelled=None):
+        """
+        Percorre o diretório uma única vez e monta a divisão estratificada e embaralhada.
+
+        obs: progress(classe, arquivos encontrados) é chamada durante a leitura de cada classe, e
+        cancelled() é consultada periodicamente: quando retorna True, a indexação é interrompida com
+        InterruptedError (ver DatasetIndexer).
+        """
+        dataset_path = os.path.abspath(dataset_path)
+
+        # As classes são as subpastas do diretório, em ordem alfabética (mesmo critério do Keras)
+        class_names = sorted(entry.name for entry in os.scandir(dataset_path) if entry.is_dir())
+        class_indices = {name: index for index, name in enumerate(class_names)}
+
+        rng = random.Random(seed)
+        train, val = [], []
+
+        for class_name in class_names:
+            if cancelled is not None and cancelled():
+                raise InterruptedError("Indexação do dataset cancelada")
+
+            files = sorted(SplitManifest._scan_class(os.path.join(dataset_path, class_name), class_name,
+                                                     progress, cancelled))
+            if progress is not None:
+                progress(class_name, len(files))
+            # A ordenação antes do embaralhamento garante o mesmo resultado em qualquer sistema de arquivos
+            rng.shuffle(files)
+
+            # Estratificação: cada classe contribui com a mesma fração para a validação
+            split_index = int(val_split * len(files))
+            label = class_indices[class_name]
+
+            val += [[os.path.join(class_name, name), label] for name in files[:split_index]]
+            train += [[os.path.join(class_name, name), label] for name in files[split_index:]]
+
+        dir_mtimes = SplitManifest._directory_mtimes(dataset_path, class_names)
+
+        return SplitManifest(dataset_path, val_split, seed, class_indices, train, val, dir_mtimes)
+
+    @staticmethod
+    def manifest_path(dataset_path, val_split, seed, manifest_root="logs/splits/"):
+        # Um manifesto para cada combinação de dataset, split e semente
+        key_source = f"{os.path.abspath(dataset_path)}|{val_split}|{seed}"
+        key = hashlib.sha1(key_source.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(manifest_root, f"split_{key}.json")
+
+    @staticmethod
+    def load_or_build(dataset_path, val_split, seed=42, manifest_root="logs/splits/", progress=None,
+                      cancelled=None):
+        """
+        Reaproveita o manifesto salvo quando as pastas do dataset não foram modificadas (verificação por
+        mtime); caso contrário, percorre o diretório novamente e salva o novo manifesto.
+        """
+        path = SplitManifest.manifest_path(dataset_path, val_split, seed, manifest_root)
+
+        if os.path.exists(path):
+            manifest = SplitManifest.load(path)
+            if manifest.is_current():
+                manifest.reused = True
+                return manifest
+
+        manifest = SplitManifest.build(dataset_path, val_split, seed, progress, cancelled)
+        manifest.save(path)
+        return manifest
+
+    @staticmethod
+    def load(path):
+        with open(path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+
+        return SplitManifest(data["dataset_path"], data["val_split"], data["seed"], data["class_indices"],
+                             data["train"], data["val"], data["dir_mtimes"])
+
+    # ------------------------------------------------------------------------------------------------
+
+    def is_current(self):
+        """ Verifica, apenas pelo mtime das pastas, se o manifesto ainda corresponde ao dataset """
+        try:
+            class_names = sorted(self.class_indices, key=self.class_indices.get)
+            current_names = sorted(entry.name for entry in os.scandir(self.dataset_path) if entry.is_dir())
+            if current_names != sorted(class_names):
+                return False
+            return self._directory_mtimes(self.dataset_path, class_names) == self.dir_mtimes
+        except OSError:
+            return False
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        data = {
+            "dataset_path": self.dataset_path,
+            "val_split": self.val_split,
+            "seed": self.seed,
+            "class_indices": self.class_indices,
+            "dir_mtimes": self.dir_mtimes,
+            "train": self.train,
+            "val": self.val
+        }
+        # Escrita atômica: o arquivo é gravado com um nome temporário (por processo) e substituído de uma vez,
+        # evitando manifestos corrompidos quando vários processos salvam o mesmo arquivo (ver SweepRunner)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(tmp_path, path)
+
+    def digest(self):
+        """ Hash do conteúdo da divisão (arquivos e rótulos), útil para identificar o dataset de uma execução """
+        content = json.dumps([self.class_indices, self.train, self.val], sort_keys=True)
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    @property
+    def num_classes(self):
+        return len(self.class_indices)
+
+    def files(self, subset):
+        """ Caminhos absolutos dos arquivos do subset ('training' ou 'validation') """
+        entries = self.train if subset == 'training' else self.val
+        return [os.path.join(self.dataset_path, relative) for relative, _ in entries]
+
+    def labels(self, subset):
+        """ Rótulos (índices das classes) dos arquivos do subset ('training' ou 'validation') """
+        entries = self.train if subset == 'training' else self.val
+        return [label for _, label in entries]
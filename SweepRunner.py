@@ -0,0 +1,255 @@
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from HeadlessRunner import HeadlessRunner
+
+# Núcleos atribuídos ao processo trabalhador atual (definidos em _init_worker)
+_worker_cores = None
+
+
+def _init_worker(core_queue):
+    """
+    Inicialização de cada processo trabalhador. O processo recebe uma fatia exclusiva de núcleos, fixa a
+    afinidade de CPU (quando o sistema permite) e limita os pools de threads do TensorFlow a essa fatia,
+    evitando que as execuções paralelas disputem os mesmos núcleos.
+
+    obs: A configuração de threads do TensorFlow só tem efeito antes da inicialização do runtime, por isso
+    é feita aqui, antes de qualquer operação.
+    """
+    global _worker_cores
+    _worker_cores = core_queue.get()
+
+    # sched_setaffinity existe apenas no Linux; nos demais sistemas apenas o número de threads é limitado
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, _worker_cores)
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(len(_worker_cores))
+    tf.config.threading.set_inter_op_parallelism_threads(max(1, len(_worker_cores) // 4))
+
+
+def _run_trial(index, config):
+    """ Executa uma tentativa da busca no processo trabalhador e retorna o seu resumo """
+    def log(msg):
+        print(f"[{config['run_name']}] {msg}", flush=True)
+
+    log(f"Núcleos: {_worker_cores}")
+    summary = {"trial": index, "run_name": config["run_name"],
+               "params": {key: config[key] for key in config.get("_search_keys", [])}}
+    run_config = {key: value for key, value in config.items() if key != "_search_keys"}
+
+    try:
+        result = HeadlessRunner.run(run_config, log=log)
+    except Exception as e:
+        log(f"Erro durante o treinamento: {str(e)}")
+        summary.update({"status": "erro", "error": str(e)})
+        return summary
+
+    val_accuracy = result["history"].get("val_accuracy", [0.0])
+    summary.update({
+        "status": "ok",
+        "log_path": result["log_path"],
+        "wall_time": result["wall_time"],
+        "best_val_accuracy": max(val_accuracy),
+        "final_val_accuracy": val_accuracy[-1]
+    })
+    return summary
+
+
+# A classe executa uma busca de hiperparâmetros (grade ou aleatória) com várias execuções em paralelo.
+#
+# A divisão treino/validação e o cache de imagens são preparados uma única vez, antes das tentativas (ver
+# prepare_data). Cada tentativa roda em um processo separado, com uma fatia fixa de núcleos (ver _init_worker),
+# e grava os seus logs em uma pasta própria (registrada no índice de execuções, ver RunRegistry). Ao final,
+# um resumo ordenado pela acurácia de validação e pelo tempo de execução é salvo em logs/sweeps/<nome>/.
+#
+# Arquivo de configuração da busca (JSON ou YAML):
+#   name: nome da busca (prefixo do nome de cada execução)
+#   base: configuração comum a todas as tentativas (mesmo formato do HeadlessRunner)
+#   search: {parâmetro: [valores]} (ex: patch_size, projection_dim, transformer_layers, num_heads,
+#           mlp_units, batch_size)
+#   mode: 'grid' (todas as combinações) ou 'random' (trials combinações sorteadas)
+#   trials, seed: número de tentativas e semente do sorteio no modo 'random'
+#   workers, cores_per_worker: execuções simultâneas e núcleos de cada uma
+#
+# Uso:
+#   python SweepRunner.py sweep.json
+#   python SweepRunner.py sweep.yaml (exige o PyYAML)
+class SweepRunner:
+
+    @staticmethod
+    def load_sweep(path):
+        with open(path, "r", encoding="utf-8") as file:
+            if path.lower().endswith((".yaml", ".yml")):
+                try:
+                    import yaml
+                except ImportError:
+                    raise ImportError("Definições em YAML exigem o PyYAML (pip install pyyaml); "
+                                      "use um arquivo JSON ou instale o pacote")
+                return yaml.safe_load(file) or {}
+            return json.load(file)
+
+    @staticmethod
+    def expand(sweep):
+        """ Gera a lista de configurações completas (uma por tentativa) a partir da definição da busca """
+        search = sweep.get("search", {})
+        keys = sorted(search)
+
+        if sweep.get("mode", "grid") == "random":
+            rng = random.Random(sweep.get("seed", 0))
+            combinations = [tuple(rng.choice(search[key]) for key in keys)
+                            for _ in range(sweep.get("trials", 10))]
+        else:
+            combinations = list(itertools.product(*(search[key] for key in keys)))
+
+        name = sweep.get("name", "sweep")
+        base = dict(sweep.get("base", {}))
+        # Por padrão, as tentativas não salvam o arquivo de pesos (apenas os logs)
+        base.setdefault("save_weights", False)
+
+        configs = []
+        for index, values in enumerate(combinations):
+            config = HeadlessRunner.resolve_config({**base, **dict(zip(keys, values))})
+            config["run_name"] = f"{name}_t{index:03d}"
+            config["_search_keys"] = keys
+            configs.append(config)
+        return configs
+
+    @staticmethod
+    def core_slices(workers, cores_per_worker=None):
+        """ Divide os núcleos disponíveis em fatias disjuntas, uma por processo trabalhador """
+        if hasattr(os, "sched_getaffinity"):
+            cores = sorted(os.sched_getaffinity(0))
+        else:
+            cores = list(range(os.cpu_count() or 1))
+
+        cores_per_worker = cores_per_worker or max(1, len(cores) // workers)
+        if cores_per_worker * workers > len(cores):
+            raise ValueError(f"{workers} execuções × {cores_per_worker} núcleos excedem os "
+                             f"{len(cores)} núcleos disponíveis")
+
+        return [cores[i * cores_per_worker:(i + 1) * cores_per_worker] for i in range(workers)]
+
+    @staticmethod
+    def rank(results):
+        """
+        Ordena as tentativas pela melhor acurácia de validação (e, em caso de empate, pelo menor tempo) e
+        marca as que estão na fronteira de Pareto: nenhuma outra tentativa é ao mesmo tempo mais precisa
+        e mais rápida.
+        """
+        finished = [r for r in results if r["status"] == "ok"]
+        finished.sort(key=lambda r: (-r["best_val_accuracy"], r["wall_time"]))
+
+        for result in finished:
+            result["pareto"] = not any(
+                other["best_val_accuracy"] >= result["best_val_accuracy"] and other["wall_time"] < result["wall_time"]
+                for other in finished
+            )
+
+        failed = [r for r in results if r["status"] != "ok"]
+        return finished + failed
+
+    @staticmethod
+    def write_summary(ranked, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+
+        with open(os.path.join(output_dir, "summary.json"), "w", encoding="utf-8") as file:
+            json.dump(ranked, file, indent=2)
+
+        with open(os.path.join(output_dir, "summary.csv"), "w", encoding="utf-8", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["rank", "run_name", "status", "best_val_accuracy", "final_val_accuracy",
+                             "wall_time_s", "pareto", "params", "log_path"])
+            for position, result in enumerate(ranked, start=1):
+                writer.writerow([position, result["run_name"], result["status"],
+                                 result.get("best_val_accuracy"), result.get("final_val_accuracy"),
+                                 result.get("wall_time"), result.get("pareto"),
+                                 json.dumps(result["params"]), result.get("log_path")])
+
+    @staticmethod
+    def prepare_data(configs):
+        """
+        Monta, no processo principal, as divisões treino/validação (SplitManifest) e os caches de imagens
+        (loader 'cache') usados pelas tentativas. Assim, os processos trabalhadores apenas leem arquivos já
+        prontos, em vez de escreverem simultaneamente o mesmo manifesto ou cache.
+        """
+        from ImageCache import ImageCache
+        from SplitManifest import SplitManifest
+
+        manifests = {}
+        cached = set()
+        for config in configs:
+            split_key = (config["dataset_path"], config["split"], config["seed"])
+            if split_key not in manifests:
+                manifests[split_key] = SplitManifest.load_or_build(*split_key)
+
+            cache_key = (config["dataset_path"], config["input_size"])
+            if config["loader"] == "cache" and cache_key not in cached:
+                print(f"Atualizando o cache de imagens ({config['input_size']}px)...", flush=True)
+                ImageCache(config["dataset_path"], (config["input_size"], config["input_size"])) \
+                    .refresh_manifest(manifests[split_key])
+                cached.add(cache_key)
+
+    @staticmethod
+    def run(sweep):
+        configs = SweepRunner.expand(sweep)
+        SweepRunner.prepare_data(configs)
+        workers = min(sweep.get("workers", 1), len(configs))
+        slices = SweepRunner.core_slices(workers, sweep.get("cores_per_worker"))
+
+        print(f"Busca '{sweep.get('name', 'sweep')}': {len(configs)} tentativas, {workers} em paralelo, "
+              f"núcleos por execução: {len(slices[0])}", flush=True)
+
+        # O contexto 'spawn' garante processos novos, sem herdar um runtime do TensorFlow já inicializado
+        context = multiprocessing.get_context("spawn")
+        manager = context.Manager()
+        core_queue = manager.Queue()
+        for cores in slices:
+            core_queue.put(cores)
+
+        start = time.perf_counter()
+        results = []
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(core_queue,)) as executor:
+            futures = [executor.submit(_run_trial, index, config) for index, config in enumerate(configs)]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                print(f"Concluída {result['run_name']} ({len(results)}/{len(configs)}): {result['status']}",
+                      flush=True)
+        manager.shutdown()
+
+        ranked = SweepRunner.rank(results)
+        output_dir = os.path.join("logs/sweeps/", sweep.get("name", "sweep"))
+        SweepRunner.write_summary(ranked, output_dir)
+
+        print(f"Busca finalizada em {time.perf_counter() - start:.1f} s. Resumo em {output_dir}")
+        for position, result in enumerate(ranked, start=1):
+            if result["status"] == "ok":
+                print(f"{position:3d}. {result['run_name']}  val_acc={result['best_val_accuracy']:.4f}  "
+                      f"tempo={result['wall_time']:.1f}s  {'*' if result['pareto'] else ' '}  {result['params']}")
+            else:
+                print(f"{position:3d}. {result['run_name']}  {result['status']}: {result.get('error')}")
+
+        return ranked
+
+    @staticmethod
+    def main(argv=None):
+        parser = argparse.ArgumentParser(description="Busca de hiperparâmetros da Vision Transformer em paralelo")
+        parser.add_argument("sweep", help="arquivo de definição da busca (.json; .yaml ou .yml com o PyYAML)")
+        args = parser.parse_args(argv)
+
+        SweepRunner.run(SweepRunner.load_sweep(args.sweep))
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(SweepRunner.main())
@@ -0,0 +1,98 @@
+import atexit
+import os
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+# A classe gerencia os servidores do TensorBoard abertos pela interface.
+#
+# Cada pasta de logs tem no máximo um servidor: ao abrir novamente a mesma pasta, o servidor já em execução
+# é reutilizado (abertura instantânea). Um novo servidor usa uma porta livre escolhida pelo sistema (em vez
+# da porta fixa 6006, que colide com outros usuários em máquinas compartilhadas) e só é considerado pronto
+# quando responde via HTTP, em vez de uma espera fixa. Todos os servidores são encerrados em stop_all()
+# (chamado ao sair do programa e também ao final do processo).
+class TensorBoardManager:
+
+    def __init__(self, host="127.0.0.1", timeout=60.0):
+        self.host = host
+        self.timeout = timeout  # tempo máximo aguardando o servidor responder
+        self.servers = {}  # pasta de logs (caminho absoluto) → (processo, porta, arquivo de saída)
+        self.lock = threading.Lock()
+        atexit.register(self.stop_all)
+
+    @staticmethod
+    def free_port():
+        """ Porta TCP livre, escolhida pelo sistema operacional """
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+    def url(self, port):
+        return f"http://{self.host}:{port}/"
+
+    def wait_ready(self, process, port, output):
+        """ Consulta o servidor até que ele responda, o processo termine ou o tempo limite seja atingido """
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                output.seek(0)
+                details = output.read().decode("utf-8", errors="replace").strip().splitlines()
+                raise RuntimeError(f"O TensorBoard encerrou inesperadamente: {details[-1] if details else ''}")
+            try:
+                with urllib.request.urlopen(self.url(port), timeout=1):
+                    return
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.2)
+        raise TimeoutError(f"O TensorBoard não respondeu em {self.timeout:.0f} s")
+
+    def open(self, log_root):
+        """
+        Retorna (url, reutilizado) do servidor da pasta de logs, iniciando um novo servidor se necessário.
+        A chamada aguarda o servidor ficar pronto, então não deve ser feita na thread da interface.
+        """
+        log_root = os.path.abspath(log_root)
+        with self.lock:
+            server = self.servers.get(log_root)
+            if server is not None and server[0].poll() is None:
+                return self.url(server[1]), True
+
+            port = self.free_port()
+            # A saída do servidor vai para um arquivo temporário: um PIPE não lido encheria e travaria o processo
+            output = tempfile.TemporaryFile()
+            process = subprocess.Popen(
+                ["tensorboard", f"--logdir={log_root}", f"--host={self.host}", f"--port={port}"],
+                stdout=output,
+                stderr=subprocess.STDOUT
+            )
+            self.servers[log_root] = (process, port, output)
+
+        try:
+            self.wait_ready(process, port, output)
+        except Exception:
+            self.stop(log_root)
+            raise
+        return self.url(port), False
+
+    def stop(self, log_root):
+        with self.lock:
+            server = self.servers.pop(os.path.abspath(log_root), None)
+        if server is None:
+            return
+
+        process, _, output = server
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        output.close()
+
+    def stop_all(self):
+        for log_root in list(self.servers):
+            self.stop(log_root)
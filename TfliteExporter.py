@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from DataPipeline import DataPipeline
+from InferenceEngine import InferenceEngine
+from SplitManifest import SplitManifest
+
+# Variantes de exportação disponíveis
+VARIANTS = ('float16', 'dynamic', 'int8')
+
+
+# A classe exporta uma rede treinada (vit_classifier) para o formato TFLite, voltado para dispositivos de
+# borda, em três variantes:
+#   * float16 - pesos armazenados em float16 (metade do tamanho, cálculo em float)
+#   * dynamic - quantização de faixa dinâmica: pesos em int8, ativações quantizadas em tempo de execução
+#   * int8 - quantização inteira completa: pesos e ativações em int8, calibradas com um conjunto
+#            representativo de imagens do treinamento
+#
+# Para cada variante é executado um benchmark na CPU (latência por imagem e acurácia na validação),
+# comparado com a rede Keras em float, indicando o custo da quantização.
+#
+# obs: O tf.image.extract_patches do PatchExtractor não possui equivalente nativo no TFLite. Nesses casos a
+# conversão recorre às operações do TensorFlow (SELECT_TF_OPS, que exigem o delegate Flex no dispositivo).
+# Redes construídas com o patch embedding convolucional ('fused') usam apenas operações nativas.
+#
+# Uso:
+#   python TfliteExporter.py nome_weights.h5 --manifest logs/fit/<execução>/split_manifest.json --output export/
+class TfliteExporter:
+
+    def __init__(self, model, manifest, calibration_samples=200, eval_samples=500, seed=42, log=print):
+        self.model = model
+        self.manifest = manifest
+        self.input_size = tuple(model.input_shape[1:3])
+        self.log = log
+
+        # Amostras sorteadas (com semente fixa) do treinamento para calibração e da validação para avaliação
+        rng = random.Random(seed)
+        train = list(zip(manifest.files('training'), manifest.labels('training')))
+        val = list(zip(manifest.files('validation'), manifest.labels('validation')))
+        self.calibration_files = [path for path, _ in rng.sample(train, min(calibration_samples, len(train)))]
+        self.eval_samples = rng.sample(val, min(eval_samples, len(val)))
+        self._eval_images = None  # imagens de avaliação já decodificadas, reaproveitadas entre as variantes
+
+    def _load_image(self, path):
+        # Mesmo pré-processamento do treinamento (decodificação, redimensionamento e normalização)
+        return DataPipeline.decode_image(tf.constant(path), self.input_size)[tf.newaxis].numpy()
+
+    def representative_dataset(self):
+        """ Conjunto representativo usado pelo conversor para calibrar as faixas das ativações (int8) """
+        for path in self.calibration_files:
+            yield [self._load_image(path)]
+
+    def _converter(self, variant, select_tf_ops):
+        converter = tf.lite.TFLiteConverter.from_keras_model(self.model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+        if variant == 'float16':
+            converter.target_spec.supported_types = [tf.float16]
+            builtins = tf.lite.OpsSet.TFLITE_BUILTINS
+        elif variant == 'int8':
+            converter.representative_dataset = self.representative_dataset
+            builtins = tf.lite.OpsSet.TFLITE_BUILTINS_INT8
+            # Entrada e saída também em int8 (os valores são quantizados/dequantizados no benchmark)
+            converter.inference_input_type = tf.int8
+            converter.inference_output_type = tf.int8
+        else:
+            builtins = tf.lite.OpsSet.TFLITE_BUILTINS
+
+        converter.target_spec.supported_ops = [builtins]
+        if select_tf_ops:
+            converter.target_spec.supported_ops.append(tf.lite.OpsSet.SELECT_TF_OPS)
+        return converter
+
+    def convert(self, variant):
+        """
+        Converte a rede na variante escolhida. Primeiro tenta apenas com operações nativas do TFLite e,
+        em caso de falha, permite operações do TensorFlow (SELECT_TF_OPS).
+        """
+        try:
+            return self._converter(variant, select_tf_ops=False).convert(), False
+        except Exception as e:
+            self.log(f"[{variant}] Conversão apenas com operações nativas falhou "
+                     f"({str(e).splitlines()[0]}); usando SELECT_TF_OPS")
+            return self._converter(variant, select_tf_ops=True).convert(), True
+
+    @staticmethod
+    def _quantize(values, details):
+        # Converte float → inteiro quando a entrada do modelo é quantizada (escala e ponto zero)
+        scale, zero_point = details['quantization']
+        if details['dtype'] in (np.int8, np.uint8) and scale:
+            info = np.iinfo(details['dtype'])
+            values = np.clip(np.round(values / scale + zero_point), info.min, info.max)
+        return values.astype(details['dtype'])
+
+    @staticmethod
+    def _dequantize(values, details):
+        scale, zero_point = details['quantization']
+        if details['dtype'] in (np.int8, np.uint8) and scale:
+            return (values.astype(np.float32) - zero_point) * scale
+        return values.astype(np.float32)
+
+    def benchmark_tflite(self, model_content, runs=50, num_threads=None):
+        interpreter = tf.lite.Interpreter(model_content=model_content, num_threads=num_threads or os.cpu_count())
+        interpreter.allocate_tensors()
+        input_details = interpreter.get_input_details()[0]
+        output_details = interpreter.get_output_details()[0]
+
+        def predict(image):
+            interpreter.set_tensor(input_details['index'], self._quantize(image, input_details))
+            interpreter.invoke()
+            return self._dequantize(interpreter.get_tensor(output_details['index']), output_details)
+
+        return self._benchmark(predict, runs)
+
+    def benchmark_keras(self, runs=50):
+        predict_fn = tf.function(lambda x: self.model(x, training=False))
+        return self._benchmark(lambda image: predict_fn(image).numpy(), runs)
+
+    def _benchmark(self, predict, runs):
+        """ Latência por imagem (lote de 1) e acurácia nas amostras de validação """
+        if self._eval_images is None:
+            self._eval_images = [(self._load_image(path), label) for path, label in self.eval_samples]
+        images = self._eval_images
+        if not images:
+            raise ValueError("Nenhuma imagem de validação disponível para o benchmark")
+
+        # Aquecimento, seguido da medição da latência com a primeira imagem
+        predict(images[0][0])
+        latencies = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            predict(images[0][0])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        predictions = [int(np.argmax(predict(image))) for image, _ in images]
+        accuracy = float(np.mean([prediction == label for prediction, (_, label) in zip(predictions, images)]))
+
+        return {
+            "latency_ms_p50": float(np.percentile(latencies, 50)),
+            "latency_ms_p90": float(np.percentile(latencies, 90)),
+            "latency_ms_mean": float(np.mean(latencies)),
+            "accuracy": accuracy,
+            "predictions": predictions
+        }
+
+    def export(self, output_dir, variants=VARIANTS, runs=50):
+        """ Exporta as variantes para output_dir e salva o relatório comparativo em report.json """
+        os.makedirs(output_dir, exist_ok=True)
+
+        baseline = self.benchmark_keras(runs)
+        self.log(f"[keras float32] latência p50 {baseline['latency_ms_p50']:.2f} ms | "
+                 f"acurácia {baseline['accuracy']:.4f}")
+        report = {"keras": {key: value for key, value in baseline.items() if key != "predictions"},
+                  "eval_samples": len(self.eval_samples),
+                  "calibration_samples": len(self.calibration_files)}
+
+        for variant in variants:
+            try:
+                model_content, select_tf_ops = self.convert(variant)
+            except Exception as e:
+                # Uma variante não suportada pela rede (ex: int8 completo) não impede as demais
+                self.log(f"[{variant}] Falha na conversão: {str(e).splitlines()[0]}")
+                report[variant] = {"error": str(e)}
+                continue
+
+            path = os.path.join(output_dir, f"vit_{variant}.tflite")
+            with open(path, "wb") as file:
+                file.write(model_content)
+
+            result = self.benchmark_tflite(model_content, runs)
+            # Concordância: fração de imagens em que a variante prevê a mesma classe que a rede Keras
+            agreement = float(np.mean([a == b for a, b in zip(result.pop("predictions"),
+                                                               baseline["predictions"])]))
+            result.update({
+                "path": path,
+                "size_mb": len(model_content) / 2 ** 20,
+                "select_tf_ops": select_tf_ops,
+                "agreement_with_keras": agreement,
+                "accuracy_delta": result["accuracy"] - baseline["accuracy"],
+                "speedup_vs_keras": baseline["latency_ms_p50"] / result["latency_ms_p50"]
+            })
+            report[variant] = result
+
+            self.log(f"[{variant}] {result['size_mb']:.2f} MB | latência p50 {result['latency_ms_p50']:.2f} ms "
+                     f"({result['speedup_vs_keras']:.2f}x) | acurácia {result['accuracy']:.4f} "
+                     f"(Δ {result['accuracy_delta']:+.4f}) | concordância {agreement:.4f}")
+
+        with open(os.path.join(output_dir, "report.json"), "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        return report
+
+    @staticmethod
+    def main(argv=None):
+        parser = argparse.ArgumentParser(description="Exportação da Vision Transformer para TFLite")
+        parser.add_argument("model", help="arquivo da rede salva (ex: nome_weights.h5)")
+        parser.add_argument("--manifest", help="split_manifest.json da execução (treino/validação)")
+        parser.add_argument("--dataset", help="diretório do dataset (alternativa ao --manifest)")
+        parser.add_argument("--split", type=float, default=0.2, help="fração de validação, usada com --dataset")
+        parser.add_argument("--output", default="export/", help="diretório de saída")
+        parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=VARIANTS)
+        parser.add_argument("--calibration-samples", type=int, default=200)
+        parser.add_argument("--eval-samples", type=int, default=500)
+        parser.add_argument("--runs", type=int, default=50, help="repetições para medir a latência")
+        args = parser.parse_args(argv)
+
+        if args.manifest:
+            manifest = SplitManifest.load(args.manifest)
+        elif args.dataset:
+            manifest = SplitManifest.load_or_build(args.dataset, args.split)
+        else:
+            parser.error("informe --manifest ou --dataset")
+
+        model = InferenceEngine.load_model(args.model)
+        exporter = TfliteExporter(model, manifest, args.calibration_samples, args.eval_samples)
+        exporter.export(args.output, args.variants, args.runs)
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(TfliteExporter.main())
@@ -0,0 +1,316 @@
+import json
+import os
+import time
+
+import tensorflow as tf
+from tensorflow.keras.callbacks import TensorBoard, Callback, EarlyStopping
+
+from AsyncCheckpoint import AsyncCheckpoint
+from BatchAugmentation import BatchAugmentation
+from GradientAccumulationModel import GradientAccumulationModel
+from RunRegistry import RunRegistry
+from PerformanceCallback import PerformanceCallback
+from WarmupCosineDecay import WarmupCosineDecay
+from XlaCompiler import XlaCompiler
+
+
+# A classe concentra a lógica de treinamento da rede (compilação, callbacks e fit), sem depender do PyQt5.
+# Ela é utilizada tanto pela interface gráfica (TrainerThread, que repassa as mensagens de log para a
+# janela) quanto pela execução sem interface (HeadlessRunner), em servidores sem display.
+#
+# As mensagens de log são enviadas para a função recebida em log (por padrão, print).
+#
+# Taxa de aprendizado (lr_schedule):
+#   * 'constant' - taxa fixa em learning_rate
+#   * 'cosine' - aquecimento linear por warmup_epochs épocas, seguido de decaimento cosseno até o fim
+#   * 'step' - a taxa é multiplicada por decay_rate a cada decay_epochs épocas
+#
+# Com early_stopping ('val_accuracy' ou 'val_loss'), o treinamento é encerrado quando a métrica não melhora
+# por patience épocas, e os pesos da melhor época são restaurados.
+#
+# O aumento de dados (augmentation: 'light' ou 'strong', mixup_alpha e cutmix_alpha) é aplicado sobre os lotes
+# do conjunto de treino, dentro do pipeline tf.data (ver BatchAugmentation).
+#
+# Com accumulation_steps > 1, os gradientes de N lotes são somados antes de cada atualização dos pesos
+# (lote efetivo de N x batch_size, ver GradientAccumulationModel); os agendamentos da taxa de aprendizado
+# e os callbacks passam a contar lotes efetivos.
+class Trainer:
+
+    def __init__(self, neural_network, train_data, val_data, epochs, logName, log=print, split_manifest=None,
+                 mixed_precision=False, jit_compile=False, run_config=None, checkpoint_every=1,
+                 checkpoint_every_steps=None, resume_from=None, learning_rate=1e-4, lr_schedule='constant',
+                 warmup_epochs=0, decay_epochs=10, decay_rate=0.5, early_stopping=None, patience=10,
+                 min_delta=0.0, performance_log=True, measure_input_wait=False, histogram_freq=1, write_graph=True,
+                 update_freq='epoch', profile_batch=None, augmentation=None, mixup_alpha=0.0, cutmix_alpha=0.0,
+                 accumulation_steps=1, on_log_path=None):
+        self.neural_network = neural_network
+        self.train_data = train_data
+        self.val_data = val_data
+        self.epochs = epochs
+        self.logName = logName
+        self.log = log  # função que recebe as mensagens de log (str)
+        self.split_manifest = split_manifest  # divisão treino/validação usada, salva junto aos logs da execução
+        self.mixed_precision = mixed_precision  # a rede foi construída com a política mista (ver ModelCreator)
+        self.jit_compile = jit_compile  # compila os passos de treinamento e predição com XLA
+        self.run_config = run_config  # parâmetros da execução (dataset, ViT, treino), salvos junto aos logs
+        self.checkpoint_every = checkpoint_every  # checkpoint a cada N épocas (None desativa)
+        self.checkpoint_every_steps = checkpoint_every_steps  # checkpoint a cada N passos (None desativa)
+        self.resume_from = resume_from  # pasta de uma execução interrompida, a ser retomada
+        self.learning_rate = float(learning_rate)  # taxa de aprendizado inicial (máxima, nos agendamentos)
+        self.lr_schedule = lr_schedule  # 'constant', 'cosine' ou 'step'
+        self.warmup_epochs = warmup_epochs  # épocas de aquecimento linear ('cosine')
+        self.decay_epochs = decay_epochs  # intervalo entre as reduções da taxa ('step')
+        self.decay_rate = decay_rate  # fator de redução da taxa ('step')
+        self.early_stopping = early_stopping  # métrica monitorada pela parada antecipada (None desativa)
+        self.patience = patience  # épocas sem melhora antes da parada
+        self.min_delta = min_delta  # melhora mínima considerada
+        self.performance_log = performance_log  # mede o tempo de cada passo (ver PerformanceCallback)
+        self.measure_input_wait = measure_input_wait  # separa a espera pelos dados do tempo de cálculo (opcional)
+        self.histogram_freq = histogram_freq  # histogramas dos pesos a cada N épocas (0 desativa)
+        self.write_graph = write_graph  # grava o grafo da rede no TensorBoard
+        self.update_freq = update_freq  # 'epoch', 'batch' ou a cada N lotes
+        self.profile_batch = profile_batch  # intervalo de passos (início, fim) capturado pelo profiler
+        self.augmentation = augmentation  # aumento de dados pré-definido ('light', 'strong' ou None)
+        self.mixup_alpha = mixup_alpha  # Mixup entre as imagens do lote (0 desativa)
+        self.cutmix_alpha = cutmix_alpha  # CutMix entre as imagens do lote (0 desativa)
+        self.accumulation_steps = max(int(accumulation_steps or 1), 1)  # lotes somados por atualização dos pesos
+        self.on_log_path = on_log_path  # função chamada com a pasta da execução, assim que ela é definida
+        self.schedule = None
+        self.model = neural_network  # modelo treinado (a própria rede ou o GradientAccumulationModel sobre ela)
+        self.registry = None
+        self.run_id = None
+        self.ingest_thread = None
+        self.log_path = None
+        self.history = None
+
+        # O aumento em lote é aplicado no pipeline tf.data (recusado antes de registrar a execução)
+        augmented = augmentation or mixup_alpha or cutmix_alpha
+        if augmented and not isinstance(train_data, tf.data.Dataset):
+            raise ValueError("O aumento de dados em lote exige o carregador tf.data ('tfdata' ou 'cache')")
+
+    def steps_per_epoch(self):
+        """
+        Quantidade de atualizações dos pesos por época (necessária para converter épocas em passos nos
+        agendamentos): lotes por época divididos pelos lotes acumulados em cada atualização
+        """
+        try:
+            return max(len(self.train_data) // self.accumulation_steps, 1)
+        except TypeError:
+            raise ValueError("Não foi possível determinar a quantidade de lotes por época do conjunto de treino")
+
+    def learning_rate_schedule(self):
+        """ Cria a taxa de aprendizado (valor fixo ou agendamento por passo) a partir dos parâmetros """
+        if self.lr_schedule == 'constant':
+            return self.learning_rate
+
+        steps_per_epoch = self.steps_per_epoch()
+        if self.lr_schedule == 'cosine':
+            return WarmupCosineDecay(self.learning_rate,
+                                     total_steps=self.epochs * steps_per_epoch,
+                                     warmup_steps=self.warmup_epochs * steps_per_epoch)
+        if self.lr_schedule == 'step':
+            return tf.keras.optimizers.schedules.ExponentialDecay(self.learning_rate,
+                                                                  decay_steps=self.decay_epochs * steps_per_epoch,
+                                                                  decay_rate=self.decay_rate,
+                                                                  staircase=True)
+        raise ValueError(f"Agendamento da taxa de aprendizado desconhecido: {self.lr_schedule}")
+
+    def current_learning_rate(self):
+        """ Taxa de aprendizado no passo atual do otimizador """
+        if callable(self.schedule):
+            return float(self.schedule(self.model.optimizer.iterations))
+        return float(self.schedule)
+
+    def profile_range(self):
+        """
+        Intervalo de passos capturado pelo tf.profiler (0 desativa). Aceita (início, fim) ou o texto "início,fim".
+        """
+        if not self.profile_batch:
+            return 0
+        if isinstance(self.profile_batch, str):
+            self.profile_batch = [int(value) for value in self.profile_batch.split(",")]
+        start, stop = self.profile_batch
+        if not 0 < start <= stop:
+            raise ValueError(f"Intervalo de profiling inválido: {self.profile_batch}")
+        return int(start), int(stop)
+
+    def train(self):
+        # Cada execução é registrada no índice de execuções (ver RunRegistry), que define a pasta de logs.
+        # Na retomada, a pasta da execução original é reaproveitada (os logs do TensorBoard continuam nela).
+        self.registry = RunRegistry()
+        if self.resume_from is not None:
+            self.log_path = self.resume_from
+            self.run_id = self.registry.run_id(self.resume_from)
+            self.registry.update(self.run_id, status="running")
+        else:
+            digest = self.split_manifest.digest() if self.split_manifest is not None else None
+            self.run_id, self.log_path = self.registry.register(self.logName, self.run_config, digest)
+        log_path = self.log_path
+        os.makedirs(log_path, exist_ok=True)
+        if self.on_log_path is not None:
+            self.on_log_path(log_path)
+
+        self.log("Retomando treinamento..." if self.resume_from is not None else "Iniciando treinamento...")
+        self.log(f"Logs armazenados em: {log_path}")
+
+        # Salva a divisão treino/validação e os parâmetros ao lado dos logs, permitindo reproduzir a execução
+        if self.split_manifest is not None:
+            self.split_manifest.save(os.path.join(log_path, "split_manifest.json"))
+        if self.run_config is not None:
+            with open(os.path.join(log_path, "run_config.json"), "w", encoding="utf-8") as file:
+                json.dump(self.run_config, file, indent=2)
+
+        # callback customizado
+        outer = self
+
+        class LogCallback(Callback):
+            def on_epoch_end(self, epoch, logs=None):
+                logs = logs or {}
+                msg = (
+                    f"Época {epoch + 1}/{self.params['epochs']} - "
+                    f"loss: {logs.get('loss', 0):.4f} - "
+                    f"acc: {logs.get('accuracy', 0):.4f} - "
+                    f"val_loss: {logs.get('val_loss', 0):.4f} - "
+                    f"val_acc: {logs.get('val_accuracy', 0):.4f} - "
+                    f"lr: {outer.current_learning_rate():.2e}"
+                )
+                outer.log(msg)
+
+        # O cálculo dos histogramas percorre os pesos de todas as camadas, o que pesa em ViTs grandes:
+        # a frequência é configurável (histogram_freq=0 desativa)
+        tensorboard_callback = TensorBoard(log_dir=log_path,
+                                           histogram_freq=self.histogram_freq,
+                                           write_graph=self.write_graph,
+                                           update_freq=self.update_freq,
+                                           profile_batch=self.profile_range())
+        if self.profile_batch:
+            self.log(f"Profiler ativado nos passos {self.profile_batch[0]} a {self.profile_batch[1]} "
+                     f"(aba Profile do TensorBoard, em {os.path.join(log_path, 'train', 'plugins', 'profile')})")
+        log_callback = LogCallback()
+        checkpoint_callback = AsyncCheckpoint(log_path, self.checkpoint_every, self.checkpoint_every_steps,
+                                              log=self.log)
+
+        callbacks = [tensorboard_callback, log_callback, checkpoint_callback]
+
+        # Aumento de dados vetorizado, executado no pipeline de entrada (apenas no conjunto de treino)
+        train_data = self.train_data
+        augmentation = BatchAugmentation.from_preset(self.augmentation, self.mixup_alpha, self.cutmix_alpha)
+        if augmentation is not None:
+            train_data = augmentation.apply(train_data)
+            self.log(f"Aumento de dados: {augmentation.describe()}")
+
+        # Instrumentação por passo: tempo, imagens/s e espera pelos dados versus cálculo
+        performance_callback = None
+        if self.performance_log:
+            # Tamanho do lote para as imagens/s (a medição da espera conta as imagens de cada lote diretamente)
+            batch_size = (self.run_config or {}).get("batch_size") or getattr(self.train_data, "batch_size", None)
+            num_samples = len(self.split_manifest.train) if self.split_manifest is not None else None
+            performance_callback = PerformanceCallback(log_path, log=self.log, batch_size=batch_size,
+                                                       num_samples=num_samples)
+            callbacks.append(performance_callback)
+
+        # Parada antecipada: encerra o treinamento quando a métrica monitorada estabiliza
+        early_stopping_callback = None
+        if self.early_stopping:
+            early_stopping_callback = EarlyStopping(monitor=self.early_stopping,
+                                                    patience=self.patience,
+                                                    min_delta=self.min_delta,
+                                                    restore_best_weights=True)
+            callbacks.append(early_stopping_callback)
+            self.log(f"Parada antecipada: {self.early_stopping} (paciência de {self.patience} épocas)")
+
+        # Define o otimizador adam o qualcombina vantagens do SGD + Momentum + RMSprop.
+        # O learning_rate padrão (1e-4) refere-se taxa de aprendizado pequena (0.0001) → útil para estabilizar
+        # treinamento de modelos complexos como ViT.
+        self.schedule = self.learning_rate_schedule()
+        optimizer = tf.keras.optimizers.Adam(learning_rate=self.schedule)
+        self.log(f"Taxa de aprendizado: {self.learning_rate:.2e} ({self.lr_schedule})")
+
+        # Com precisão mista, o otimizador é envolvido pelo LossScaleOptimizer, que escala a perda antes do
+        # cálculo dos gradientes (evitando que gradientes pequenos sejam zerados em baixa precisão)
+        if self.mixed_precision:
+            optimizer = tf.keras.mixed_precision.LossScaleOptimizer(optimizer)
+            self.log("Precisão mista ativada (cálculo em bfloat16, variáveis em float32)")
+
+        # Acúmulo de gradientes: o treinamento usa um modelo sobre as mesmas camadas da rede, cujo train_step
+        # só aplica o otimizador a cada accumulation_steps lotes
+        self.model = self.neural_network
+        if self.accumulation_steps > 1:
+            self.model = GradientAccumulationModel.wrap(self.neural_network, self.accumulation_steps)
+            self.log(f"Acúmulo de gradientes: {self.accumulation_steps} lotes por atualização dos pesos")
+            try:
+                if len(self.train_data) % self.accumulation_steps:
+                    self.log("Aviso: a quantidade de lotes por época não é múltipla do acúmulo; os gradientes "
+                             "restantes são somados aos da época seguinte")
+            except TypeError:
+                pass
+
+        # Define como função de custo a CategoricalCrossentropy,
+        # usada para classificação multiclasse com rótulos one-hot
+        # obs: from_logits=True: indica que a última camada do modelo retorna
+        # logits (não passou por softmax ainda). Isso permite mais estabilidade numérica.
+        # O TensorFlow aplicará softmax internamente antes de calcular a perda.
+        loss_fn = tf.keras.losses.CategoricalCrossentropy(from_logits=True)
+
+        # Antes de ativar o XLA, a compilação é testada em um lote real e o tempo por passo é
+        # comparado com o modo grafo. Se alguma camada não puder ser compilada, o XLA é desativado.
+        jit_compile = False
+        if self.jit_compile:
+            jit_compile = XlaCompiler.resolve(self.neural_network, loss_fn, self.train_data, self.log)
+            if jit_compile:
+                self.log("Compilação XLA ativada para treinamento e predição")
+
+        self.model.compile(
+
+            optimizer=optimizer,
+
+            loss=loss_fn,
+
+            # Define as métricas que serão monitoradas durante o treinamento e validação.
+            # Aqui usamos acurácia, que é a fração de previsões corretas sobre o total.
+            metrics=['accuracy'],
+
+            # Compila os passos de treinamento, validação e predição com XLA (quando suportado)
+            jit_compile=jit_compile
+        )
+
+        # Espera pelos dados versus cálculo: os lotes são retirados do iterador fora do grafo, com cronômetro
+        if performance_callback is not None and self.measure_input_wait:
+            performance_callback.instrument(self.model)
+
+        # Restaura pesos, estado do otimizador e contador de épocas do último checkpoint
+        initial_epoch = 0
+        if self.resume_from is not None:
+            state = AsyncCheckpoint.restore(self.model, self.resume_from)
+            initial_epoch = state["epoch"]
+            checkpoint_callback.global_step = state["global_step"]
+            self.log(f"Checkpoint restaurado: época {initial_epoch}/{self.epochs}")
+
+        start = time.perf_counter()
+        try:
+            self.history = self.model.fit(
+                train_data,
+                epochs=self.epochs,
+                initial_epoch=initial_epoch,
+                validation_data=self.val_data,
+                callbacks=callbacks
+            )
+        except BaseException:
+            self.registry.finish(self.run_id, "failed", wall_time=time.perf_counter() - start)
+            raise
+
+        # Resultado da execução no índice e ingestão dos escalares do TensorBoard em segundo plano
+        last_summary = performance_callback.last_summary if performance_callback is not None else None
+        self.registry.finish(self.run_id, "completed",
+                             wall_time=time.perf_counter() - start,
+                             images_per_sec=last_summary.get("images_per_sec") if last_summary else None,
+                             history=self.history.history)
+        self.ingest_thread = self.registry.ingest_in_background(log_path)
+
+        if early_stopping_callback is not None and early_stopping_callback.stopped_epoch > 0:
+            self.log(f"Parada antecipada na época {early_stopping_callback.stopped_epoch + 1}: "
+                     f"melhor {self.early_stopping} = {early_stopping_callback.best:.4f} "
+                     f"(pesos da melhor época restaurados)")
+
+        self.log("Treinamento finalizado com sucesso!")
+        return self.history
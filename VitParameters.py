@@ -1,4 +1,5 @@
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox,
+                             QComboBox)
 
 
 class VitParameters(QDialog):
@@ -14,6 +15,11 @@ class VitParameters(QDialog):
         self.transformer_layers = None
         self.num_heads = None
         self.mlp_units = None
+        self.patch_embedding = None
+        self.head = None
+        self.head_dim = None
+        self.attention = None
+        self.attention_chunk_size = None
 
         # Layout principal, organizando verticalmente os widgets na janela
         layout = QVBoxLayout()
@@ -59,6 +65,50 @@ class VitParameters(QDialog):
         h_layout.addWidget(self.mlp_units_edit)
         layout.addLayout(h_layout)
 
+        # Head Dim (Análogo ao bloco de código referente ao Patch_size). Quando vazio, usa projection_dim // heads
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(QLabel("Head Dim"))
+        self.head_dim_edit = QLineEdit()
+        self.head_dim_edit.setPlaceholderText("Default: Projection Dim / Attention Heads")
+        h_layout.addWidget(self.head_dim_edit)
+        layout.addLayout(h_layout)
+
+        # Implementação da atenção (O texto exibido é associado ao identificador do ModelCreator)
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(QLabel("Atenção"))
+        self.attention_combo = QComboBox()
+        self.attention_combo.addItem("MultiHeadAttention (Keras)", 'keras')
+        self.attention_combo.addItem("Em blocos (economia de memória)", 'chunked')
+        h_layout.addWidget(self.attention_combo)
+        layout.addLayout(h_layout)
+
+        # Tamanho dos blocos da atenção (usado apenas pela atenção em blocos)
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(QLabel("Chunk da atenção"))
+        self.attention_chunk_size_edit = QLineEdit()
+        self.attention_chunk_size_edit.setPlaceholderText("Default: 64")
+        h_layout.addWidget(self.attention_chunk_size_edit)
+        layout.addLayout(h_layout)
+
+        # Forma de gerar os embeddings dos patches (O texto exibido é associado ao identificador do ModelCreator)
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(QLabel("Patch Embedding"))
+        self.patch_embedding_combo = QComboBox()
+        self.patch_embedding_combo.addItem("PatchExtractor + PatchEncoder", 'extractor')
+        self.patch_embedding_combo.addItem("Convolucional (fundido)", 'fused')
+        h_layout.addWidget(self.patch_embedding_combo)
+        layout.addLayout(h_layout)
+
+        # Cabeça de classificação (O texto exibido é associado ao identificador do ModelCreator)
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(QLabel("Cabeça de classificação"))
+        self.head_combo = QComboBox()
+        self.head_combo.addItem("Flatten", 'flatten')
+        self.head_combo.addItem("Média global dos tokens (GAP)", 'gap')
+        self.head_combo.addItem("Token de classe (CLS)", 'cls')
+        h_layout.addWidget(self.head_combo)
+        layout.addLayout(h_layout)
+
         # Botões OK e Cancel (Análogo à organização do bloco de código referente ao Patch_size)
         button_layout = QHBoxLayout()
         ok_button = QPushButton("OK")
@@ -81,6 +131,15 @@ class VitParameters(QDialog):
             self.transformer_layers = int(self.transformer_layers_edit.text())
             self.num_heads = int(self.num_heads_edit.text())
             self.mlp_units = int(self.mlp_units_edit.text())
+            self.patch_embedding = self.patch_embedding_combo.currentData()
+            self.head = self.head_combo.currentData()
+            self.attention = self.attention_combo.currentData()
+
+            # Campos opcionais: quando vazios, os valores padrão são utilizados
+            head_dim_text = self.head_dim_edit.text().strip()
+            self.head_dim = int(head_dim_text) if head_dim_text else None
+            chunk_text = self.attention_chunk_size_edit.text().strip()
+            self.attention_chunk_size = int(chunk_text) if chunk_text else 64
 
             self.accept()  # fecha o dialog com resultado "aceito"
 
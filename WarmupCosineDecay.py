@@ -0,0 +1,43 @@
+import math
+
+import tensorflow as tf
+
+
+# Agendamento da taxa de aprendizado com aquecimento linear seguido de decaimento cosseno.
+#
+# Nos primeiros warmup_steps passos a taxa cresce linearmente de 0 até learning_rate (evitando atualizações
+# grandes enquanto os momentos do Adam ainda não estão estimados, o que é comum em ViTs). Em seguida, ela
+# decai seguindo meio período de um cosseno até learning_rate * alpha no passo total_steps.
+#
+# obs: O passo é o contador de iterações do otimizador, que também é restaurado na retomada do treinamento
+# (ver AsyncCheckpoint), então a curva continua do ponto em que parou.
+class WarmupCosineDecay(tf.keras.optimizers.schedules.LearningRateSchedule):
+
+    def __init__(self, learning_rate, total_steps, warmup_steps=0, alpha=0.0):
+        super().__init__()
+        self.learning_rate = learning_rate
+        self.total_steps = total_steps
+        self.warmup_steps = warmup_steps
+        self.alpha = alpha  # fração da taxa inicial mantida ao final do decaimento
+
+    def __call__(self, step):
+        step = tf.cast(step, tf.float32)
+        learning_rate = tf.cast(self.learning_rate, tf.float32)
+        warmup_steps = tf.cast(self.warmup_steps, tf.float32)
+        decay_steps = tf.maximum(tf.cast(self.total_steps, tf.float32) - warmup_steps, 1.0)
+
+        warmup = learning_rate * step / tf.maximum(warmup_steps, 1.0)
+
+        progress = tf.clip_by_value((step - warmup_steps) / decay_steps, 0.0, 1.0)
+        cosine = 0.5 * (1.0 + tf.cos(math.pi * progress))
+        decayed = learning_rate * ((1.0 - self.alpha) * cosine + self.alpha)
+
+        return tf.where(step < warmup_steps, warmup, decayed)
+
+    def get_config(self):
+        return {
+            "learning_rate": self.learning_rate,
+            "total_steps": self.total_steps,
+            "warmup_steps": self.warmup_steps,
+            "alpha": self.alpha
+        }
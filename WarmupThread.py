@@ -0,0 +1,32 @@
+import time
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+# A thread carrega o TensorFlow em segundo plano logo após a abertura da janela.
+#
+# A importação do TensorFlow/Keras (e a inicialização do runtime, que detecta os dispositivos e cria os pools
+# de threads) leva alguns segundos. Como a interface importa os módulos que dependem do TensorFlow apenas
+# quando eles são usados, esse custo é pago aqui, enquanto o usuário escolhe o dataset e preenche os
+# parâmetros; quando o carregamento dos dados começa, o TensorFlow já está pronto.
+class WarmupThread(QThread):
+
+    warmup_finished = pyqtSignal(str)  # mensagem com o tempo de carregamento e os dispositivos encontrados
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            import tensorflow as tf
+
+            # Importa também os módulos do projeto usados no treinamento (e, com eles, o Keras)
+            import ModelCreator
+            import Trainer
+
+            # Uma operação simples inicializa o runtime (dispositivos, pools de threads e kernels)
+            tf.reduce_sum(tf.ones((8, 8))).numpy()
+            devices = ", ".join(device.device_type for device in tf.config.list_logical_devices())
+
+            self.warmup_finished.emit(f"TensorFlow {tf.__version__} carregado em segundo plano em "
+                                      f"{time.perf_counter() - start:.2f} s (dispositivos: {devices})")
+        except Exception as e:
+            self.warmup_finished.emit(f"Erro ao carregar o TensorFlow em segundo plano: {str(e)}")